@@ -20,36 +20,82 @@ from flask import (
     redirect,
     url_for,
     send_from_directory,
+    Response,
+    stream_with_context,
 )
+import atexit
+import base64
 import csv
+import gzip
+import io
 import os
 import json
+import pickle
+import queue
+import random
 import secrets
 import sqlite3
-from datetime import datetime
-from functools import wraps
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from datetime import datetime, timedelta
+from functools import lru_cache, wraps
+from itertools import islice
 import pytz
 import re
 import requests
 
-import google.generativeai as genai
 from markupsafe import Markup, escape
 
 
 import hashlib
+import heapq
+import math
+from collections import Counter
+import numpy as np
 import pandas as pd
-from groq import Groq
 from flask import Flask, request, jsonify, render_template
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = pq = None
+try:
+    import google.generativeai as genai
+except ImportError:  # only needed for COMPARE_AI_PROVIDER=gemini
+    genai = None
+try:
+    from groq import Groq
+except ImportError:  # only needed for COMPARE_AI_PROVIDER=groq
+    Groq = None
+try:
+    import msgpack
+except ImportError:  # format=msgpack is optional
+    msgpack = None
+try:
+    import brotli
+except ImportError:  # gzip is used when brotli is not installed
+    brotli = None
+
+from database.archive_logs import archive_path, archived_months, default_archive_dir, read_archive
+from database.init_db import ROLLUP_EVENTS, create_indexes_and_rollups, tracking_db_path
+
 app = Flask(__name__)
 app.secret_key = os.environ.get("FLASK_SECRET_KEY") or secrets.token_hex(32)
 
 
-CSV_PATH = "data/input/paper_extracted.csv"
-TRACKING_DB_PATH = "data/output/tracking.db"
-
-client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
-genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
+# Tracking database, relative to the working directory; the TRACKING_DB_PATH
+# environment variable points it elsewhere (e.g. a scratch database). The
+# scripts in database/ resolve it the same way.
+TRACKING_DB_PATH = tracking_db_path()
+# Generated corpus files (snapshot, paper id map, corpus.db); CORPUS_OUTPUT_DIR
+# points them elsewhere, e.g. at a scratch directory for benchmarks.
+CORPUS_OUTPUT_DIR = Path(os.environ.get("CORPUS_OUTPUT_DIR") or DATA_DIR / "output")
+CORPUS_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
 def normalize_text(value):
     if pd.isna(value):
@@ -62,28 +108,6 @@ def make_paper_key(title, year, journal):
     return hashlib.md5(base.encode("utf-8")).hexdigest()
 
 
-def load_papers_df():
-    df = pd.read_csv(CSV_PATH)
-    df = df.fillna("")
-
-    # critical: remove bad spaces/newlines from column names
-    df.columns = [str(c).strip() for c in df.columns]
-
-    required = ["title", "year", "journal"]
-    for col in required:
-        if col not in df.columns:
-            raise ValueError(f"CSV must contain '{col}' column")
-
-    df["title"] = df["title"].apply(normalize_text)
-    df["year"] = df["year"].apply(normalize_text)
-    df["journal"] = df["journal"].apply(normalize_text)
-
-    df["paper_key"] = df.apply(
-        lambda row: make_paper_key(row["title"], row["year"], row["journal"]),
-        axis=1
-    )
-
-    return df
 # @app.route("/api/admin/refresh-citations", methods=["POST"])
 # def refresh_citations():
 #     for paper in papers_data:
@@ -91,14 +115,87 @@ def load_papers_df():
 #             paper["citations"] = fetch_citation_count(paper["doi"])
 #     return jsonify({"success": True})
 
+# Tracking DB connections are pooled per process; close() hands them back to the pool.
+TRACKING_DB_POOL_SIZE = int(os.environ.get("TRACKING_DB_POOL_SIZE", "8"))
+# Seconds a statement waits on a locked database before raising "database is locked".
+TRACKING_DB_BUSY_TIMEOUT = 5.0
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose ``close()`` returns it to ``_tracking_pool``.
+
+    Anything left uncommitted is rolled back first, so the next borrower
+    starts clean. ``really_close()`` closes the underlying connection.
+    """
+
+    def close(self):
+        _tracking_pool.release(self)
+
+    def really_close(self):
+        super().close()
+
+
+class ConnectionPool:
+    """Bounded LIFO pool of configured connections to one SQLite file.
+
+    New connections use WAL journaling (readers never block the writer),
+    ``synchronous=NORMAL`` (no fsync per commit in WAL mode, still durable
+    across application crashes) and a busy timeout instead of failing at
+    once on a locked file. Reusing connections also reuses the sqlite3
+    module's per-connection prepared statement cache. A pool inherited
+    through ``fork()`` is discarded rather than shared with the parent.
+    """
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def acquire(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._idle = []
+                self._pid = os.getpid()
+            if self._idle:
+                return self._idle.pop()
+        conn = sqlite3.connect(
+            self.path,
+            timeout=TRACKING_DB_BUSY_TIMEOUT,
+            factory=PooledConnection,
+            check_same_thread=False,
+            cached_statements=256,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.really_close()
+            return
+        with self._lock:
+            if self._pid == os.getpid() and len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.really_close()
+
+
+_tracking_pool = ConnectionPool(TRACKING_DB_PATH, TRACKING_DB_POOL_SIZE)
+
+
 def get_db_connection():
-    conn = sqlite3.connect(TRACKING_DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Tracking DB connection from the pool; ``close()`` it to give it back."""
+    return _tracking_pool.acquire()
 
 
 def init_compare_summary_table():
-    os.makedirs("data/output", exist_ok=True)
+    os.makedirs(os.path.dirname(TRACKING_DB_PATH) or ".", exist_ok=True)
 
     conn = get_db_connection()
     conn.execute("""
@@ -113,14 +210,47 @@ def init_compare_summary_table():
             context TEXT,
             model_name TEXT,
             prompt_version TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            lease_owner TEXT,
+            lease_expires_at REAL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS compare_ai_category_cache (
+            cache_key TEXT PRIMARY KEY,
+            category TEXT NOT NULL,
+            result_json TEXT NOT NULL,
+            failed INTEGER NOT NULL DEFAULT 0,
+            model_name TEXT,
+            created_at REAL NOT NULL,
+            expires_at REAL
         )
     """)
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(compare_ai_summaries)")}
+    for column, column_type in (("lease_owner", "TEXT"), ("lease_expires_at", "REAL")):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE compare_ai_summaries ADD COLUMN {column} {column_type}")
     conn.commit()
     conn.close()
 
 init_compare_summary_table()
 
+
+def init_tracking_rollups():
+    """Create the tracking indexes and rollup tables (backfilled once from the raw logs)."""
+    conn = get_db_connection()
+    try:
+        with conn:
+            if create_indexes_and_rollups(conn):
+                print("Built tracking rollup tables from the existing logs")
+    except sqlite3.OperationalError as e:
+        print(f"Tracking rollups not set up (run database/init_db.py first): {e}")
+    finally:
+        conn.close()
+
+
+init_tracking_rollups()
+
 def word_count(value):
     """Return word count for a given string value."""
     if not value:
@@ -193,9 +323,63 @@ app.jinja_env.filters["highlight_keywords"] = highlight_keywords_filter
 ADMIN_USERNAME = (os.environ.get("ADMIN_USERNAME") or "").strip()
 ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD") or ""
 
-# Global variable to store papers data
-papers_data = []
-_papers_csv_mtime_when_loaded = None
+class CorpusSnapshot:
+    """Immutable bundle of the papers loaded from one version of the CSV.
+
+    Holds the paper records plus everything derived from them (lookup
+    indexes, filter columns, search index). Request code reads
+    ``get_corpus()`` once and uses that snapshot throughout; a reload builds
+    a new snapshot off to the side and publishes it with one reference
+    assignment, so requests never see a partially loaded corpus.
+
+    With the SQLite backend (``PAPERS_BACKEND=sqlite``) ``store`` is the
+    SqlitePaperStore that answers searches and lookups; ``papers`` and
+    ``lookup`` are views over it and ``columns``/``index`` are None.
+    """
+
+    __slots__ = (
+        "papers",
+        "lookup",
+        "columns",
+        "index",
+        "fieldnames",
+        "row_digests",
+        "version",
+        "csv_mtime",
+        "store",
+    )
+
+    def __init__(
+        self,
+        papers,
+        lookup,
+        columns,
+        index,
+        fieldnames=(),
+        row_digests=(),
+        version="",
+        csv_mtime=None,
+        store=None,
+    ):
+        self.papers = papers
+        self.lookup = lookup
+        self.columns = columns
+        self.index = index
+        # CSV header and per-paper raw row digests, for incremental reloads
+        self.fieldnames = fieldnames
+        self.row_digests = row_digests
+        self.version = version
+        self.csv_mtime = csv_mtime
+        self.store = store
+
+
+# Currently published corpus (see CorpusSnapshot); replaced only by _publish_corpus
+_corpus = None
+
+
+def get_corpus():
+    """The currently published CorpusSnapshot."""
+    return _corpus
 
 
 def get_papers_csv_path():
@@ -211,9 +395,20 @@ def get_papers_csv_path():
     return None
 
 
-def reload_papers_from_csv_if_changed():
-    """Reload papers_data from disk when the CSV file changes (mtime). Cheap no-op if unchanged."""
-    global _papers_csv_mtime_when_loaded
+_reload_lock = threading.Lock()
+_reload_thread = None
+# mtime of a CSV version that failed to load, so it is not retried on every request
+_failed_reload_mtime = None
+
+
+def reload_papers_from_csv_if_changed(background=True):
+    """Reload the corpus when the CSV file changes (mtime). Cheap no-op if unchanged.
+
+    With ``background=True`` the new CSV is loaded in a worker thread while
+    requests keep using the current snapshot; the first load (nothing
+    published yet) always runs inline.
+    """
+    global _reload_thread
     csv_path = get_papers_csv_path()
     if not csv_path:
         return
@@ -221,14 +416,26 @@ def reload_papers_from_csv_if_changed():
         mtime = csv_path.stat().st_mtime
     except OSError:
         return
-    if (
-        _papers_csv_mtime_when_loaded is not None
-        and _papers_csv_mtime_when_loaded == mtime
-        and papers_data
-    ):
+    corpus = _corpus
+    if corpus.csv_mtime == mtime or mtime == _failed_reload_mtime:
+        return
+    if not background or corpus.csv_mtime is None:
+        _reload_corpus(mtime)
         return
+    with _reload_lock:
+        if _reload_thread is not None and _reload_thread.is_alive():
+            return
+        _reload_thread = threading.Thread(
+            target=_reload_corpus, args=(mtime,), name="corpus-reload", daemon=True
+        )
+        _reload_thread.start()
+
+
+def _reload_corpus(mtime):
+    global _failed_reload_mtime
     load_papers_from_csv()
-    _papers_csv_mtime_when_loaded = mtime
+    if _corpus.csv_mtime != mtime:
+        _failed_reload_mtime = mtime
 
 
 def extract_doi(text):
@@ -255,11 +462,436 @@ def extract_doi(text):
 #     return 0
 
 
+# Stable paper ids by dedupe key (DOI, else normalized title), kept across CSV edits.
+PAPER_IDS_PATH = CORPUS_OUTPUT_DIR / "paper_ids.json"
+
+
+def _paper_dedupe_key(title, doi):
+    """Deduplication key: prefer DOI, otherwise normalized title."""
+    return doi.lower() if doi else re.sub(r"[^a-z0-9 ]", "", title.lower()).strip()
+
+
+def _load_paper_ids():
+    try:
+        with open(PAPER_IDS_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"Ignoring unreadable paper id map: {e}")
+        return {}
+
+
+def _save_paper_ids(paper_ids):
+    try:
+        tmp_path = PAPER_IDS_PATH.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(paper_ids, f, indent=0, sort_keys=True)
+        os.replace(tmp_path, PAPER_IDS_PATH)
+    except Exception as e:
+        print(f"Could not write paper id map: {e}")
+
+
+def _row_digest(values):
+    """Content digest of one raw CSV row."""
+    return hashlib.blake2b(
+        "\x1f".join(values).encode("utf-8", "surrogatepass"), digest_size=16
+    ).digest()
+
+
+def _build_paper_record(row):
+    """Paper record for one normalized CSV row, or None if the row is skipped."""
+    title = (row.get("title") or "").strip()
+    citation = (row.get("citation") or "").strip()
+    abstract = (row.get("abstract") or "").strip()
+
+    doi = extract_doi(citation)
+
+    # Skip fully empty rows
+    if not title and not citation and not abstract:
+        return None
+
+    # Skip rows without meaningful title
+    if not title or title.lower() in {"nan", "none"}:
+        return None
+
+    #citation_count = fetch_citation_count(doi)
+    paper_key = make_paper_key(title, row.get("year", ""), row.get("journal", ""))
+    paper = {
+        "id": None,  # assigned by _parse_papers_csv
+        "paper_key": paper_key,
+        "title": title,
+        "title_verbatim": row.get("title_verbatim", ""),
+        "authors": [
+            author.strip()
+            for author in row.get("authors", "").split(";")
+            if author.strip()
+        ],
+        "authors_verbatim": row.get("authors_verbatim", ""),
+        "journal": row.get("journal", ""),
+        "journal_verbatim": row.get("journal_verbatim", ""),
+        "year": (
+            int(row.get("year", 2023))
+            if row.get("year", "").isdigit()
+            else 2023
+        ),
+        "citation": citation,
+        "doi": doi,
+        #"citations": citation_count,
+        "abstract": abstract,
+        "abstract_verbatim": row.get("abstract_verbatim", ""),
+        "ai_context_summary": row.get("ai_context_summary", ""),
+        "sample_size": (
+            int(row.get("sample_size", "0").replace(",", ""))
+            if row.get("sample_size", "").replace(",", "").isdigit()
+            else 0
+        ),
+        "countries": (
+            [row.get("country_region", "USA")]
+            if row.get("country_region")
+            and row.get("country_region") != "NOT SPECIFIED"
+            else ["USA"]
+        ),
+        "methodology": row.get("study_type", "Unknown"),
+        "research_type": "Experimental Research",
+        "impact_factor": 0,
+        "keywords": ["social media", "politics"],
+        "extracted_features": {
+            "independent_variables": row.get("independent_variables", ""),
+            "independent_variables_verbatim": row.get(
+                "independent_variables_verbatim", ""
+            ),
+            "dependent_variables": row.get("dependent_variables", ""),
+            "dependent_variables_verbatim": row.get(
+                "dependent_variables_verbatim", ""
+            ),
+            "survey_questions": row.get("survey_questions", ""),
+            "survey_questions_verbatim": row.get(
+                "survey_questions_verbatim", ""
+            ),
+            "incentive": row.get("incentive", ""),
+            "incentive_verbatim": row.get("incentive_verbatim", ""),
+            "study_type": row.get("study_type", ""),
+            "study_type_verbatim": row.get("study_type_verbatim", ""),
+            "analysis_equations": row.get("analysis_equations", ""),
+            "analysis_equations_verbatim": row.get(
+                "analysis_equations_verbatim", ""
+            ),
+            "level_of_analysis": row.get("level_of_analysis", ""),
+            "level_of_analysis_verbatim": row.get(
+                "level_of_analysis_verbatim", ""
+            ),
+            "main_effects": row.get("main_effects", ""),
+            "main_effects_verbatim": row.get("main_effects_verbatim", ""),
+            "statistical_power": row.get("statistical_power", ""),
+            "statistical_power_verbatim": row.get(
+                "statistical_power_verbatim", ""
+            ),
+            "moderators": row.get("moderators", ""),
+            "moderators_verbatim": row.get("moderators_verbatim", ""),
+            "moderation_results": row.get("moderation_results", ""),
+            "moderation_results_verbatim": row.get(
+                "moderation_results_verbatim", ""
+            ),
+            "demographics": row.get("demographics", ""),
+            "demographics_verbatim": row.get("demographics_verbatim", ""),
+            "recruitment_source": row.get("recruitment_source", ""),
+            "recruitment_source_verbatim": row.get(
+                "recruitment_source_verbatim", ""
+            ),
+            "sample_size": row.get("sample_size", ""),
+            "sample_size_verbatim": row.get("sample_size_verbatim", ""),
+            "country_region": row.get("country_region", ""),
+            "temporal_context": row.get("temporal_context", ""),
+            "gdp_per_capita_usd": row.get("gdp_per_capita_usd", ""),
+            "gini_coefficient": row.get("gini_coefficient", ""),
+            "income_group": row.get("income_group", ""),
+            "study_language": row.get("study_language", ""),
+            "platform_language_optimization": row.get(
+                "platform_language_optimization", ""
+            ),
+            "traditional_media_strength": row.get(
+                "traditional_media_strength", ""
+            ),
+            "electoral_proximity": row.get("electoral_proximity", ""),
+            "recommended_moderators": row.get("recommended_moderators", ""),
+            "research_context": row.get("research_context", ""),
+            "intervention_insights": row.get("intervention_insights", ""),
+            # Context / system metrics
+            "democracy": row.get("democracy", ""),
+            "press_freedom": row.get("press_freedom", ""),
+            "internet_freedom": row.get("internet_freedom", ""),
+            "internet_penetration": row.get("internet_penetration", ""),
+            "governance": row.get("governance", ""),
+            "polarization": row.get("polarization", ""),
+            "deliberative_democracy": row.get("polarization", ""),
+            "economic_performance": row.get("economic_performance", ""),
+            "election_period": row.get("election_period", ""),
+            "covid_period": row.get("covid_period", ""),
+            "high_salience_period": row.get("high_salience_period", ""),
+            "interpersonal_trust": row.get("interpersonal_trust", ""),
+
+            "ai_context_summary": row.get("ai_context_summary", ""),
+
+            # Population / internet / platform metrics
+            "population_million": row.get("population_million", ""),
+            "internet_users_million": row.get("internet_users_million", ""),
+            "social_media_users_million": row.get(
+                "social_media_users_million", ""
+            ),
+            "youtube_users_million": row.get("youtube_users_million", ""),
+            "facebook_users_million": row.get("facebook_users_million", ""),
+            "instagram_users_million": row.get(
+                "instagram_users_million", ""
+            ),
+            "x_users_million": row.get("x_users_million", ""),
+            "tiktok_users_million": row.get("tiktok_users_million", ""),
+            "linkedin_users_million": row.get("linkedin_users_million", ""),
+            "messenger_users_million": row.get(
+                "messenger_users_million", ""
+            ),
+            "snapchat_users_million": row.get("snapchat_users_million", ""),
+            "pinterest_users_million": row.get(
+                "pinterest_users_million", ""
+            ),
+        },
+    }
+
+    return paper
+
+
+def _parse_papers_csv(file, previous=None):
+    """Parse the papers CSV (open text file) into paper records, deduplicated, in file order.
+
+    Returns ``(papers, fieldnames, row_digests, reused_from)``. Rows whose
+    digest matches a row of ``previous`` (the corpus loaded from an earlier
+    version of the file, same header) reuse that record object as is;
+    ``reused_from[i]`` is the position of the reused record in
+    ``previous.papers``, or -1 for rows parsed afresh. Ids come from
+    ``PAPER_IDS_PATH``, so a paper keeps its id when rows around it are
+    added, removed or edited, and ids of removed papers are never reissued.
+    """
+    papers = []
+    row_digests = []
+    reused_from = []
+    seen_keys = set()
+    # Repeated cell values (country-level metrics, journals, "NOT SPECIFIED", …)
+    # share one string object across all papers.
+    shared_values = {}
+
+    reader = csv.reader(file)
+    fieldnames = tuple(
+        str(k).strip().replace('"', "") for k in next(reader, None) or ()
+    )
+
+    print(f"CSV columns found: {len(fieldnames)}")
+    print(f"First few columns: {list(fieldnames[:5])}")
+
+    previous_rows = {}
+    if previous is not None and previous.fieldnames == fieldnames:
+        previous_rows = {d: i for i, d in enumerate(previous.row_digests)}
+    paper_ids = _load_paper_ids()
+    known_ids = list(paper_ids.values())
+    if previous is not None:
+        known_ids.extend(p["id"] for p in previous.papers)
+    next_number = 1 + max(
+        (int(pid.rpartition("_")[2]) for pid in known_ids), default=0
+    )
+    ids_changed = False
+
+    num_fields = len(fieldnames)
+    for i, values in enumerate(reader, 1):
+        if not values:
+            continue
+        digest = _row_digest(values)
+        previous_position = previous_rows.get(digest, -1)
+        if previous_position >= 0:
+            paper = previous.papers[previous_position]
+        else:
+            if len(values) < num_fields:
+                values = values + [None] * (num_fields - len(values))
+            row = {}
+            for key, v in zip(fieldnames, values):
+                if v is not None:
+                    v = shared_values.setdefault(v, v)
+                row[key] = v
+            if i == 1:
+                print(f"First row keys: {list(row.keys())[:5]}")
+                print(f"Title from first row: '{row.get('title', 'NOT_FOUND')}'")
+            paper = _build_paper_record(row)
+            if paper is None:
+                continue
+
+        dedupe_key = _paper_dedupe_key(paper["title"], paper["doi"])
+        if dedupe_key in seen_keys:
+            print(f"Skipping duplicate: {paper['title']}")
+            continue
+        seen_keys.add(dedupe_key)
+
+        if previous_position < 0:
+            paper_id = paper_ids.get(dedupe_key)
+            if paper_id is None:
+                paper_id = f"paper_{str(next_number).zfill(3)}"
+                next_number += 1
+            paper["id"] = paper_id
+        if paper_ids.get(dedupe_key) != paper["id"]:
+            paper_ids[dedupe_key] = paper["id"]
+            ids_changed = True
+
+        papers.append(paper)
+        row_digests.append(digest)
+        reused_from.append(previous_position)
+
+    if ids_changed:
+        _save_paper_ids(paper_ids)
+    return papers, fieldnames, row_digests, reused_from
+
+
+def _build_corpus_structures(papers, fieldnames=(), row_digests=(), previous=None, reused_from=None):
+    """Lookup indexes, filter columns and search index for a list of papers.
+
+    With ``previous``/``reused_from`` (see ``_parse_papers_csv``) the search
+    index is patched from the previous one rather than rebuilt.
+    """
+    index = PaperSearchIndex(
+        papers,
+        previous=previous.index if previous is not None else None,
+        reused_from=reused_from,
+    )
+    return (
+        papers,
+        PaperLookup(papers),
+        PaperColumns(papers),
+        index,
+        tuple(fieldnames),
+        tuple(row_digests),
+    )
+
+
+# Binary snapshot of the parsed corpus (records + indexes), reused while the CSV is unchanged.
+PAPERS_SNAPSHOT_PATH = CORPUS_OUTPUT_DIR / "papers_snapshot.pickle"
+# Bump when the shape of the records or index structures changes.
+PAPERS_SNAPSHOT_FORMAT = 2
+# Snapshots written by a different version of this module are ignored.
+_SNAPSHOT_CODE_VERSION = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()[:16]
+
+
+def _snapshot_header(csv_path, stat, content_hash):
+    return {
+        "format": PAPERS_SNAPSHOT_FORMAT,
+        "code_version": _SNAPSHOT_CODE_VERSION,
+        "csv_path": str(csv_path),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "sha256": content_hash,
+    }
+
+
+def _read_papers_snapshot(csv_path, header_only=False):
+    """``(header, structures)`` of the snapshot written by this code for ``csv_path``, else None.
+
+    ``structures`` is None with ``header_only``. Whether the snapshot matches
+    the current CSV contents is left to the caller (see ``load_papers_from_csv``).
+    """
+    if not PAPERS_SNAPSHOT_PATH.is_file():
+        return None
+    try:
+        with open(PAPERS_SNAPSHOT_PATH, "rb") as f:
+            header = pickle.load(f)
+            if (
+                header.get("format") != PAPERS_SNAPSHOT_FORMAT
+                or header.get("code_version") != _SNAPSHOT_CODE_VERSION
+                or header.get("csv_path") != str(csv_path)
+            ):
+                return None
+            return header, None if header_only else pickle.load(f)
+    except Exception as e:
+        print(f"Ignoring unreadable papers snapshot: {e}")
+        return None
+
+
+def _write_papers_snapshot(csv_path, stat, content_hash, structures):
+    """Write the snapshot atomically (temp file + rename) so readers never see a partial file."""
+    try:
+        header = _snapshot_header(csv_path, stat, content_hash)
+        tmp_path = PAPERS_SNAPSHOT_PATH.with_suffix(f".tmp{os.getpid()}")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(structures, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, PAPERS_SNAPSHOT_PATH)
+    except Exception as e:
+        print(f"Could not write papers snapshot: {e}")
+
+
+# Timing of the most recent corpus load, reported on /api/admin/stats.
+_corpus_load_stats = {}
+
+
+def _publish_corpus(corpus):
+    """Make ``corpus`` the snapshot every new request sees (single reference swap)."""
+    global _corpus
+    _corpus = corpus
+    _search_result_cache.clear()
+
+
+def _store_corpus(store, version, stat):
+    """CorpusSnapshot whose records and lookups are served by a SqlitePaperStore."""
+    return CorpusSnapshot(
+        SqlitePaperList(store),
+        SqlitePaperLookup(store),
+        None,
+        None,
+        version=version,
+        csv_mtime=stat.st_mtime,
+        store=store,
+    )
+
+
+def _finish_corpus_load(corpus, source, started, reuse=None):
+    """Publish a freshly loaded corpus, record its load stats and return its papers."""
+    global _corpus_load_stats
+
+    reuse = reuse or {}
+    load_seconds = time.perf_counter() - started
+    _publish_corpus(corpus)
+    paper_count = len(corpus.papers)
+    _corpus_load_stats = {
+        "source": source,
+        "backend": "sqlite" if corpus.store is not None else "memory",
+        "papers": paper_count,
+        "version": corpus.version,
+        "seconds": round(load_seconds, 4),
+        "loaded_at": get_eastern_time(),
+        **reuse,
+    }
+
+    source_label = {"snapshot": "snapshot", "sqlite": "corpus database"}.get(source, "CSV")
+    print(
+        f"Successfully loaded {paper_count} unique papers from "
+        f"{source_label} in {load_seconds * 1000:.0f} ms"
+    )
+    if reuse:
+        print(
+            "Incremental load: {reused} unchanged, {parsed} new or edited, "
+            "{removed} removed".format(**reuse)
+        )
+    if paper_count:
+        print(f"First paper title: '{corpus.papers[0]['title']}'")
+    return corpus.papers
+
+
 def load_papers_from_csv():
-    """Load papers data from CSV file."""
-    global papers_data
-    papers_data = []
+    """Load papers data from CSV file (or its binary snapshot when the CSV is unchanged)
+    and publish it as the current corpus.
+
+    When the CSV did change, rows identical to the previously loaded version
+    (the published corpus, else the stale snapshot) are reused rather than
+    parsed and indexed again.
 
+    With ``PAPERS_BACKEND=sqlite`` the records are imported into the shared
+    corpus database instead of being kept in this process; a database that
+    already holds this CSV version is used as is, without parsing.
+    """
     csv_path = get_papers_csv_path()
     if not csv_path:
         print(
@@ -268,197 +900,75 @@ def load_papers_from_csv():
         return []
 
     try:
-        seen_keys = set()
-
-        with open(csv_path, "r", encoding="utf-8") as file:
-            reader = csv.DictReader(file)
-
-            print(f"CSV columns found: {len(reader.fieldnames)}")
-            print(f"First few columns: {reader.fieldnames[:5]}")
-
-            for i, row in enumerate(reader, 1):
-                if i == 1:
-                    print(f"First row keys: {list(row.keys())[:5]}")
-                    print(f"Title from first row: '{row.get('title', 'NOT_FOUND')}'")
-                # Normalize CSV row keys
-                normalized_row = {}
-                for k, v in row.items():
-                    clean_key = str(k).strip().replace('"', "")
-                    normalized_row[clean_key] = v
-                row = normalized_row
-                title = (row.get("title") or "").strip()
-                citation = (row.get("citation") or "").strip()
-                abstract = (row.get("abstract") or "").strip()
-
-                doi = extract_doi(citation)
-
-                # Skip fully empty rows
-                if not title and not citation and not abstract:
-                    continue
-
-                # Skip rows without meaningful title
-                if not title or title.lower() in {"nan", "none"}:
-                    continue
+        started = time.perf_counter()
+        # stat before reading: an edit during the load leaves a newer mtime to reload
+        stat = csv_path.stat()
+        store = _get_paper_store() if PAPERS_BACKEND == "sqlite" else None
+        if store is not None and store.holds(csv_path, stat):
+            # Another worker (or an earlier run) already imported this CSV version
+            return _finish_corpus_load(
+                _store_corpus(store, store.version(), stat), "sqlite", started
+            )
 
-                # Deduplicate: prefer DOI, otherwise normalized title
-                dedupe_key = (
-                    doi.lower()
-                    if doi
-                    else re.sub(r"[^a-z0-9 ]", "", title.lower()).strip()
+        snapshot = _read_papers_snapshot(csv_path, header_only=True)
+        header = snapshot[0] if snapshot else {}
+        raw = None
+        # Path, size and mtime matching is enough; if only the mtime differs
+        # (file touched or rewritten with the same bytes) the content hash decides.
+        current = header.get("size") == stat.st_size
+        if current and header.get("mtime") != stat.st_mtime:
+            raw = csv_path.read_bytes()
+            current = header.get("sha256") == hashlib.sha256(raw).hexdigest()
+        structures = None
+        if current:
+            snapshot = _read_papers_snapshot(csv_path)
+            if snapshot is not None:
+                structures = snapshot[1]
+                content_hash = header["sha256"]
+                source = "snapshot"
+                if raw is not None:
+                    # Same content: refresh the header so later starts skip hashing
+                    _write_papers_snapshot(csv_path, stat, content_hash, structures)
+
+        reuse = {}
+        if structures is None:
+            if raw is None:
+                raw = csv_path.read_bytes()
+            content_hash = hashlib.sha256(raw).hexdigest()
+            previous = _corpus if _corpus is not None and _corpus.row_digests else None
+            if previous is None and header:
+                snapshot = _read_papers_snapshot(csv_path)
+                if snapshot is not None:
+                    previous = CorpusSnapshot(*snapshot[1])
+            with io.TextIOWrapper(io.BytesIO(raw), encoding="utf-8") as file:
+                papers, fieldnames, row_digests, reused_from = _parse_papers_csv(
+                    file, previous
                 )
-                if dedupe_key in seen_keys:
-                    print(f"Skipping duplicate: {title}")
-                    continue
-                seen_keys.add(dedupe_key)
-
-                #citation_count = fetch_citation_count(doi)
-                paper_key = make_paper_key(title, row.get("year", ""), row.get("journal", ""))
-                paper = {
-                    "id": f"paper_{str(len(papers_data) + 1).zfill(3)}",
-                    "paper_key": paper_key,
-                    "title": title,
-                    "title_verbatim": row.get("title_verbatim", ""),
-                    "authors": [
-                        author.strip()
-                        for author in row.get("authors", "").split(";")
-                        if author.strip()
-                    ],
-                    "authors_verbatim": row.get("authors_verbatim", ""),
-                    "journal": row.get("journal", ""),
-                    "journal_verbatim": row.get("journal_verbatim", ""),
-                    "year": (
-                        int(row.get("year", 2023))
-                        if row.get("year", "").isdigit()
-                        else 2023
-                    ),
-                    "citation": citation,
-                    "doi": doi,
-                    #"citations": citation_count,
-                    "abstract": abstract,
-                    "abstract_verbatim": row.get("abstract_verbatim", ""),
-                    "ai_context_summary": row.get("ai_context_summary", ""),
-                    "sample_size": (
-                        int(row.get("sample_size", "0").replace(",", ""))
-                        if row.get("sample_size", "").replace(",", "").isdigit()
-                        else 0
-                    ),
-                    "countries": (
-                        [row.get("country_region", "USA")]
-                        if row.get("country_region")
-                        and row.get("country_region") != "NOT SPECIFIED"
-                        else ["USA"]
-                    ),
-                    "methodology": row.get("study_type", "Unknown"),
-                    "research_type": "Experimental Research",
-                    "impact_factor": 0,
-                    "keywords": ["social media", "politics"],
-                    "extracted_features": {
-                        "independent_variables": row.get("independent_variables", ""),
-                        "independent_variables_verbatim": row.get(
-                            "independent_variables_verbatim", ""
-                        ),
-                        "dependent_variables": row.get("dependent_variables", ""),
-                        "dependent_variables_verbatim": row.get(
-                            "dependent_variables_verbatim", ""
-                        ),
-                        "survey_questions": row.get("survey_questions", ""),
-                        "survey_questions_verbatim": row.get(
-                            "survey_questions_verbatim", ""
-                        ),
-                        "incentive": row.get("incentive", ""),
-                        "incentive_verbatim": row.get("incentive_verbatim", ""),
-                        "study_type": row.get("study_type", ""),
-                        "study_type_verbatim": row.get("study_type_verbatim", ""),
-                        "analysis_equations": row.get("analysis_equations", ""),
-                        "analysis_equations_verbatim": row.get(
-                            "analysis_equations_verbatim", ""
-                        ),
-                        "level_of_analysis": row.get("level_of_analysis", ""),
-                        "level_of_analysis_verbatim": row.get(
-                            "level_of_analysis_verbatim", ""
-                        ),
-                        "main_effects": row.get("main_effects", ""),
-                        "main_effects_verbatim": row.get("main_effects_verbatim", ""),
-                        "statistical_power": row.get("statistical_power", ""),
-                        "statistical_power_verbatim": row.get(
-                            "statistical_power_verbatim", ""
-                        ),
-                        "moderators": row.get("moderators", ""),
-                        "moderators_verbatim": row.get("moderators_verbatim", ""),
-                        "moderation_results": row.get("moderation_results", ""),
-                        "moderation_results_verbatim": row.get(
-                            "moderation_results_verbatim", ""
-                        ),
-                        "demographics": row.get("demographics", ""),
-                        "demographics_verbatim": row.get("demographics_verbatim", ""),
-                        "recruitment_source": row.get("recruitment_source", ""),
-                        "recruitment_source_verbatim": row.get(
-                            "recruitment_source_verbatim", ""
-                        ),
-                        "sample_size": row.get("sample_size", ""),
-                        "sample_size_verbatim": row.get("sample_size_verbatim", ""),
-                        "country_region": row.get("country_region", ""),
-                        "temporal_context": row.get("temporal_context", ""),
-                        "gdp_per_capita_usd": row.get("gdp_per_capita_usd", ""),
-                        "gini_coefficient": row.get("gini_coefficient", ""),
-                        "income_group": row.get("income_group", ""),
-                        "study_language": row.get("study_language", ""),
-                        "platform_language_optimization": row.get(
-                            "platform_language_optimization", ""
-                        ),
-                        "traditional_media_strength": row.get(
-                            "traditional_media_strength", ""
-                        ),
-                        "electoral_proximity": row.get("electoral_proximity", ""),
-                        "recommended_moderators": row.get("recommended_moderators", ""),
-                        "research_context": row.get("research_context", ""),
-                        "intervention_insights": row.get("intervention_insights", ""),
-                        # Context / system metrics
-                        "democracy": row.get("democracy", ""),
-                        "press_freedom": row.get("press_freedom", ""),
-                        "internet_freedom": row.get("internet_freedom", ""),
-                        "internet_penetration": row.get("internet_penetration", ""),
-                        "governance": row.get("governance", ""),
-                        "polarization": row.get("polarization", ""),
-                        "deliberative_democracy": row.get("polarization", ""),
-                        "economic_performance": row.get("economic_performance", ""),
-                        "election_period": row.get("election_period", ""),
-                        "covid_period": row.get("covid_period", ""),
-                        "high_salience_period": row.get("high_salience_period", ""),
-                        "interpersonal_trust": row.get("interpersonal_trust", ""),
-
-                        "ai_context_summary": row.get("ai_context_summary", ""),
-
-                        # Population / internet / platform metrics
-                        "population_million": row.get("population_million", ""),
-                        "internet_users_million": row.get("internet_users_million", ""),
-                        "social_media_users_million": row.get(
-                            "social_media_users_million", ""
-                        ),
-                        "youtube_users_million": row.get("youtube_users_million", ""),
-                        "facebook_users_million": row.get("facebook_users_million", ""),
-                        "instagram_users_million": row.get(
-                            "instagram_users_million", ""
-                        ),
-                        "x_users_million": row.get("x_users_million", ""),
-                        "tiktok_users_million": row.get("tiktok_users_million", ""),
-                        "linkedin_users_million": row.get("linkedin_users_million", ""),
-                        "messenger_users_million": row.get(
-                            "messenger_users_million", ""
-                        ),
-                        "snapchat_users_million": row.get("snapchat_users_million", ""),
-                        "pinterest_users_million": row.get(
-                            "pinterest_users_million", ""
-                        ),
-                    },
+            reused = sum(1 for position in reused_from if position >= 0)
+            if not reused:
+                previous = None
+            structures = _build_corpus_structures(
+                papers, fieldnames, row_digests, previous, reused_from
+            )
+            source = "csv"
+            if previous is not None:
+                source = "csv-incremental"
+                reuse = {
+                    "reused": reused,
+                    "parsed": len(papers) - reused,
+                    "removed": len(previous.papers) - reused,
                 }
+            _write_papers_snapshot(csv_path, stat, content_hash, structures)
 
-                papers_data.append(paper)
-
-        print(f"Successfully loaded {len(papers_data)} unique papers from CSV")
-        if papers_data:
-            print(f"First paper title: '{papers_data[0]['title']}'")
-        return papers_data
+        if store is not None:
+            if store.import_papers(structures[0], csv_path, stat, content_hash):
+                source = "sqlite-import"
+            corpus = _store_corpus(store, content_hash[:16], stat)
+        else:
+            corpus = CorpusSnapshot(
+                *structures, version=content_hash[:16], csv_mtime=stat.st_mtime
+            )
+        return _finish_corpus_load(corpus, source, started, reuse)
 
     except Exception as e:
         print(f"Error loading CSV: {e}")
@@ -486,6 +996,16 @@ SEARCH_CONTEXT_FEATURE_KEYS = (
     "ai_context_summary",
 )
 
+# Relevance ranking (BM25F) for sort=relevance: fields scored and their boosts (default 1.0).
+SEARCH_RANKED_FIELDS = ("title", "abstract") + SEARCH_CONTEXT_FEATURE_KEYS
+SEARCH_FIELD_BOOSTS = {
+    "title": 3.0,
+    "abstract": 1.5,
+    "country_region": 1.5,
+}
+BM25_K1 = 1.2
+BM25_B = 0.75
+
 # Normalized lowercase tokens -> substrings often used in country_region / text (for US ↔ United States, etc.)
 COUNTRY_TERM_ALIASES = {
     "us": (
@@ -581,24 +1101,30 @@ COUNTRY_MULTIWORD_PHRASES = (
 )
 
 
+def _compile_country_phrase_pattern():
+    """One alternation over COUNTRY_MULTIWORD_PHRASES (longest first, as listed)."""
+    alternatives = []
+    for phrase, canon in COUNTRY_MULTIWORD_PHRASES:
+        parts = phrase.split()
+        if canon not in COUNTRY_TERM_ALIASES or len(parts) < 2:
+            continue
+        alternatives.append(r"\s+".join(re.escape(p) for p in parts))
+    return re.compile(r"(?i)\b(?:" + "|".join(alternatives) + r")\b")
+
+
+_COUNTRY_PHRASE_RE = _compile_country_phrase_pattern()
+_COUNTRY_PHRASE_CANON = dict(COUNTRY_MULTIWORD_PHRASES)
+
+
 def _collapse_country_phrases(query: str) -> str:
     """Replace known multi-word country phrases with canonical tokens (same as typing US, UK, …)."""
     if not query or not str(query).strip():
         return ""
     q = " ".join(query.lower().split())
-    for phrase, canon in COUNTRY_MULTIWORD_PHRASES:
-        if canon not in COUNTRY_TERM_ALIASES:
-            continue
-        parts = phrase.split()
-        if len(parts) < 2:
-            continue
-        escaped = r"\s+".join(re.escape(p) for p in parts)
-        try:
-            q = re.sub(r"(?i)\b" + escaped + r"\b", " " + canon + " ", q)
-        except re.error:
-            continue
-        q = " ".join(q.split())
-    return q
+    q = _COUNTRY_PHRASE_RE.sub(
+        lambda m: " " + _COUNTRY_PHRASE_CANON[" ".join(m.group(0).split())] + " ", q
+    )
+    return " ".join(q.split())
 
 
 def _normalize_search_token(raw: str) -> str:
@@ -626,189 +1152,1491 @@ def _term_matches_haystack(term: str, haystack: str) -> bool:
     return term in haystack
 
 
-def _paper_search_text_blob(paper):
-    """Lowercase haystack for substring matching (title, abstract, authors, journal,
-    countries list, and selected contextual extracted_features)."""
+class PaperSearchDocument:
+    """Normalized (lowercase) search text for one paper, with field provenance.
+
+    ``text`` is the haystack that query terms are matched against;
+    ``field_starts[i]`` is the offset in ``text`` where ``field_names[i]`` begins.
+    """
+
+    __slots__ = ("text", "field_names", "field_starts")
+
+    def __init__(self, text, field_names, field_starts):
+        self.text = text
+        self.field_names = field_names
+        self.field_starts = field_starts
+
+    def field_spans(self):
+        """Yield ``(field_name, start, end)`` for each field in ``text``."""
+        ends = self.field_starts[1:] + [len(self.text) + 1]
+        for name, start, end in zip(self.field_names, self.field_starts, ends):
+            yield name, start, end - 1
+
+
+def _build_search_document(paper):
+    """Search document over title, abstract, authors, journal, countries list,
+    and selected contextual extracted_features."""
     extracted = paper.get("extracted_features") or {}
-    parts = [
-        paper.get("title") or "",
-        paper.get("abstract") or "",
-        " ".join(paper.get("authors") or []),
-        paper.get("journal") or "",
-        " ".join(str(c) for c in (paper.get("countries") or [])),
+    fields = [
+        ("title", paper.get("title") or ""),
+        ("abstract", paper.get("abstract") or ""),
+        ("authors", " ".join(paper.get("authors") or [])),
+        ("journal", paper.get("journal") or ""),
+        ("countries", " ".join(str(c) for c in (paper.get("countries") or []))),
     ]
     for key in SEARCH_CONTEXT_FEATURE_KEYS:
         val = extracted.get(key, "")
         if val is not None and str(val).strip():
-            parts.append(str(val))
-    return " ".join(parts).lower()
-
+            fields.append((key, str(val)))
 
-def search_papers(query="", filters=None):
-    """Search papers based on query and filters."""
-    if filters is None:
-        filters = {}
+    names, starts, parts = [], [], []
+    offset = 0
+    for name, value in fields:
+        value = value.lower()
+        names.append(name)
+        starts.append(offset)
+        parts.append(value)
+        offset += len(value) + 1
+    return PaperSearchDocument(" ".join(parts), tuple(names), starts)
 
-    results = papers_data.copy()
 
-    # Text search — title, abstract, authors, journal, countries, + context-related fields
-    if query:
-        collapsed = _collapse_country_phrases(query)
-        search_terms = [
-            t for t in (_normalize_search_token(w) for w in collapsed.split()) if t
-        ]
-        results = [
-            paper
-            for paper in results
-            if all(
-                _term_matches_haystack(term, _paper_search_text_blob(paper))
-                for term in search_terms
-            )
-        ]
+def _document_matched_fields(doc, terms):
+    """Source fields of a PaperSearchDocument in which any of ``terms`` match, in field order."""
+    matched = set()
+    for term in set(terms):
+        for name, start, end in doc.field_spans():
+            if name not in matched and _term_matches_haystack(term, doc.text[start:end]):
+                matched.add(name)
+    return [name for name in doc.field_names if name in matched]
 
-    # Apply filters
-    if filters.get("year_from"):
-        results = [
-            paper for paper in results if paper["year"] >= int(filters["year_from"])
-        ]
 
-    if filters.get("year_to"):
-        results = [
-            paper for paper in results if paper["year"] <= int(filters["year_to"])
-        ]
+def _paper_search_text_blob(paper):
+    """Lowercase haystack for substring matching (see ``_build_search_document``)."""
+    return _build_search_document(paper).text
 
-    if filters.get("journal"):
-        results = [
-            paper
-            for paper in results
-            if filters["journal"].lower() == paper["journal"].lower()
-        ]
 
-    if filters.get("country"):
-        results = [
-            paper
-            for paper in results
-            if filters["country"].lower()
-            in paper.get("extracted_features", {}).get("country_region", "").lower()
-        ]
+_WORD_RE = re.compile(r"\w+")
 
-    # Sort by year (most recent first) by default
-    results.sort(key=lambda x: x["year"], reverse=True)
+# Per-index memo of resolved query terms; cleared wholesale when it grows past this.
+SEARCH_TERM_CACHE_SIZE = 4096
 
-    return results
 
+_EMPTY_POSTINGS = np.empty(0, dtype=np.int32)
+# Column of each ranked field in PaperSearchIndex.field_lengths, and its boost.
+_RANKED_FIELD_CODES = {name: code for code, name in enumerate(SEARCH_RANKED_FIELDS)}
+_RANKED_FIELD_BOOSTS = np.array(
+    [SEARCH_FIELD_BOOSTS.get(name, 1.0) for name in SEARCH_RANKED_FIELDS],
+    dtype=np.float32,
+)
 
-def get_statistics():
-    """Get platform statistics."""
-    total_studies = sum(paper["sample_size"] for paper in papers_data)
-    total_countries = len(
-        set(country for paper in papers_data for country in paper["countries"])
-    )
-    methodologies = list(set(paper["methodology"] for paper in papers_data))
-    journals = list(set(paper["journal"] for paper in papers_data))
-    years = sorted(list(set(paper["year"] for paper in papers_data)), reverse=True)
 
-    return {
-        "totalPapers": len(papers_data),
-        "totalStudies": total_studies,
-        "totalCountries": total_countries,
-        "methodologies": methodologies,
-        "journals": journals,
-        "years": years,
-    }
+def _union_postings(postings):
+    """Sorted union of posting arrays."""
+    postings = [p for p in postings if len(p)]
+    if not postings:
+        return _EMPTY_POSTINGS
+    if len(postings) == 1:
+        return postings[0]
+    return np.unique(np.concatenate(postings))
 
 
-# Routes
-@app.route("/")
-def index():
-    """Home page."""
-    stats = get_statistics()
-    return render_template("index.html", stats=stats)
+def _field_posting_arrays(entry):
+    ids, codes, tfs = entry
+    return (
+        np.array(ids, dtype=np.int32),
+        np.array(codes, dtype=np.uint8),
+        np.array(tfs, dtype=np.float32),
+    )
 
 
-def _build_search_page_url(query, filters, page):
-    """URL for search results including pagination (page 1 omits ``page`` param)."""
-    params = []
-    if query:
-        params.append(("q", query))
-    for key in ("year_from", "year_to", "journal", "country"):
-        val = filters.get(key)
-        if val:
-            params.append((key, str(val)))
-    if page > 1:
-        params.append(("page", str(page)))
-    qs = urlencode(params)
-    return url_for("search") + ("?" + qs if qs else "")
+class PaperSearchIndex:
+    """In-memory inverted index over the search haystack of each paper.
 
+    Documents are addressed by their position in the ``papers`` list the
+    index was built from; postings are sorted ``int32`` arrays of those
+    positions. Matching reproduces ``_term_matches_haystack`` exactly:
 
-@app.route("/search")
-def search():
-    """Search page."""
-    query = request.args.get("q", "")
-    year_from = request.args.get("year_from", "")
-    year_to = request.args.get("year_to", "")
-    journal = request.args.get("journal", "")
-    country = request.args.get("country", "")
+    * short word terms (<= 3 chars) use exact token postings (``\\bterm\\b``);
+    * longer word terms use a trigram index over the token vocabulary to find
+      every token containing the term (substring match), then union postings;
+    * ``COUNTRY_TERM_ALIASES`` keys are resolved to document sets up front;
+    * anything else (terms with punctuation) narrows candidates through the
+      index and then verifies against the cached haystack.
 
-    filters = {
-        "year_from": year_from,
-        "year_to": year_to,
-        "journal": journal,
-        "country": country,
-    }
+    BM25F statistics for ``SEARCH_RANKED_FIELDS`` are kept as raw per-token
+    (doc id, field, term frequency) arrays plus a per-document field length
+    matrix, so they stay valid when documents are added or removed.
 
-    filters = {k: v for k, v in filters.items() if v}
+    Passing ``previous`` (the index of the prior corpus) and ``reused_from``
+    (for each paper, its position in ``previous.papers`` or -1) patches the
+    previous index instead of analysing every document again.
+    """
 
-    try:
-        page = max(1, int(request.args.get("page", "1")))
-    except ValueError:
-        page = 1
+    def __init__(self, papers, previous=None, reused_from=None):
+        self.papers = papers
+        self._term_cache = {}
+        if previous is None or not self._patch(previous, reused_from):
+            self._build()
+
+        avg_lengths = self.field_lengths.sum(axis=0) / (len(papers) or 1)
+        avg_lengths[avg_lengths == 0] = 1
+        self.length_norms = (
+            1 - BM25_B + BM25_B * self.field_lengths / avg_lengths
+        ).astype(np.float32)
+
+    def _build(self):
+        self.documents = [_build_search_document(p) for p in self.papers]
+        self.field_lengths = np.zeros(
+            (len(self.papers), len(SEARCH_RANKED_FIELDS)), dtype=np.float32
+        )
+        postings, field_postings = {}, {}
+        for doc_id, doc in enumerate(self.documents):
+            self._add_document(doc_id, doc, postings, field_postings)
+        self.token_postings = {
+            token: np.array(ids, dtype=np.int32) for token, ids in postings.items()
+        }
+        self.field_postings = {
+            token: _field_posting_arrays(entry) for token, entry in field_postings.items()
+        }
+        self.vocab_trigrams = {}
+        self._add_vocabulary(self.token_postings, set())
 
-    results_all = search_papers(query, filters)
-    total_results = len(results_all)
-    journals = sorted(list(set(p["journal"] for p in papers_data if p["journal"])))
+        self.haystacks = [doc.text for doc in self.documents]
+        self.all_docs = np.arange(len(self.papers), dtype=np.int32)
+        self.alias_postings = {
+            term: self._resolve_alias(term) for term in COUNTRY_TERM_ALIASES
+        }
 
-    if total_results == 0:
-        paginated_results = []
-        total_pages = 0
-        pagination = None
-        page = 1
-    else:
-        total_pages = max(
-            1, (total_results + SEARCH_RESULTS_PER_PAGE - 1) // SEARCH_RESULTS_PER_PAGE
+    def _patch(self, previous, reused_from):
+        """Derive this index from ``previous``; False if documents were reordered."""
+        reused_from = np.asarray(reused_from, dtype=np.int64)
+        kept_new = np.flatnonzero(reused_from >= 0)
+        kept_old = reused_from[kept_new]
+        if np.any(np.diff(kept_old) <= 0):
+            return False
+        remap = np.full(len(previous.papers), -1, dtype=np.int32)
+        remap[kept_old] = kept_new
+
+        self.documents = [
+            previous.documents[old] if old >= 0 else _build_search_document(paper)
+            for paper, old in zip(self.papers, reused_from.tolist())
+        ]
+        self.haystacks = [doc.text for doc in self.documents]
+        self.all_docs = np.arange(len(self.papers), dtype=np.int32)
+        added = np.flatnonzero(reused_from < 0).tolist()
+        self.field_lengths = np.zeros(
+            (len(self.papers), len(SEARCH_RANKED_FIELDS)), dtype=np.float32
         )
-        page = min(page, total_pages)
-        start = (page - 1) * SEARCH_RESULTS_PER_PAGE
-        paginated_results = results_all[start : start + SEARCH_RESULTS_PER_PAGE]
-        pagination = None
-        if total_pages > 1:
-            pagination = {
-                "page": page,
-                "total_pages": total_pages,
-                "prev_url": (
-                    _build_search_page_url(query, filters, page - 1)
-                    if page > 1
-                    else None
-                ),
-                "next_url": (
-                    _build_search_page_url(query, filters, page + 1)
-                    if page < total_pages
-                    else None
-                ),
-                "pages": [
-                    {
-                        "num": n,
-                        "url": _build_search_page_url(query, filters, n),
-                        "active": n == page,
-                    }
-                    for n in range(1, total_pages + 1)
-                ],
-            }
+        self.field_lengths[kept_new] = previous.field_lengths[kept_old]
+
+        token_postings = dict(previous.token_postings)
+        field_postings = dict(previous.field_postings)
+        if np.array_equal(kept_old, kept_new):
+            # Kept documents did not move: only postings of dropped ones change.
+            stale_tokens = set()
+            for old in np.flatnonzero(remap < 0).tolist():
+                stale_tokens.update(_WORD_RE.findall(previous.documents[old].text))
+        else:
+            stale_tokens = previous.token_postings
+        for token in stale_tokens:
+            ids = remap[previous.token_postings[token]]
+            token_postings[token] = ids[ids >= 0]
+            entry = previous.field_postings.get(token)
+            if entry is not None:
+                ids = remap[entry[0]]
+                keep = ids >= 0
+                field_postings[token] = (ids[keep], entry[1][keep], entry[2][keep])
+
+        added_postings, added_fields = {}, {}
+        for doc_id in added:
+            self._add_document(
+                doc_id, self.documents[doc_id], added_postings, added_fields
+            )
+        for token, ids in added_postings.items():
+            ids = np.array(ids, dtype=np.int32)
+            current = token_postings.get(token)
+            if current is not None and len(current):
+                ids = np.sort(np.concatenate((current, ids)))
+            token_postings[token] = ids
+        for token, entry in added_fields.items():
+            arrays = _field_posting_arrays(entry)
+            current = field_postings.get(token)
+            if current is not None and len(current[0]):
+                arrays = [np.concatenate(pair) for pair in zip(current, arrays)]
+                order = np.argsort(arrays[0], kind="stable")
+                arrays = tuple(a[order] for a in arrays)
+            field_postings[token] = arrays
+
+        for token in stale_tokens:
+            if not len(token_postings[token]):
+                del token_postings[token]
+                field_postings.pop(token, None)
+        self.token_postings = token_postings
+        self.field_postings = field_postings
+
+        # Tokens that disappeared stay in the trigram buckets; lookups skip them.
+        self.vocab_trigrams = dict(previous.vocab_trigrams)
+        self._add_vocabulary(
+            [t for t in added_postings if t not in previous.token_postings], set()
+        )
+
+        added_tokens = [set(_WORD_RE.findall(self.haystacks[d])) for d in added]
+        self.alias_postings = {}
+        for term, docs in previous.alias_postings.items():
+            docs = remap[docs]
+            docs = docs[docs >= 0]
+            extra = [
+                doc_id
+                for doc_id, tokens in zip(added, added_tokens)
+                if self._alias_matches(term, self.haystacks[doc_id], tokens)
+            ]
+            if extra:
+                docs = np.union1d(docs, np.array(extra, dtype=np.int32))
+            self.alias_postings[term] = docs
+        return True
+
+    def _add_document(self, doc_id, doc, postings, field_postings):
+        for token in set(_WORD_RE.findall(doc.text)):
+            postings.setdefault(token, []).append(doc_id)
+        for name, start, end in doc.field_spans():
+            code = _RANKED_FIELD_CODES.get(name)
+            if code is None:
+                continue
+            words = _WORD_RE.findall(doc.text, start, end)
+            self.field_lengths[doc_id, code] = len(words)
+            for token, tf in Counter(words).items():
+                ids, codes, tfs = field_postings.setdefault(token, ([], [], []))
+                ids.append(doc_id)
+                codes.append(code)
+                tfs.append(tf)
+
+    def _add_vocabulary(self, tokens, copied):
+        """Add ``tokens`` to the trigram buckets, copying shared buckets before writing."""
+        vocab_trigrams = self.vocab_trigrams
+        for token in tokens:
+            if len(token) < 3:
+                continue
+            for i in range(len(token) - 2):
+                gram = token[i : i + 3]
+                if gram not in copied:
+                    vocab_trigrams[gram] = set(vocab_trigrams.get(gram, ()))
+                    copied.add(gram)
+                vocab_trigrams[gram].add(token)
+
+    def _tokens_containing(self, fragment):
+        """Vocabulary tokens that contain ``fragment`` as a substring."""
+        if len(fragment) < 3:
+            return [t for t in self.token_postings if fragment in t]
+        grams = [fragment[i : i + 3] for i in range(len(fragment) - 2)]
+        buckets = [self.vocab_trigrams.get(g) for g in grams]
+        if not all(buckets):
+            return []
+        buckets.sort(key=len)
+        candidates = buckets[0].intersection(*buckets[1:])
+        return [t for t in candidates if fragment in t and t in self.token_postings]
+
+    def _docs_with_substring_token(self, fragment):
+        return _union_postings(
+            [self.token_postings[t] for t in self._tokens_containing(fragment)]
+        )
+
+    def _verify(self, text, predicate):
+        """Narrow by the word parts of ``text``, then check ``predicate`` on each haystack."""
+        candidates = self.all_docs
+        for part in set(_WORD_RE.findall(text)):
+            if len(part) < 3:
+                # Too unselective to be worth a postings union; the predicate decides.
+                continue
+            candidates = np.intersect1d(
+                candidates, self._docs_with_substring_token(part), assume_unique=True
+            )
+            if not len(candidates):
+                return _EMPTY_POSTINGS
+        haystacks = self.haystacks
+        return np.array(
+            [d for d in candidates.tolist() if predicate(haystacks[d])], dtype=np.int32
+        )
+
+    def _resolve_alias(self, term):
+        found = [self.token_postings.get(term, _EMPTY_POSTINGS)]
+        if not _WORD_RE.fullmatch(term):
+            found.append(
+                self._verify(term, lambda h: _term_matches_haystack(term, h))
+            )
+        for phrase in COUNTRY_TERM_ALIASES[term]:
+            found.append(self._verify(phrase, lambda h, p=phrase: p in h))
+        return _union_postings(found)
+
+    @staticmethod
+    def _alias_matches(term, haystack, tokens):
+        """Whether one document belongs to ``_resolve_alias(term)``."""
+        if term in tokens:
+            return True
+        if not _WORD_RE.fullmatch(term) and _term_matches_haystack(term, haystack):
+            return True
+        return any(phrase in haystack for phrase in COUNTRY_TERM_ALIASES[term])
+
+    def match(self, term):
+        """Sorted ids of documents whose haystack matches one normalized query term."""
+        if not term:
+            return self.all_docs
+        if term in COUNTRY_TERM_ALIASES:
+            return self.alias_postings[term]
+        cached = self._term_cache.get(term)
+        if cached is not None:
+            return cached
+        if _WORD_RE.fullmatch(term):
+            if len(term) <= 3:
+                docs = self.token_postings.get(term, _EMPTY_POSTINGS)
+            else:
+                docs = self._docs_with_substring_token(term)
+        else:
+            docs = self._verify(term, lambda h: _term_matches_haystack(term, h))
+        if len(self._term_cache) >= SEARCH_TERM_CACHE_SIZE:
+            self._term_cache.clear()
+        self._term_cache[term] = docs
+        return docs
+
+    def matched_fields(self, doc_id, terms):
+        """Source fields of ``doc_id`` in which any of ``terms`` match, in field order."""
+        return _document_matched_fields(self.documents[doc_id], terms)
+
+    def _term_tokens(self, term):
+        """Vocabulary tokens that count towards a query term's frequency."""
+        if term in COUNTRY_TERM_ALIASES:
+            texts = (term,) + COUNTRY_TERM_ALIASES[term]
+            return {t for text in texts for t in _WORD_RE.findall(text)}
+        if _WORD_RE.fullmatch(term):
+            return [term] if len(term) <= 3 else self._tokens_containing(term)
+        return set(_WORD_RE.findall(term))
+
+    def rank(self, doc_ids, terms, k):
+        """Top ``k`` of ``doc_ids`` by BM25F score (ties: most recent, then corpus order).
+
+        Only the postings of ``doc_ids`` are scored, so the work follows the
+        number of matches rather than the corpus size. BM25F has no cheap
+        upper bound per document here, so every match gets a score; the
+        ``k`` highest are then picked with a partial sort and ordered by a
+        heap over the ``k`` (plus ties), the same selection as ``limit``.
+        """
+        candidates = np.unique(np.asarray(doc_ids, dtype=np.int32))
+        if k <= 0 or not len(candidates):
+            return []
+        num_docs = len(self.papers)
+        scores = np.zeros(len(candidates), dtype=np.float32)
+        for term in set(terms):
+            df = len(self.match(term))
+            if not df:
+                continue
+            idf = math.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+            tf = np.zeros(len(candidates), dtype=np.float32)
+            for token in self._term_tokens(term):
+                entry = self.field_postings.get(token)
+                if entry is None:
+                    continue
+                ids, codes, tfs = entry
+                positions = np.searchsorted(candidates, ids)
+                positions[positions == len(candidates)] = 0
+                hit = candidates[positions] == ids
+                if not hit.any():
+                    continue
+                ids, codes = ids[hit], codes[hit]
+                weights = _RANKED_FIELD_BOOSTS[codes] * tfs[hit] / self.length_norms[ids, codes]
+                tf += np.bincount(
+                    positions[hit], weights=weights, minlength=len(candidates)
+                ).astype(np.float32)
+            scores += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1)
+
+        if k < len(candidates):
+            # Keep everything tied with the k-th score so the tie-breakers decide
+            threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+            keep = np.flatnonzero(scores >= threshold)
+        else:
+            keep = np.arange(len(candidates))
+        papers = self.papers
+        top = heapq.nlargest(
+            k,
+            zip(scores[keep].tolist(), candidates[keep].tolist()),
+            key=lambda sd: (sd[0], papers[sd[1]]["year"], -sd[1]),
+        )
+        return [d for _, d in top]
+
+    def search(self, terms):
+        """Ids of documents matching every term, in corpus order."""
+        if not terms:
+            return list(range(len(self.papers)))
+        postings = sorted((self.match(t) for t in set(terms)), key=len)
+        docs = postings[0]
+        for other in postings[1:]:
+            if not len(docs):
+                break
+            docs = np.intersect1d(docs, other, assume_unique=True)
+        return docs.tolist()
+
+
+@lru_cache(maxsize=2048)
+def _search_terms(query):
+    """Normalized query tokens after collapsing multi-word country phrases."""
+    collapsed = _collapse_country_phrases(query)
+    return tuple(
+        t for t in (_normalize_search_token(w) for w in collapsed.split()) if t
+    )
+
+
+# Search result cache: matching doc ids per (query terms, filters); flushed on CSV reload.
+SEARCH_CACHE_MAX_ENTRIES = 512
+SEARCH_CACHE_MAX_DOC_IDS = 2_000_000
+SEARCH_CACHE_TTL_SECONDS = 600
+
+
+class SearchResultCache:
+    """Thread-safe LRU cache with a TTL, bounded by entries and total stored doc ids."""
+
+    def __init__(self, max_entries, max_doc_ids, ttl_seconds):
+        self.max_entries = max_entries
+        self.max_doc_ids = max_doc_ids
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._doc_id_count = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.flushes = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+                self._discard(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, doc_ids):
+        doc_ids = array("i", doc_ids)
+        if len(doc_ids) > self.max_doc_ids:
+            return doc_ids
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (time.monotonic(), doc_ids)
+            self._doc_id_count += len(doc_ids)
+            while (
+                len(self._entries) > self.max_entries
+                or self._doc_id_count > self.max_doc_ids
+            ):
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+        return doc_ids
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._doc_id_count = 0
+            self.flushes += 1
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._doc_id_count -= len(entry[1])
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "doc_ids": self._doc_id_count,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "flushes": self.flushes,
+            }
+
+
+_search_result_cache = SearchResultCache(
+    SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_MAX_DOC_IDS, SEARCH_CACHE_TTL_SECONDS
+)
+
+
+SEARCH_FILTER_KEYS = ("year_from", "year_to", "journal", "country")
+
+
+def normalize_search_filters(filters):
+    """The filters that affect matching, as stripped lowercase strings; empty ones are dropped.
+
+    In-memory search normalizes once and hands this same dict to the result
+    cache key and ``PaperColumns.filter_mask``, so a cached entry always holds
+    what the filters it is keyed on select; ``SqlitePaperStore`` queries
+    normalize their filters the same way.
+    """
+    filters = filters or {}
+    normalized = {}
+    for key in SEARCH_FILTER_KEYS:
+        value = str(filters.get(key) or "").strip().lower()
+        if value:
+            normalized[key] = value
+    return normalized
+
+
+def _search_cache_key(terms, filters):
+    """Cache key: collapsed, normalized query terms plus normalized filters."""
+    filter_items = tuple((key, filters[key]) for key in SEARCH_FILTER_KEYS if key in filters)
+    return tuple(sorted(set(terms))), filter_items
+
+
+def search_match_hints(corpus, query, papers):
+    """Map paper id -> fields the query matched in (for "Matched in: …" hints)."""
+    terms = _search_terms(query) if query else []
+    if not terms:
+        return {}
+    hints = {}
+    for paper in papers:
+        if corpus.store is not None:
+            # No per-process documents: rebuild the one for this result row
+            doc = _build_search_document(paper)
+            hints[paper["id"]] = _document_matched_fields(doc, terms)
+            continue
+        doc_id = corpus.lookup.positions.get(paper["id"])
+        if doc_id is not None:
+            hints[paper["id"]] = corpus.index.matched_fields(doc_id, terms)
+    return hints
+
+
+class CategoricalColumn:
+    """Interned category values plus one int32 code per paper."""
+
+    def __init__(self, values):
+        codes_by_value = {}
+        self.categories = []
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            code = codes_by_value.get(value)
+            if code is None:
+                code = codes_by_value[value] = len(self.categories)
+                self.categories.append(sys.intern(value))
+            codes[i] = code
+        self.codes = codes
+        self.lower_categories = [c.lower() for c in self.categories]
+
+    def mask_where(self, predicate):
+        """Boolean mask of papers whose (lowercase) category satisfies ``predicate``."""
+        matching = [i for i, c in enumerate(self.lower_categories) if predicate(c)]
+        return np.isin(self.codes, matching)
+
+
+class PaperColumns:
+    """Columnar copies of the filtered fields, for vectorized filters and aggregate statistics.
+
+    This accelerates filters; it does not replace the paper dicts, which
+    templates and ``jsonify`` still consume, so it adds memory (about 30
+    bytes per paper: the numeric arrays and category codes) rather than
+    saving it. Rows line up with document ids in ``PaperSearchIndex``.
+    """
+
+    def __init__(self, papers):
+        self.papers = papers
+        self.year = np.fromiter(
+            (p["year"] for p in papers), dtype=np.int32, count=len(papers)
+        )
+        self.sample_size = np.fromiter(
+            (p["sample_size"] for p in papers), dtype=np.int64, count=len(papers)
+        )
+        features = [p.get("extracted_features") or {} for p in papers]
+        self.journal = CategoricalColumn([p["journal"] for p in papers])
+        self.methodology = CategoricalColumn([p["methodology"] for p in papers])
+        self.income_group = CategoricalColumn([f.get("income_group", "") for f in features])
+        self.country_region = CategoricalColumn(
+            [f.get("country_region", "") for f in features]
+        )
+
+    def filter_mask(self, filters):
+        """Boolean mask over all papers for ``normalize_search_filters`` output, or None."""
+        mask = None
+
+        def combine(current, new):
+            return new if current is None else current & new
+
+        if filters.get("year_from"):
+            mask = combine(mask, self.year >= int(filters["year_from"]))
+
+        if filters.get("year_to"):
+            mask = combine(mask, self.year <= int(filters["year_to"]))
+
+        if filters.get("journal"):
+            journal = filters["journal"]
+            mask = combine(mask, self.journal.mask_where(lambda c: c == journal))
+
+        if filters.get("country"):
+            country = filters["country"]
+            mask = combine(mask, self.country_region.mask_where(lambda c: country in c))
+
+        return mask
+
+
+class PaperLookup:
+    """Hash indexes over a list of papers: id, paper_key and lowercase DOI -> paper."""
+
+    def __init__(self, papers):
+        self.papers = papers
+        self.by_id = {}
+        self.by_key = {}
+        self.by_doi = {}
+        self.positions = {}
+        for position, paper in enumerate(papers):
+            self.by_id.setdefault(paper["id"], paper)
+            self.by_key.setdefault(paper["paper_key"], paper)
+            if paper.get("doi"):
+                self.by_doi.setdefault(paper["doi"].lower(), paper)
+            self.positions.setdefault(paper["id"], position)
+
+    def get_many(self, paper_ids):
+        """Papers for ``paper_ids`` (unknown ids skipped), in corpus order."""
+        found = {pid: self.by_id[pid] for pid in paper_ids if pid in self.by_id}
+        return sorted(found.values(), key=lambda p: self.positions[p["id"]])
+
+    def find_by_doi_in(self, text):
+        """Paper whose DOI appears in free text (citation, upload form), if any."""
+        doi = extract_doi(text)
+        return self.by_doi.get(doi.lower()) if doi else None
+
+
+def _filter_doc_ids(columns, doc_ids, filters):
+    """Apply year/journal/country filters to a list of document ids."""
+    mask = columns.filter_mask(filters)
+    if mask is None:
+        return doc_ids
+    ids = np.asarray(doc_ids, dtype=np.int64)
+    return ids[mask[ids]].tolist()
+
+
+def _search_doc_ids(corpus, query, filters):
+    """Query terms and matching (filtered) document ids of ``corpus``, in corpus order.
+
+    The ids come from ``_search_result_cache`` when the same normalized query
+    and filters were seen for this corpus version.
+    """
+    filters = normalize_search_filters(filters)
+    terms = _search_terms(query) if query else ()
+
+    key = (corpus.version,) + _search_cache_key(terms, filters)
+    doc_ids = _search_result_cache.get(key)
+    if doc_ids is None:
+        # Text search — title, abstract, authors, journal, countries, + context-related fields
+        doc_ids = corpus.index.search(terms)
+        doc_ids = _filter_doc_ids(corpus.columns, doc_ids, filters)
+        doc_ids = _search_result_cache.put(key, doc_ids)
+    return terms, doc_ids
+
+
+def _top_doc_ids(index, terms, doc_ids, sort_by, k):
+    """First ``k`` of ``doc_ids`` in result order, via a top-k heap."""
+    if sort_by == "relevance" and terms:
+        return index.rank(doc_ids, terms, k)
+    # Most recent first; ties keep corpus order (same as a stable sort by year)
+    papers = index.papers
+    return heapq.nsmallest(k, doc_ids, key=lambda d: (-papers[d]["year"], d))
+
+
+def search_papers(query="", filters=None, sort_by="year", limit=None, corpus=None):
+    """Search papers based on query and filters.
+
+    ``sort_by="relevance"`` ranks matches by BM25F (only when there is a query);
+    anything else sorts by year, most recent first. ``limit`` keeps only the
+    top results, selected with a heap instead of sorting every match.
+    ``corpus`` defaults to the currently published snapshot.
+    """
+    corpus = corpus or get_corpus()
+    if corpus.store is not None:
+        terms = _search_terms(query) if query else ()
+        return corpus.store.search(terms, filters, sort_by, limit)
+    index = corpus.index
+    terms, doc_ids = _search_doc_ids(corpus, query, filters)
+    if limit is None:
+        if sort_by == "relevance" and terms:
+            doc_ids = index.rank(doc_ids, terms, len(doc_ids))
+        else:
+            doc_ids = sorted(doc_ids, key=lambda d: index.papers[d]["year"], reverse=True)
+    else:
+        doc_ids = _top_doc_ids(index, terms, doc_ids, sort_by, limit)
+    return [index.papers[d] for d in doc_ids]
+
+
+def search_papers_page(
+    query="",
+    filters=None,
+    sort_by="year",
+    page=1,
+    per_page=SEARCH_RESULTS_PER_PAGE,
+    corpus=None,
+):
+    """Return ``(total, page, papers)`` for one page of search results.
+
+    Only the top ``page * per_page`` matches are selected (heap), so a page
+    never materializes or sorts the full result list. ``page`` is clamped to
+    the last page that has results.
+    """
+    corpus = corpus or get_corpus()
+    if corpus.store is not None:
+        terms = _search_terms(query) if query else ()
+        total = corpus.store.count(terms, filters)
+        if total == 0:
+            return 0, 1, []
+        total_pages = (total + per_page - 1) // per_page
+        page = min(max(1, page), total_pages)
+        offset = (page - 1) * per_page
+        return total, page, corpus.store.search(terms, filters, sort_by, per_page, offset)
+    index = corpus.index
+    terms, doc_ids = _search_doc_ids(corpus, query, filters)
+    total = len(doc_ids)
+    if total == 0:
+        return 0, 1, []
+    total_pages = (total + per_page - 1) // per_page
+    page = min(max(1, page), total_pages)
+    top = _top_doc_ids(index, terms, doc_ids, sort_by, page * per_page)
+    return total, page, [index.papers[d] for d in top[(page - 1) * per_page :]]
+
+
+# Optional on-disk corpus (PAPERS_BACKEND=sqlite): records live in normalized tables of
+# data/output/corpus.db with an FTS5 index, shared by every worker process. This
+# trades speed for memory: queries are slower than the in-memory index.
+PAPERS_BACKEND = (os.environ.get("PAPERS_BACKEND") or "memory").strip().lower()
+CORPUS_DB_PATH = CORPUS_OUTPUT_DIR / "corpus.db"
+# Bump when the corpus.db schema changes; databases in an older format are rebuilt.
+CORPUS_DB_FORMAT = 2
+# Papers loaded per IN (...) query when materializing records.
+CORPUS_DB_FETCH_CHUNK = 500
+
+# FTS columns: one per ranked field, plus the unranked rest of the search haystack.
+_FTS_COLUMNS = SEARCH_RANKED_FIELDS + ("other",)
+_FTS_BM25_WEIGHTS = ", ".join(
+    str(SEARCH_FIELD_BOOSTS.get(name, 1.0)) for name in SEARCH_RANKED_FIELDS
+) + ", 0.0"
+
+_CORPUS_DB_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS corpus_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS papers (
+        doc_id INTEGER PRIMARY KEY,
+        id TEXT NOT NULL UNIQUE,
+        paper_key TEXT NOT NULL,
+        title TEXT NOT NULL,
+        title_verbatim TEXT,
+        authors_verbatim TEXT,
+        journal TEXT,
+        journal_verbatim TEXT,
+        journal_lower TEXT,
+        year INTEGER,
+        citation TEXT,
+        doi TEXT,
+        doi_lower TEXT,
+        abstract TEXT,
+        abstract_verbatim TEXT,
+        ai_context_summary TEXT,
+        sample_size INTEGER,
+        methodology TEXT,
+        research_type TEXT,
+        impact_factor INTEGER,
+        keywords_json TEXT,
+        country_region_lower TEXT,
+        haystack TEXT NOT NULL,
+        authors_json TEXT NOT NULL,
+        countries_json TEXT NOT NULL,
+        features_json TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_papers_paper_key ON papers (paper_key)",
+    "CREATE INDEX IF NOT EXISTS idx_papers_doi ON papers (doi_lower)",
+    "CREATE INDEX IF NOT EXISTS idx_papers_year ON papers (year DESC, doc_id)",
+    "CREATE INDEX IF NOT EXISTS idx_papers_journal ON papers (journal_lower)",
+    """
+    CREATE TABLE IF NOT EXISTS paper_authors (
+        doc_id INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        PRIMARY KEY (doc_id, position)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS paper_countries (
+        doc_id INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        country TEXT NOT NULL,
+        PRIMARY KEY (doc_id, position)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS paper_features (
+        doc_id INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        value TEXT,
+        PRIMARY KEY (doc_id, position)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_paper_features_name ON paper_features (name, value)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5({}, tokenize='trigram')".format(
+        ", ".join(_FTS_COLUMNS)
+    ),
+)
+_CORPUS_DB_TABLES = (
+    "papers_fts",
+    "paper_features",
+    "paper_countries",
+    "paper_authors",
+    "papers",
+    "corpus_meta",
+)
+
+
+def _sqlite_fts5_trigram_available():
+    """Whether this SQLite build has FTS5 with the trigram tokenizer (3.34+)."""
+    try:
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE VIRTUAL TABLE probe USING fts5(x, tokenize='trigram')")
+        conn.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+def _fts_phrase(text):
+    """FTS5 string literal matching ``text`` as a substring (trigram tokenizer)."""
+    return '"' + text.replace('"', '""') + '"'
+
+
+# Columns read to build a record (the haystack is only needed inside queries)
+_CORPUS_DB_RECORD_COLUMNS = (
+    "doc_id, id, paper_key, title, title_verbatim, authors_verbatim, journal, journal_verbatim, "
+    "year, citation, doi, abstract, abstract_verbatim, ai_context_summary, sample_size, "
+    "methodology, research_type, impact_factor, keywords_json, authors_json, countries_json, "
+    "features_json"
+)
+
+
+class SqlitePaperStore:
+    """Paper records in corpus.db, searched and filtered with indexed SQL queries.
+
+    ``doc_id`` is the paper's position in the CSV load, so "corpus order" is
+    ``ORDER BY doc_id``. Text matching keeps the semantics of
+    ``_term_matches_haystack``: terms of three or more characters narrow the
+    candidates through the trigram FTS index (substring match), and every
+    term is then verified against the stored haystack with the same Python
+    predicate, registered as the ``term_matches`` SQL function.
+
+    Each thread uses its own connection; the database is in WAL mode, so
+    readers in any worker keep a consistent view while another worker
+    imports a new CSV version.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        self._ensure_schema(conn)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.create_function(
+                "term_matches", 2, _term_matches_haystack, deterministic=True
+            )
+            self._local.conn = conn
+        return conn
+
+    def _ensure_schema(self, conn):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tables = {
+                row[0]
+                for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            }
+            fmt = None
+            if "corpus_meta" in tables:
+                row = conn.execute(
+                    "SELECT value FROM corpus_meta WHERE key = 'format'"
+                ).fetchone()
+                fmt = row[0] if row else None
+            if fmt != str(CORPUS_DB_FORMAT):
+                for table in _CORPUS_DB_TABLES:
+                    conn.execute(f"DROP TABLE IF EXISTS {table}")
+                for statement in _CORPUS_DB_SCHEMA:
+                    conn.execute(statement)
+                conn.execute(
+                    "INSERT INTO corpus_meta (key, value) VALUES ('format', ?)",
+                    (str(CORPUS_DB_FORMAT),),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _source(self, conn=None):
+        row = (conn or self._connection()).execute(
+            "SELECT value FROM corpus_meta WHERE key = 'source'"
+        ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def version(self):
+        return (self._source().get("sha256") or "")[:16]
+
+    def holds(self, csv_path, stat):
+        """Whether the database was imported from this CSV version (path, size, mtime) by this code."""
+        source = self._source()
+        return (
+            source.get("code_version") == _SNAPSHOT_CODE_VERSION
+            and source.get("csv_path") == str(csv_path)
+            and source.get("size") == stat.st_size
+            and source.get("mtime") == stat.st_mtime
+        )
+
+    def import_papers(self, papers, csv_path, stat, content_hash):
+        """Replace the stored corpus with ``papers`` in one transaction.
+
+        Returns False (only the source header is refreshed) when the database
+        already holds this CSV content, e.g. another worker imported it first.
+        """
+        conn = self._connection()
+        header = _snapshot_header(csv_path, stat, content_hash)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            source = self._source(conn)
+            imported = not (
+                source.get("sha256") == content_hash
+                and source.get("code_version") == _SNAPSHOT_CODE_VERSION
+            )
+            if imported:
+                for table in _CORPUS_DB_TABLES[:-1]:
+                    conn.execute(f"DELETE FROM {table}")
+                self._insert_papers(conn, papers)
+            conn.execute(
+                "INSERT OR REPLACE INTO corpus_meta (key, value) VALUES ('source', ?)",
+                (json.dumps(header),),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return imported
+
+    @staticmethod
+    def _insert_papers(conn, papers):
+        paper_rows, author_rows, country_rows, feature_rows, fts_rows = [], [], [], [], []
+        for doc_id, paper in enumerate(papers):
+            features = paper.get("extracted_features") or {}
+            doc = _build_search_document(paper)
+            paper_rows.append(
+                (
+                    doc_id,
+                    paper["id"],
+                    paper["paper_key"],
+                    paper["title"],
+                    paper.get("title_verbatim"),
+                    paper.get("authors_verbatim"),
+                    paper.get("journal"),
+                    paper.get("journal_verbatim"),
+                    (paper.get("journal") or "").lower(),
+                    paper["year"],
+                    paper.get("citation"),
+                    paper.get("doi"),
+                    paper["doi"].lower() if paper.get("doi") else None,
+                    paper.get("abstract"),
+                    paper.get("abstract_verbatim"),
+                    paper.get("ai_context_summary"),
+                    paper["sample_size"],
+                    paper.get("methodology"),
+                    paper.get("research_type"),
+                    paper.get("impact_factor"),
+                    json.dumps(paper.get("keywords") or []),
+                    (features.get("country_region") or "").lower(),
+                    doc.text,
+                    json.dumps(paper.get("authors") or []),
+                    json.dumps([str(c) for c in paper.get("countries") or []]),
+                    json.dumps(features),
+                )
+            )
+            author_rows.extend(
+                (doc_id, i, name) for i, name in enumerate(paper.get("authors") or [])
+            )
+            country_rows.extend(
+                (doc_id, i, str(c)) for i, c in enumerate(paper.get("countries") or [])
+            )
+            feature_rows.extend(
+                (doc_id, i, name, value) for i, (name, value) in enumerate(features.items())
+            )
+            ranked, other = {}, []
+            for name, start, end in doc.field_spans():
+                if name in _RANKED_FIELD_CODES:
+                    ranked[name] = doc.text[start:end]
+                else:
+                    other.append(doc.text[start:end])
+            fts_rows.append(
+                (doc_id,)
+                + tuple(ranked.get(name, "") for name in SEARCH_RANKED_FIELDS)
+                + (" ".join(other),)
+            )
+
+        conn.executemany(
+            "INSERT INTO papers VALUES ({})".format(", ".join("?" * 26)), paper_rows
+        )
+        conn.executemany("INSERT INTO paper_authors VALUES (?, ?, ?)", author_rows)
+        conn.executemany("INSERT INTO paper_countries VALUES (?, ?, ?)", country_rows)
+        conn.executemany("INSERT INTO paper_features VALUES (?, ?, ?, ?)", feature_rows)
+        conn.executemany(
+            "INSERT INTO papers_fts (rowid, {}) VALUES (?, {})".format(
+                ", ".join(_FTS_COLUMNS), ", ".join("?" * len(_FTS_COLUMNS))
+            ),
+            fts_rows,
+        )
+
+    @staticmethod
+    def _record(row):
+        return {
+            "id": row["id"],
+            "paper_key": row["paper_key"],
+            "title": row["title"],
+            "title_verbatim": row["title_verbatim"],
+            "authors": json.loads(row["authors_json"]),
+            "authors_verbatim": row["authors_verbatim"],
+            "journal": row["journal"],
+            "journal_verbatim": row["journal_verbatim"],
+            "year": row["year"],
+            "citation": row["citation"],
+            "doi": row["doi"],
+            "abstract": row["abstract"],
+            "abstract_verbatim": row["abstract_verbatim"],
+            "ai_context_summary": row["ai_context_summary"],
+            "sample_size": row["sample_size"],
+            "countries": json.loads(row["countries_json"]),
+            "methodology": row["methodology"],
+            "research_type": row["research_type"],
+            "impact_factor": row["impact_factor"],
+            "keywords": json.loads(row["keywords_json"]),
+            "extracted_features": json.loads(row["features_json"]),
+        }
+
+    def load(self, doc_ids):
+        """Paper records for ``doc_ids``, in that order (unknown ids skipped).
+
+        One query per CORPUS_DB_FETCH_CHUNK papers; authors, countries and
+        features come from the JSON copies on the papers row rather than
+        from their (per-value) tables.
+        """
+        conn = self._connection()
+        records = {}
+        doc_ids = list(doc_ids)
+        for start in range(0, len(doc_ids), CORPUS_DB_FETCH_CHUNK):
+            chunk = doc_ids[start : start + CORPUS_DB_FETCH_CHUNK]
+            marks = ", ".join("?" * len(chunk))
+            for row in conn.execute(
+                f"SELECT {_CORPUS_DB_RECORD_COLUMNS} FROM papers WHERE doc_id IN ({marks})", chunk
+            ):
+                records[row["doc_id"]] = self._record(row)
+        return [records[d] for d in doc_ids if d in records]
+
+    def doc_ids_where(self, column, values):
+        """doc_ids of papers whose ``column`` is one of ``values``, in corpus order."""
+        values = list(values)
+        if not values:
+            return []
+        marks = ", ".join("?" * len(values))
+        return [
+            row[0]
+            for row in self._connection().execute(
+                f"SELECT doc_id FROM papers WHERE {column} IN ({marks}) ORDER BY doc_id",
+                values,
+            )
+        ]
+
+    def count(self, terms=(), filters=None):
+        source, where, params, _ = self._query(terms, normalize_search_filters(filters))
+        return self._connection().execute(
+            f"SELECT COUNT(*) FROM {source} {where}", params
+        ).fetchone()[0]
+
+    def matching_doc_ids(self, terms=(), filters=None):
+        """doc_ids of every paper matching the terms and filters, in corpus order."""
+        source, where, params, _ = self._query(terms, normalize_search_filters(filters))
+        return [
+            row[0]
+            for row in self._connection().execute(
+                f"SELECT p.doc_id FROM {source} {where} ORDER BY p.doc_id", params
+            )
+        ]
+
+    def search(self, terms=(), filters=None, sort_by="year", limit=None, offset=0):
+        """Papers matching every term and the filters, one ``limit``/``offset`` window.
+
+        ``sort_by="relevance"`` orders by the FTS5 BM25 score with
+        ``SEARCH_FIELD_BOOSTS`` as column weights; this needs at least one
+        term the FTS index can match (three or more characters, not a country
+        alias), otherwise results fall back to most recent first.
+        """
+        source, where, params, ranked = self._query(terms, normalize_search_filters(filters))
+        order = "p.year DESC, p.doc_id"
+        if sort_by == "relevance" and ranked:
+            order = f"bm25(papers_fts, {_FTS_BM25_WEIGHTS}), " + order
+        rows = self._connection().execute(
+            f"SELECT p.doc_id FROM {source} {where} ORDER BY {order} LIMIT ? OFFSET ?",
+            params + [-1 if limit is None else limit, offset],
+        )
+        return self.load(row[0] for row in rows)
+
+    @staticmethod
+    def _query(terms, filters):
+        """``(from, where, params, uses_fts)`` for a search over ``papers p``."""
+        clauses, params = [], []
+        if filters.get("year_from"):
+            clauses.append("p.year >= ?")
+            params.append(int(filters["year_from"]))
+        if filters.get("year_to"):
+            clauses.append("p.year <= ?")
+            params.append(int(filters["year_to"]))
+        if filters.get("journal"):
+            clauses.append("p.journal_lower = ?")
+            params.append(filters["journal"])
+        if filters.get("country"):
+            clauses.append("instr(p.country_region_lower, ?) > 0")
+            params.append(filters["country"])
+
+        phrases = []
+        for term in sorted(set(terms)):
+            if term not in COUNTRY_TERM_ALIASES and len(term) >= 3:
+                phrases.append(_fts_phrase(term))
+            clauses.append("term_matches(?, p.haystack)")
+            params.append(term)
+
+        source = "papers p"
+        if phrases:
+            source = "papers_fts JOIN papers p ON p.doc_id = papers_fts.rowid"
+            clauses.insert(0, "papers_fts MATCH ?")
+            params.insert(0, " AND ".join(phrases))
+        where = "WHERE " + " AND ".join(clauses) if clauses else ""
+        return source, where, params, bool(phrases)
+
+    def statistics(self):
+        """Same shape as ``get_statistics``; categories in corpus (first seen) order."""
+        conn = self._connection()
+        total_papers, total_studies = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(sample_size), 0) FROM papers"
+        ).fetchone()
+        total_countries = conn.execute(
+            "SELECT COUNT(DISTINCT country) FROM paper_countries"
+        ).fetchone()[0]
+
+        def first_seen(column):
+            return [
+                row[0]
+                for row in conn.execute(
+                    f"SELECT {column} FROM papers GROUP BY {column} ORDER BY MIN(doc_id)"
+                )
+            ]
+
+        years = [
+            row[0] for row in conn.execute("SELECT DISTINCT year FROM papers ORDER BY year DESC")
+        ]
+        return {
+            "totalPapers": total_papers,
+            "totalStudies": total_studies,
+            "totalCountries": total_countries,
+            "methodologies": first_seen("methodology"),
+            "journals": first_seen("journal"),
+            "years": years,
+        }
+
+    def journals(self):
+        return [
+            row[0] for row in self._connection().execute("SELECT DISTINCT journal FROM papers")
+        ]
+
+
+class _SqlitePaperIndex:
+    """Read-only mapping view ``value of column -> paper`` over a SqlitePaperStore."""
+
+    def __init__(self, store, column):
+        self.store = store
+        self.column = column
+
+    def get(self, value, default=None):
+        doc_ids = self.store.doc_ids_where(self.column, [value])
+        return self.store.load(doc_ids[:1])[0] if doc_ids else default
+
+    def __getitem__(self, value):
+        paper = self.get(value)
+        if paper is None:
+            raise KeyError(value)
+        return paper
+
+    def __contains__(self, value):
+        return bool(self.store.doc_ids_where(self.column, [value]))
+
+
+class SqlitePaperLookup:
+    """``PaperLookup`` interface answered by indexed queries against a SqlitePaperStore."""
+
+    def __init__(self, store):
+        self.store = store
+        self.by_id = _SqlitePaperIndex(store, "id")
+        self.by_key = _SqlitePaperIndex(store, "paper_key")
+        self.by_doi = _SqlitePaperIndex(store, "doi_lower")
+
+    def get_many(self, paper_ids):
+        """Papers for ``paper_ids`` (unknown ids skipped), in corpus order."""
+        return self.store.load(self.store.doc_ids_where("id", dict.fromkeys(paper_ids)))
+
+    def find_by_doi_in(self, text):
+        """Paper whose DOI appears in free text (citation, upload form), if any."""
+        doi = extract_doi(text)
+        return self.by_doi.get(doi.lower()) if doi else None
+
+
+class SqlitePaperList:
+    """Sequence view of every paper in a SqlitePaperStore, in corpus order.
+
+    Iteration fetches records in chunks; nothing is cached in the process.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return self.store.count()
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += len(self)
+        row = self.store._connection().execute(
+            "SELECT doc_id FROM papers ORDER BY doc_id LIMIT 1 OFFSET ?", (position,)
+        ).fetchone()
+        if row is None:
+            raise IndexError(position)
+        return self.store.load([row[0]])[0]
+
+    def __iter__(self):
+        doc_ids = [
+            row[0]
+            for row in self.store._connection().execute(
+                "SELECT doc_id FROM papers ORDER BY doc_id"
+            )
+        ]
+        for start in range(0, len(doc_ids), CORPUS_DB_FETCH_CHUNK):
+            yield from self.store.load(doc_ids[start : start + CORPUS_DB_FETCH_CHUNK])
+
+
+if PAPERS_BACKEND == "sqlite" and not _sqlite_fts5_trigram_available():
+    print(
+        "PAPERS_BACKEND=sqlite needs SQLite with FTS5 and the trigram tokenizer "
+        f"(found {sqlite3.sqlite_version}); keeping the corpus in memory."
+    )
+    PAPERS_BACKEND = "memory"
+
+_paper_store = None
+_paper_store_lock = threading.Lock()
+
+
+def _get_paper_store():
+    """The process-wide SqlitePaperStore for CORPUS_DB_PATH (opened on first use)."""
+    global _paper_store
+    with _paper_store_lock:
+        if _paper_store is None:
+            _paper_store = SqlitePaperStore(CORPUS_DB_PATH)
+        return _paper_store
+
+
+def get_statistics(corpus=None):
+    """Get platform statistics."""
+    corpus = corpus or get_corpus()
+    if corpus.store is not None:
+        return corpus.store.statistics()
+    columns = corpus.columns
+    total_studies = int(columns.sample_size.sum())
+    total_countries = len(
+        set(country for paper in columns.papers for country in paper["countries"])
+    )
+    methodologies = list(columns.methodology.categories)
+    journals = list(columns.journal.categories)
+    years = np.unique(columns.year)[::-1].tolist()
+
+    return {
+        "totalPapers": len(columns.papers),
+        "totalStudies": total_studies,
+        "totalCountries": total_countries,
+        "methodologies": methodologies,
+        "journals": journals,
+        "years": years,
+    }
+
+
+# Conditional GET for responses derived only from the corpus: the ETag is a hash
+# of the snapshot version (CSV content hash), the code and templates, and the
+# request, so it changes exactly when a reload publishes different data.
+CORPUS_CACHE_CONTROL = "public, no-cache"
+_RESPONSE_CODE_VERSION = hashlib.sha256(
+    b"".join(
+        [Path(__file__).read_bytes()]
+        + [path.read_bytes() for path in sorted((BASE_DIR / "templates").glob("*.html"))]
+    )
+).hexdigest()[:16]
+
+
+def _corpus_etag(corpus, vary):
+    parts = [corpus.version, _RESPONSE_CODE_VERSION, request.path, request.query_string.decode()]
+    parts += [request.headers.get(header, "") for header in vary]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+def corpus_cached(vary=()):
+    """Tag a corpus-derived GET response with a strong ETag and answer If-None-Match with 304.
+
+    ``vary`` names request headers the response depends on (content
+    negotiation); they become part of the ETag. A 304 is sent before the
+    view runs, so nothing is looked up, serialized or rendered.
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            corpus = get_corpus()
+            etag = _corpus_etag(corpus, vary)
+            if request.if_none_match.contains(etag):
+                response = app.response_class(status=304)
+            else:
+                response = app.make_response(f(*args, **kwargs))
+                # Tag only successful responses built from the snapshot the ETag names
+                if response.status_code != 200 or get_corpus() is not corpus:
+                    return response
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = CORPUS_CACHE_CONTROL
+            if vary:
+                response.vary.update(vary)
+            return response
+
+        return decorated_function
+
+    return decorator
+
+
+# Routes
+@app.route("/")
+@corpus_cached()
+def index():
+    """Home page."""
+    stats = get_statistics()
+    return render_template("index.html", stats=stats)
+
+
+def _build_search_page_url(query, filters, page, sort=""):
+    """URL for search results including pagination (page 1 omits ``page`` param)."""
+    params = []
+    if query:
+        params.append(("q", query))
+    for key in ("year_from", "year_to", "journal", "country"):
+        val = filters.get(key)
+        if val:
+            params.append((key, str(val)))
+    if sort:
+        params.append(("sort", sort))
+    if page > 1:
+        params.append(("page", str(page)))
+    qs = urlencode(params)
+    return url_for("search") + ("?" + qs if qs else "")
+
+
+def _pagination_window(page, total_pages, radius=2):
+    """Page numbers to link: first, last and ``radius`` around ``page``; ``None`` marks a gap."""
+    nums = {1, total_pages}
+    nums.update(range(max(1, page - radius), min(total_pages, page + radius) + 1))
+    window = []
+    for n in sorted(nums):
+        if window and n - window[-1] == 2:
+            window.append(n - 1)
+        elif window and n - window[-1] > 2:
+            window.append(None)
+        window.append(n)
+    return window
+
+
+@app.route("/search")
+@corpus_cached()
+def search():
+    """Search page."""
+    query = request.args.get("q", "")
+    year_from = request.args.get("year_from", "")
+    year_to = request.args.get("year_to", "")
+    journal = request.args.get("journal", "")
+    country = request.args.get("country", "")
+    sort = "relevance" if request.args.get("sort") == "relevance" else ""
+
+    filters = {
+        "year_from": year_from,
+        "year_to": year_to,
+        "journal": journal,
+        "country": country,
+    }
+
+    filters = {k: v for k, v in filters.items() if v}
+
+    try:
+        page = max(1, int(request.args.get("page", "1")))
+    except ValueError:
+        page = 1
+
+    corpus = get_corpus()
+    total_results, page, paginated_results = search_papers_page(
+        query, filters, sort_by=sort or "year", page=page, corpus=corpus
+    )
+    if corpus.store is not None:
+        journals = sorted(j for j in corpus.store.journals() if j)
+    else:
+        journals = sorted(j for j in corpus.columns.journal.categories if j)
+
+    pagination = None
+    total_pages = (total_results + SEARCH_RESULTS_PER_PAGE - 1) // SEARCH_RESULTS_PER_PAGE
+    if total_pages > 1:
+        pagination = {
+            "page": page,
+            "total_pages": total_pages,
+            "prev_url": (
+                _build_search_page_url(query, filters, page - 1, sort)
+                if page > 1
+                else None
+            ),
+            "next_url": (
+                _build_search_page_url(query, filters, page + 1, sort)
+                if page < total_pages
+                else None
+            ),
+            "pages": [
+                {
+                    "num": n,
+                    "url": _build_search_page_url(query, filters, n, sort) if n else None,
+                    "active": n == page,
+                }
+                for n in _pagination_window(page, total_pages)
+            ],
+        }
 
     return render_template(
         "search.html",
         query=query,
         results=paginated_results,
+        match_hints=search_match_hints(corpus, query, paginated_results),
+        sort=sort,
         total_results=total_results,
         filters=filters,
         journals=journals,
@@ -817,9 +2645,10 @@ def search():
 
 
 @app.route("/article/<paper_id>")
+@corpus_cached()
 def article(paper_id):
     """Article details page."""
-    paper = next((p for p in papers_data if p["id"] == paper_id), None)
+    paper = get_corpus().lookup.by_id.get(paper_id)
     if not paper:
         return "Paper not found", 404
 
@@ -835,7 +2664,7 @@ def compare():
     else:
         comparison_ids = []
 
-    comparison_papers = [p for p in papers_data if p["id"] in comparison_ids]
+    comparison_papers = get_corpus().lookup.get_many(comparison_ids)
     return render_template("compare.html", papers=comparison_papers)
 
 
@@ -846,22 +2675,243 @@ def profile():
 
 
 @app.route("/database")
+@corpus_cached()
 def database():
     """Database page listing all papers; data stays in sync with paper_extracted.csv on each request."""
-    paper_count = len(papers_data)
-    return render_template("database.html", papers=papers_data, paper_count=paper_count)
+    papers = get_corpus().papers
+    paper_count = len(papers)
+    return render_template("database.html", papers=papers, paper_count=paper_count)
+
+
+# Compact paper lists for /api/papers and /api/search: ``view=summary|card`` or
+# ``fields=`` projections, MessagePack (``format=msgpack``) and gzip/brotli bodies.
+PAPER_VIEWS = {
+    "summary": (
+        "id", "paper_key", "title", "authors", "journal", "year",
+        "doi", "sample_size", "countries", "methodology",
+    ),
+    "card": ("id", "title", "authors", "journal", "year", "abstract_snippet"),
+}
+CARD_ABSTRACT_WORDS = 25
+COMPRESS_MIN_BYTES = 1024
+RESPONSE_CACHE_MAX_ENTRIES = 64
+
+
+def _paper_fields(request_args):
+    """Projection for a paper list request: None (whole records) or a tuple of field names.
+
+    Names are top-level paper fields, ``extracted_features.<name>`` or
+    ``abstract_snippet``; ValueError for anything else.
+    """
+    view = request_args.get("view", "")
+    fields_param = request_args.get("fields", "")
+    if view and view != "full":
+        if view not in PAPER_VIEWS:
+            raise ValueError(f"view must be one of: full, {', '.join(PAPER_VIEWS)}")
+        return PAPER_VIEWS[view]
+    if not fields_param:
+        return None
+    fields = tuple(dict.fromkeys(f.strip() for f in fields_param.split(",") if f.strip()))
+    for name in fields:
+        if name == "abstract_snippet" or name in _EXPORT_TEMPLATE:
+            continue
+        prefix, _, feature = name.partition(".")
+        if prefix != "extracted_features" or feature not in _EXPORT_TEMPLATE["extracted_features"]:
+            raise ValueError(f"Unknown field: {name}")
+    return fields
+
+
+def _project_paper(paper, fields):
+    projected = {}
+    for name in fields:
+        if name == "abstract_snippet":
+            projected[name] = truncate_words(paper.get("abstract"), CARD_ABSTRACT_WORDS)
+        elif name.startswith("extracted_features."):
+            feature = name.partition(".")[2]
+            features = paper.get("extracted_features") or {}
+            projected.setdefault("extracted_features", {})[feature] = features.get(feature, "")
+        else:
+            projected[name] = paper.get(name)
+    return projected
+
+
+class PaperViewCache:
+    """Per-snapshot cache of projected papers (named views only) and of encoded list bodies.
+
+    Projections are keyed by paper id and dropped when the corpus version
+    changes; encoded bodies are an LRU keyed by version, so stale ones age out.
+    """
+
+    def __init__(self, max_bodies):
+        self.max_bodies = max_bodies
+        self._version = None
+        self._projections = {}
+        self._bodies = OrderedDict()
+        self._lock = threading.Lock()
+        self.body_hits = 0
+        self.body_misses = 0
+
+    def project(self, version, papers, fields):
+        if fields is None:
+            return list(papers)
+        if fields not in PAPER_VIEWS.values():
+            return [_project_paper(p, fields) for p in papers]
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                self._projections = {}
+            cache = self._projections.setdefault(fields, {})
+        projected = []
+        for paper in papers:
+            view = cache.get(paper["id"])
+            if view is None:
+                view = cache[paper["id"]] = _project_paper(paper, fields)
+            projected.append(view)
+        return projected
+
+    def get_body(self, key):
+        with self._lock:
+            body = self._bodies.get(key)
+            if body is None:
+                self.body_misses += 1
+                return None
+            self._bodies.move_to_end(key)
+            self.body_hits += 1
+            return body
+
+    def put_body(self, key, body):
+        with self._lock:
+            self._bodies[key] = body
+            self._bodies.move_to_end(key)
+            while len(self._bodies) > self.max_bodies:
+                self._bodies.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "bodies": len(self._bodies),
+                "body_hits": self.body_hits,
+                "body_misses": self.body_misses,
+            }
+
+
+_paper_view_cache = PaperViewCache(RESPONSE_CACHE_MAX_ENTRIES)
+
+
+def _response_format(request_args):
+    """``"json"`` or ``"msgpack"`` from ``format=`` or the Accept header; ValueError otherwise.
+
+    The Accept header only gets MessagePack when msgpack is installed and
+    falls back to JSON otherwise; None when it accepts neither.
+    """
+    fmt = request_args.get("format", "")
+    if not fmt:
+        accept = request.accept_mimetypes
+        if not accept:
+            return "json"
+        offered = ["application/json"] + (["application/msgpack"] if msgpack is not None else [])
+        best = accept.best_match(offered)
+        if best is None:
+            return None
+        return "msgpack" if best == "application/msgpack" else "json"
+    if fmt not in ("json", "msgpack"):
+        raise ValueError("format must be json or msgpack")
+    return fmt
+
+
+def _encode_body(payload, fmt):
+    """``(bytes, content type)`` for ``payload`` serialized as ``fmt``."""
+    if fmt == "msgpack":
+        return msgpack.packb(payload, use_bin_type=True), "application/msgpack"
+    return app.json.dumps(payload).encode("utf-8"), "application/json"
+
+
+def _compress_body(body, content_encoding):
+    if content_encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def _paper_list_response(corpus, papers, fields, cache_key=None, headers=None):
+    """Response for a list of ``corpus`` papers, projected, encoded and compressed as requested.
+
+    ``papers`` may be a callable so a cached body skips loading them;
+    ``cache_key`` (which must include the corpus version) caches the body.
+    """
+    try:
+        fmt = _response_format(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if fmt is None:
+        return jsonify({"error": "Accept must allow application/json or application/msgpack"}), 406
+    if fmt == "msgpack" and msgpack is None:
+        return jsonify({"error": "format=msgpack needs the msgpack package, which is not installed"}), 501
+
+    encodings = ["br", "gzip"] if brotli is not None else ["gzip"]
+    content_encoding = request.accept_encodings.best_match(encodings)
+
+    # The serialized body and each compressed variant are cached separately,
+    # so a miss for one encoding reuses the serialized bytes of another
+    plain_key = key = None
+    if cache_key is not None:
+        plain_key = cache_key + (fields, fmt, None)
+        key = cache_key + (fields, fmt, content_encoding)
+    cached = _paper_view_cache.get_body(key) if key is not None else None
+    if cached is None:
+        plain = None
+        if content_encoding and plain_key is not None:
+            plain = _paper_view_cache.get_body(plain_key)
+        if plain is None:
+            if callable(papers):
+                papers = papers()
+            payload = _paper_view_cache.project(corpus.version, papers, fields)
+            plain = _encode_body(payload, fmt) + (None,)
+            if plain_key is not None:
+                _paper_view_cache.put_body(plain_key, plain)
+        body, content_type, _ = plain
+        if content_encoding and len(body) >= COMPRESS_MIN_BYTES:
+            cached = (_compress_body(body, content_encoding), content_type, content_encoding)
+        else:
+            cached = plain
+        if key is not None and key != plain_key:
+            _paper_view_cache.put_body(key, cached)
+
+    body, content_type, content_encoding = cached
+    response = app.response_class(body, content_type=content_type)
+    if content_encoding:
+        response.headers["Content-Encoding"] = content_encoding
+    response.headers["Vary"] = "Accept, Accept-Encoding"
+    response.headers.update(headers or {})
+    return response
 
 
 # API endpoints
 @app.route("/api/papers")
+@corpus_cached(vary=("Accept", "Accept-Encoding"))
 def api_papers():
-    """API endpoint to get all papers."""
-    return jsonify(papers_data)
+    """API endpoint to get all papers.
+
+    ``view=summary|card`` or ``fields=`` limit each record to a few fields.
+    """
+    try:
+        fields = _paper_fields(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    corpus = get_corpus()
+    return _paper_list_response(
+        corpus, lambda: corpus.papers, fields, cache_key=("papers", corpus.version)
+    )
 
 
 @app.route("/api/search")
+@corpus_cached(vary=("Accept", "Accept-Encoding"))
 def api_search():
-    """API endpoint for search."""
+    """API endpoint for search; takes the same ``view``/``fields``/``format`` options as /api/papers."""
+    try:
+        fields = _paper_fields(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    corpus = get_corpus()
     query = request.args.get("q", "")
     filters = {
         "year": request.args.get("year", ""),
@@ -873,14 +2923,31 @@ def api_search():
     }
 
     filters = {k: v for k, v in filters.items() if v}
-    results = search_papers(query, filters)
-    return jsonify(results)
+
+    # Optional paging: ?page=N[&per_page=M] returns one page, total in X-Total-Count
+    if request.args.get("page"):
+        try:
+            page = max(1, int(request.args.get("page")))
+            per_page = int(request.args.get("per_page", SEARCH_RESULTS_PER_PAGE))
+            per_page = min(max(1, per_page), 100)
+        except ValueError:
+            return jsonify({"error": "page and per_page must be integers"}), 400
+        total, _, results = search_papers_page(
+            query, filters, sort_by=filters["sortBy"], page=page, per_page=per_page, corpus=corpus
+        )
+        return _paper_list_response(
+            corpus, results, fields, headers={"X-Total-Count": str(total)}
+        )
+
+    results = search_papers(query, filters, sort_by=filters["sortBy"], corpus=corpus)
+    return _paper_list_response(corpus, results, fields)
 
 
 @app.route("/api/paper/<paper_id>")
+@corpus_cached()
 def api_paper(paper_id):
     """API endpoint to get a specific paper."""
-    paper = next((p for p in papers_data if p["id"] == paper_id), None)
+    paper = get_corpus().lookup.by_id.get(paper_id)
     if not paper:
         return jsonify({"error": "Paper not found"}), 404
 
@@ -888,6 +2955,7 @@ def api_paper(paper_id):
 
 
 @app.route("/api/statistics")
+@corpus_cached()
 def api_statistics():
     """API endpoint to get statistics."""
     return jsonify(get_statistics())
@@ -920,31 +2988,313 @@ def require_admin(f):
     return decorated_function
 
 
+# Tracking events are queued and written by a background thread in batches.
+TRACKING_QUEUE_SIZE = 10000
+TRACKING_BATCH_SIZE = 200
+TRACKING_FLUSH_INTERVAL = 0.25  # seconds an event may wait for its batch to fill
+
+_TRACKING_INSERTS = {
+    "search_logs": """
+        INSERT INTO search_logs (timestamp, search_query, filters_used, num_results, user_session)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+    "compare_view_logs": """
+        INSERT INTO compare_view_logs (timestamp, paper_ids, num_papers, user_session)
+        VALUES (?, ?, ?, ?)
+    """,
+    "download_logs": """
+        INSERT INTO download_logs (timestamp, paper_ids, num_papers, file_format, user_session)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+}
+
+_STOP_WRITER = object()
+
+
+def _update_tracking_rollups(conn, rows_by_table):
+    """Add a batch of new log rows to the rollup tables (in the caller's transaction)."""
+    activity, queries, paper_activity = Counter(), Counter(), Counter()
+    for table, rows in rows_by_table.items():
+        event = ROLLUP_EVENTS[table]
+        for row in rows:
+            day = row[0][:10]
+            activity[day, event] += 1
+            if table == "search_logs":
+                if row[1]:
+                    queries[day, row[1]] += 1
+                continue
+            paper_ids = json.loads(row[1])
+            if isinstance(paper_ids, list):
+                for paper_id in paper_ids:
+                    paper_activity[day, str(paper_id), event] += 1
+    query_totals = Counter()
+    for (_, search_query), count in queries.items():
+        query_totals[search_query] += count
+
+    conn.executemany(
+        """
+        INSERT INTO daily_activity (day, event, count) VALUES (?, ?, ?)
+        ON CONFLICT (day, event) DO UPDATE SET count = count + excluded.count
+        """,
+        [key + (count,) for key, count in activity.items()],
+    )
+    conn.executemany(
+        """
+        INSERT INTO daily_search_queries (day, search_query, count) VALUES (?, ?, ?)
+        ON CONFLICT (day, search_query) DO UPDATE SET count = count + excluded.count
+        """,
+        [key + (count,) for key, count in queries.items()],
+    )
+    conn.executemany(
+        """
+        INSERT INTO search_query_totals (search_query, count) VALUES (?, ?)
+        ON CONFLICT (search_query) DO UPDATE SET count = count + excluded.count
+        """,
+        list(query_totals.items()),
+    )
+    conn.executemany(
+        """
+        INSERT INTO daily_paper_activity (day, paper_id, event, count) VALUES (?, ?, ?, ?)
+        ON CONFLICT (day, paper_id, event) DO UPDATE SET count = count + excluded.count
+        """,
+        [key + (count,) for key, count in paper_activity.items()],
+    )
+
+
+def _activity_counts(conn, since_day=None):
+    """Events per type from the daily_activity rollup, optionally from ``since_day`` on."""
+    counts = dict.fromkeys(ROLLUP_EVENTS.values(), 0)
+    query = "SELECT event, SUM(count) AS count FROM daily_activity"
+    params = ()
+    if since_day:
+        query += " WHERE day >= ?"
+        params = (since_day,)
+    for row in conn.execute(query + " GROUP BY event", params):
+        counts[row["event"]] = row["count"]
+    return counts
+
+
+class TrackingEventWriter:
+    """Bounded in-process queue of tracking rows, drained by one writer thread.
+
+    ``submit`` never touches the database: it enqueues ``(table, row)`` and
+    returns, or counts the event as dropped when the queue is full. The
+    writer collects up to ``batch_size`` events, waiting at most
+    ``flush_interval`` after the first one, and inserts them with one
+    ``executemany`` per table in a single transaction. The thread starts on
+    first use in each process (so it survives a fork); ``close`` drains the
+    queue and runs at interpreter exit.
+    """
+
+    def __init__(self, max_queued, batch_size, flush_interval):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+
+    def _ensure_started(self):
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid() or not self._thread.is_alive():
+                if self._pid != os.getpid():
+                    # Forked child: events queued in the parent stay with the parent
+                    self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, name="tracking-writer", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, table, row):
+        """Queue one row for ``table``; False (and counted as dropped) if the queue is full."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((table, row))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def _run(self):
+        events = self._queue
+        while True:
+            batch = [events.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1] is not _STOP_WRITER and len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(events.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            stop = batch[-1] is _STOP_WRITER
+            rows = [item for item in batch if item is not _STOP_WRITER]
+            if rows:
+                self._write(rows)
+            for _ in batch:
+                events.task_done()
+            if stop:
+                return
+
+    def _write(self, rows):
+        conn = None
+        try:
+            conn = get_db_connection()
+            try:
+                self._insert(conn, rows)
+                written, failed = len(rows), 0
+            except Exception as e:
+                if len(rows) == 1:
+                    raise
+                # One bad row fails the whole executemany; retry row by row so it
+                # cannot take the rest of the batch down with it
+                print(f"Error writing {len(rows)} tracking events, retrying one by one: {e}")
+                written = failed = 0
+                for row in rows:
+                    try:
+                        self._insert(conn, [row])
+                        written += 1
+                    except Exception as row_error:
+                        print(f"Dropping tracking event for {row[0]}: {row_error}")
+                        failed += 1
+            with self._lock:
+                self.written += written
+                self.failed += failed
+                self.batches += 1
+        except Exception as e:
+            print(f"Error writing {len(rows)} tracking events: {e}")
+            with self._lock:
+                self.failed += len(rows)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    @staticmethod
+    def _insert(conn, rows):
+        """Insert ``rows`` and their rollups in one transaction."""
+        by_table = {}
+        for table, row in rows:
+            by_table.setdefault(table, []).append(row)
+        with conn:
+            for table, table_rows in by_table.items():
+                conn.executemany(_TRACKING_INSERTS[table], table_rows)
+            _update_tracking_rollups(conn, by_table)
+
+    def flush(self):
+        """Block until every event queued so far has been written (or failed)."""
+        if self._pid == os.getpid() and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self, timeout=10.0):
+        """Write out queued events and stop the writer thread."""
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP_WRITER, timeout=timeout)
+        except queue.Full:
+            print("Tracking queue still full at shutdown; pending events are lost")
+            return
+        self._thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "enqueued": self.enqueued,
+                "dropped": self.dropped,
+                "written": self.written,
+                "failed": self.failed,
+                "batches": self.batches,
+            }
+
+
+_tracking_writer = TrackingEventWriter(
+    TRACKING_QUEUE_SIZE, TRACKING_BATCH_SIZE, TRACKING_FLUSH_INTERVAL
+)
+atexit.register(_tracking_writer.close)
+
+
+def _tracking_text(data, name, default=""):
+    """``data[name]`` as a string; ValueError unless it is a string or number."""
+    value = data.get(name, default)
+    if value is None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError(f"{name} must be a string or number")
+    return str(value)
+
+
+def _tracking_count(data, name):
+    """``data[name]`` as a non-negative int; ValueError otherwise."""
+    value = data.get(name, 0)
+    if value is None:
+        return 0
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"{name} must be a number")
+    try:
+        count = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number") from None
+    if count < 0:
+        raise ValueError(f"{name} must not be negative")
+    return count
+
+
+def _tracking_paper_ids(data):
+    """``data["paper_ids"]`` as a list of id strings; ValueError otherwise."""
+    paper_ids = data.get("paper_ids", [])
+    if paper_ids is None:
+        return []
+    if not isinstance(paper_ids, list):
+        raise ValueError("paper_ids must be a list")
+    if any(isinstance(i, bool) or not isinstance(i, (str, int)) for i in paper_ids):
+        raise ValueError("paper_ids must contain strings or numbers")
+    return [str(i) for i in paper_ids]
+
+
+def _queue_tracking_event(table, row, message):
+    """JSON response for a tracking endpoint after queueing its row."""
+    if not _tracking_writer.submit(table, row):
+        return jsonify({"success": False, "error": "Tracking queue is full"}), 503
+    return jsonify({"success": True, "message": message})
+
+
 # Tracking functions
 @app.route("/api/track/search", methods=["POST"])
 def track_search():
     """Track a search query."""
     try:
-        data = request.json or {}
-        search_query = data.get("search_query", "")
-        filters_used = json.dumps(data.get("filters_used", {}))
-        num_results = data.get("num_results", 0)
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({"success": False, "error": "Expected a JSON object"}), 400
+        search_query = _tracking_text(data, "search_query")
+        filters_used = data.get("filters_used") or {}
+        if not isinstance(filters_used, dict):
+            raise ValueError("filters_used must be an object")
+        filters_used = json.dumps(filters_used)
+        num_results = _tracking_count(data, "num_results")
         user_session = session.get("user_id", "anonymous")
         timestamp = get_eastern_time()
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            INSERT INTO search_logs (timestamp, search_query, filters_used, num_results, user_session)
-            VALUES (?, ?, ?, ?, ?)
-            """,
+        return _queue_tracking_event(
+            "search_logs",
             (timestamp, search_query, filters_used, num_results, user_session),
+            "Search tracked",
         )
-        conn.commit()
-        conn.close()
-
-        return jsonify({"success": True, "message": "Search tracked"})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         print(f"Error tracking search: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
@@ -954,54 +3304,240 @@ def track_search():
 def track_compare_view():
     """Track a comparison page view."""
     try:
-        data = request.json or {}
-        paper_ids = data.get("paper_ids", [])
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({"success": False, "error": "Expected a JSON object"}), 400
+        paper_ids = _tracking_paper_ids(data)
         user_session = session.get("user_id", "anonymous")
         timestamp = get_eastern_time()
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            INSERT INTO compare_view_logs (timestamp, paper_ids, num_papers, user_session)
-            VALUES (?, ?, ?, ?)
-            """,
+        return _queue_tracking_event(
+            "compare_view_logs",
             (timestamp, json.dumps(paper_ids), len(paper_ids), user_session),
+            "Compare view tracked",
         )
-        conn.commit()
-        conn.close()
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        print(f"Error tracking compare view: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route("/api/track/download", methods=["POST"])
+def track_download():
+    """Track a comparison download."""
+    try:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({"success": False, "error": "Expected a JSON object"}), 400
+        paper_ids = _tracking_paper_ids(data)
+        user_session = session.get("user_id", "anonymous")
+        timestamp = get_eastern_time()
+
+        return _queue_tracking_event(
+            "download_logs",
+            (timestamp, json.dumps(paper_ids), len(paper_ids), "CSV", user_session),
+            "Download tracked",
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        print(f"Error tracking download: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+# Bulk export: matching papers are streamed EXPORT_CHUNK_SIZE records at a time
+# as CSV, NDJSON or Parquet (Parquet needs pyarrow).
+EXPORT_CHUNK_SIZE = 500
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Export columns are flat: top-level paper fields, then extracted features
+# whose names are not already taken by a top-level field.
+_EXPORT_TEMPLATE = _build_paper_record({"title": "export"})
+EXPORT_PAPER_FIELDS = tuple(name for name in _EXPORT_TEMPLATE if name != "extracted_features")
+EXPORT_FIELDS = EXPORT_PAPER_FIELDS + tuple(
+    name for name in _EXPORT_TEMPLATE["extracted_features"] if name not in EXPORT_PAPER_FIELDS
+)
+
+
+def _export_columns(fields_param):
+    """Columns named in ``fields`` (all of EXPORT_FIELDS when empty); ValueError for unknown names."""
+    if not fields_param:
+        return EXPORT_FIELDS
+    columns = tuple(dict.fromkeys(f.strip() for f in fields_param.split(",") if f.strip()))
+    unknown = [name for name in columns if name not in EXPORT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown export fields: {', '.join(unknown)}")
+    return columns
+
+
+def _export_row(paper, columns):
+    features = paper.get("extracted_features") or {}
+    return {
+        name: paper.get(name) if name in EXPORT_PAPER_FIELDS else features.get(name, "")
+        for name in columns
+    }
+
+
+def _iter_export_papers(corpus, paper_ids, query, filters):
+    """Papers to export, in corpus order; the SQLite store is read one chunk at a time."""
+    if corpus.store is not None:
+        store = corpus.store
+        if paper_ids is not None:
+            doc_ids = store.doc_ids_where("id", dict.fromkeys(paper_ids))
+        else:
+            doc_ids = store.matching_doc_ids(_search_terms(query) if query else (), filters)
+        for start in range(0, len(doc_ids), EXPORT_CHUNK_SIZE):
+            yield from store.load(doc_ids[start : start + EXPORT_CHUNK_SIZE])
+    elif paper_ids is not None:
+        yield from corpus.lookup.get_many(paper_ids)
+    else:
+        _, doc_ids = _search_doc_ids(corpus, query, filters)
+        for doc_id in doc_ids:
+            yield corpus.papers[doc_id]
+
+
+def _export_csv(chunks, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        for row in rows:
+            writer.writerow(
+                "; ".join(value) if isinstance(value, list) else value
+                for value in (row[name] for name in columns)
+            )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _export_ndjson(chunks, columns):
+    for rows in chunks:
+        yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+
+class _ExportSink:
+    """Write-only file for ParquetWriter whose bytes are handed out after each row group."""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        written = self.buffer.write(data)
+        self.position += written
+        return written
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+
+def _export_arrow_type(name):
+    sample = _EXPORT_TEMPLATE.get(name) if name in EXPORT_PAPER_FIELDS else ""
+    if isinstance(sample, list):
+        return pa.list_(pa.string())
+    if isinstance(sample, int):
+        return pa.int64()
+    return pa.string()
+
+
+def _export_parquet(chunks, columns):
+    """One Parquet row group per chunk; the footer goes out with the last bytes."""
+    schema = pa.schema([(name, _export_arrow_type(name)) for name in columns])
+    sink = _ExportSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for rows in chunks:
+            writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+_EXPORT_ENCODERS = {
+    "csv": _export_csv,
+    "ndjson": _export_ndjson,
+    "parquet": _export_parquet,
+}
 
-        return jsonify({"success": True, "message": "Compare view tracked"})
-    except Exception as e:
-        print(f"Error tracking compare view: {e}")
-        return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route("/api/export")
+def api_export():
+    """Stream papers as a CSV, NDJSON or Parquet download.
 
-@app.route("/api/track/download", methods=["POST"])
-def track_download():
-    """Track a comparison download."""
+    Exports the comma-separated ``ids`` or, without ``ids``, every paper
+    matching ``q`` and the year_from/year_to/journal/country filters.
+    ``fields`` selects the columns. The download is logged once the last
+    row has been sent.
+    """
+    export_format = request.args.get("format", "csv").lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    if export_format == "parquet" and pq is None:
+        return jsonify({"error": "Parquet export needs pyarrow, which is not installed"}), 501
     try:
-        data = request.json or {}
-        paper_ids = data.get("paper_ids", [])
-        user_session = session.get("user_id", "anonymous")
-        timestamp = get_eastern_time()
+        columns = _export_columns(request.args.get("fields", ""))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            INSERT INTO download_logs (timestamp, paper_ids, num_papers, user_session)
-            VALUES (?, ?, ?, ?)
-            """,
-            (timestamp, json.dumps(paper_ids), len(paper_ids), user_session),
+    filters = {
+        name: request.args.get(name, "").strip()
+        for name in ("year_from", "year_to", "journal", "country")
+    }
+    filters = {k: v for k, v in filters.items() if v}
+    for name in ("year_from", "year_to"):
+        if name in filters and not filters[name].isdigit():
+            return jsonify({"error": f"{name} must be a year"}), 400
+
+    ids_param = request.args.get("ids")
+    paper_ids = [pid for pid in ids_param.split(",") if pid] if ids_param is not None else None
+    query = request.args.get("q", "")
+    corpus = get_corpus()
+    user_session = session.get("user_id", "anonymous")
+
+    def generate():
+        exported_ids = []
+
+        def rows():
+            for paper in _iter_export_papers(corpus, paper_ids, query, filters):
+                exported_ids.append(paper["id"])
+                yield _export_row(paper, columns)
+
+        all_rows = rows()
+        chunks = iter(lambda: list(islice(all_rows, EXPORT_CHUNK_SIZE)), [])
+        yield from _EXPORT_ENCODERS[export_format](chunks, columns)
+
+        row = (
+            get_eastern_time(),
+            json.dumps(exported_ids),
+            len(exported_ids),
+            export_format.upper(),
+            user_session,
         )
-        conn.commit()
-        conn.close()
+        if not _tracking_writer.submit("download_logs", row):
+            print("Tracking queue is full; export was not logged")
 
-        return jsonify({"success": True, "message": "Download tracked"})
-    except Exception as e:
-        print(f"Error tracking download: {e}")
-        return jsonify({"success": False, "error": str(e)}), 500
+    filename = f"papers_{datetime.now().strftime('%Y-%m-%d')}.{export_format}"
+    response = Response(stream_with_context(generate()), content_type=EXPORT_FORMATS[export_format])
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
 
 
 @app.route("/api/tracking/stats")
@@ -1009,15 +3545,10 @@ def get_tracking_stats():
     """Get tracking statistics (public endpoint for Profile page)."""
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT COUNT(*) as count FROM compare_view_logs")
-        total_visits = cursor.fetchone()["count"]
-
-        cursor.execute("SELECT COUNT(*) as count FROM download_logs")
-        total_downloads = cursor.fetchone()["count"]
-
+        counts = _activity_counts(conn)
         conn.close()
+        total_visits = counts["compare_view"]
+        total_downloads = counts["download"]
 
         return jsonify(
             {
@@ -1074,23 +3605,166 @@ def admin_requests():
     return render_template("admin_requests.html")
 
 
+# Admin log endpoints page newest first with keyset cursors on (timestamp, id).
+ADMIN_LOGS_DEFAULT_LIMIT = 100
+ADMIN_LOGS_MAX_LIMIT = 1000
+
+
+def _encode_log_cursor(row):
+    raw = json.dumps([row["timestamp"], row["id"]]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_log_cursor(cursor):
+    timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    return str(timestamp), int(row_id)
+
+
+# Archived log months (see database/archive_logs.py) loaded into in-memory SQLite, LRU.
+ARCHIVE_DIR = default_archive_dir(TRACKING_DB_PATH)
+ARCHIVE_CACHE_MONTHS = 6
+_archive_connections = OrderedDict()
+_archive_lock = threading.Lock()
+
+
+def _archive_connection(table, month):
+    """In-memory copy of one archived month, so the hot-table SQL runs on it unchanged.
+
+    Call with ``_archive_lock`` held.
+    """
+    key = (table, month, os.path.getmtime(archive_path(table, month, ARCHIVE_DIR)))
+    conn = _archive_connections.get(key)
+    if conn is not None:
+        _archive_connections.move_to_end(key)
+        return conn
+    columns, rows = read_archive(table, month, ARCHIVE_DIR)
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+    conn.executemany(
+        f"INSERT INTO {table} VALUES ({', '.join('?' * len(columns))})", rows
+    )
+    conn.execute(f"CREATE INDEX idx_{table}_timestamp ON {table} (timestamp, id)")
+    _archive_connections[key] = conn
+    while len(_archive_connections) > ARCHIVE_CACHE_MONTHS:
+        _archive_connections.popitem(last=False)[1].close()
+    return conn
+
+
+def _archived_log_rows(table, sql, params, needed, newest_month=None, oldest_month=None):
+    """Up to ``needed`` older rows from archived months, newest first (same query as the hot DB)."""
+    rows = []
+    for month in archived_months(table, ARCHIVE_DIR):
+        if len(rows) >= needed:
+            break
+        if newest_month and month > newest_month:
+            continue
+        if oldest_month and month < oldest_month:
+            break
+        with _archive_lock:
+            conn = _archive_connection(table, month)
+            rows.extend(conn.execute(sql, params + [needed - len(rows)]).fetchall())
+    return rows
+
+
+def _admin_log_page(table, text_column):
+    """One page of ``table`` for the admin dashboard, filtered by the query string.
+
+    Parameters: ``limit``; ``before=<cursor>`` for the next (older) page;
+    ``since=<cursor>`` for rows newer than a previous response (the oldest
+    ``limit`` of them, so repeating the call walks forward without gaps);
+    ``date_from`` / ``date_to`` (YYYY-MM-DD, inclusive); ``session`` (exact
+    user_session); ``q`` (case-insensitive substring of ``text_column``).
+
+    Paging continues from tracking.db into archived months, so ``before``
+    cursors walk the full history. The body is the list of rows, newest first. ``X-Next-Cursor`` (absent on
+    the last page) continues with older rows; ``X-Latest-Cursor`` is the
+    newest row returned, for the next ``since`` call.
+    """
+    args = request.args
+    try:
+        limit = int(args.get("limit", ADMIN_LOGS_DEFAULT_LIMIT))
+        limit = min(max(1, limit), ADMIN_LOGS_MAX_LIMIT)
+        before = _decode_log_cursor(args["before"]) if args.get("before") else None
+        since = _decode_log_cursor(args["since"]) if args.get("since") else None
+        if args.get("date_from"):
+            date_from = datetime.strptime(args["date_from"], "%Y-%m-%d").date()
+        if args.get("date_to"):
+            date_to = datetime.strptime(args["date_to"], "%Y-%m-%d").date()
+    except (ValueError, TypeError):
+        return jsonify({"error": "Invalid limit, cursor or date"}), 400
+    if before and since:
+        return jsonify({"error": "Use either before or since, not both"}), 400
+
+    clauses, params = [], []
+    if before:
+        clauses.append("(timestamp, id) < (?, ?)")
+        params.extend(before)
+    if since:
+        clauses.append("(timestamp, id) > (?, ?)")
+        params.extend(since)
+    if args.get("date_from"):
+        clauses.append("timestamp >= ?")
+        params.append(date_from.isoformat())
+    if args.get("date_to"):
+        clauses.append("timestamp < ?")
+        params.append((date_to + timedelta(days=1)).isoformat())
+    if args.get("session"):
+        clauses.append("user_session = ?")
+        params.append(args["session"])
+    if args.get("q"):
+        clauses.append(f"instr(lower({text_column}), ?) > 0")
+        params.append(args["q"].lower())
+    where = "WHERE " + " AND ".join(clauses) if clauses else ""
+    order = "ASC" if since else "DESC"
+
+    sql = f"""
+        SELECT * FROM {table}
+        {where}
+        ORDER BY timestamp {order}, id {order}
+        LIMIT ?
+    """
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(sql, params + [limit + 1]).fetchall()
+    finally:
+        conn.close()
+    if not since and len(rows) <= limit:
+        # New rows are always written to tracking.db; only older pages reach the archives
+        rows += _archived_log_rows(
+            table,
+            sql,
+            params,
+            limit + 1 - len(rows),
+            newest_month=min(
+                (m for m in (before and before[0][:7], args.get("date_to", "")[:7]) if m),
+                default=None,
+            ),
+            oldest_month=args.get("date_from", "")[:7] or None,
+        )
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if since:
+        rows.reverse()
+    response = jsonify([dict(row) for row in rows])
+    if rows:
+        response.headers["X-Latest-Cursor"] = _encode_log_cursor(rows[0])
+        if more and not since:
+            response.headers["X-Next-Cursor"] = _encode_log_cursor(rows[-1])
+    elif since:
+        response.headers["X-Latest-Cursor"] = args["since"]
+    if since and more:
+        response.headers["X-More"] = "1"
+    return response
+
+
 @app.route("/api/admin/search_logs")
 @require_admin
 def get_search_logs():
-    """Get search logs for admin."""
+    """Get search logs for admin (see ``_admin_log_page`` for paging and filters)."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT * FROM search_logs
-            ORDER BY timestamp DESC
-            LIMIT 1000
-        """
-        )
-        logs = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return jsonify(logs)
+        return _admin_log_page("search_logs", "search_query")
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1098,20 +3772,9 @@ def get_search_logs():
 @app.route("/api/admin/compare_view_logs")
 @require_admin
 def get_compare_view_logs():
-    """Get compare view logs for admin."""
+    """Get compare view logs for admin (``q`` matches paper ids)."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT * FROM compare_view_logs
-            ORDER BY timestamp DESC
-            LIMIT 1000
-        """
-        )
-        logs = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return jsonify(logs)
+        return _admin_log_page("compare_view_logs", "paper_ids")
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1119,20 +3782,9 @@ def get_compare_view_logs():
 @app.route("/api/admin/download_logs")
 @require_admin
 def get_download_logs():
-    """Get download logs for admin."""
+    """Get download logs for admin (``q`` matches paper ids)."""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT * FROM download_logs
-            ORDER BY timestamp DESC
-            LIMIT 1000
-        """
-        )
-        logs = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return jsonify(logs)
+        return _admin_log_page("download_logs", "paper_ids")
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -1143,64 +3795,38 @@ def get_admin_stats():
     """Get statistics for admin dashboard."""
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT COUNT(*) as count FROM search_logs")
-        total_searches = cursor.fetchone()["count"]
-
-        cursor.execute("SELECT COUNT(*) as count FROM compare_view_logs")
-        total_compares = cursor.fetchone()["count"]
-
-        cursor.execute("SELECT COUNT(*) as count FROM download_logs")
-        total_downloads = cursor.fetchone()["count"]
-
-        cursor.execute(
-            """
-            SELECT COUNT(*) as count FROM search_logs
-            WHERE timestamp >= datetime('now', '-7 days')
-        """
-        )
-        recent_searches = cursor.fetchone()["count"]
-
-        cursor.execute(
-            """
-            SELECT COUNT(*) as count FROM compare_view_logs
-            WHERE timestamp >= datetime('now', '-7 days')
-        """
-        )
-        recent_compares = cursor.fetchone()["count"]
-
-        cursor.execute(
-            """
-            SELECT COUNT(*) as count FROM download_logs
-            WHERE timestamp >= datetime('now', '-7 days')
-        """
-        )
-        recent_downloads = cursor.fetchone()["count"]
-
-        cursor.execute(
-            """
-            SELECT search_query, COUNT(*) as count
-            FROM search_logs
-            WHERE search_query != ''
-            GROUP BY search_query
-            ORDER BY count DESC
-            LIMIT 10
-        """
-        )
-        top_searches = [dict(row) for row in cursor.fetchall()]
-
+        totals = _activity_counts(conn)
+        # Last 7 days by Eastern calendar day, today included (log timestamps are Eastern)
+        today = datetime.now(pytz.timezone("US/Eastern")).date()
+        recent = _activity_counts(conn, (today - timedelta(days=6)).isoformat())
+        top_searches = [
+            dict(row)
+            for row in conn.execute(
+                """
+                SELECT search_query, count
+                FROM search_query_totals
+                ORDER BY count DESC
+                LIMIT 10
+                """
+            )
+        ]
         conn.close()
 
         return jsonify(
             {
-                "total_searches": total_searches,
-                "total_compares": total_compares,
-                "total_downloads": total_downloads,
-                "recent_searches": recent_searches,
-                "recent_compares": recent_compares,
-                "recent_downloads": recent_downloads,
+                "total_searches": totals["search"],
+                "total_compares": totals["compare_view"],
+                "total_downloads": totals["download"],
+                "recent_searches": recent["search"],
+                "recent_compares": recent["compare_view"],
+                "recent_downloads": recent["download"],
                 "top_searches": top_searches,
+                "search_cache": _search_result_cache.stats(),
+                "paper_view_cache": _paper_view_cache.stats(),
+                "compare_ai_flight": _compare_ai_flight.stats(),
+                "llm": _llm_client.stats() if _llm_client is not None else None,
+                "tracking_writer": _tracking_writer.stats(),
+                "corpus_load": _corpus_load_stats,
             }
         )
     except Exception as e:
@@ -1259,9 +3885,12 @@ def upload_request():
         conn.commit()
         conn.close()
 
-        return jsonify(
-            {"success": True, "message": "Upload request submitted successfully"}
-        )
+        response = {"success": True, "message": "Upload request submitted successfully"}
+        existing = get_corpus().lookup.find_by_doi_in(paper_info)
+        if existing:
+            response["existing_paper_id"] = existing["id"]
+            response["existing_paper_title"] = existing["title"]
+        return jsonify(response)
 
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
@@ -1284,8 +3913,10 @@ def get_admin_requests():
         """
         )
 
+        lookup = get_corpus().lookup
         requests = []
         for row in cursor.fetchall():
+            existing = lookup.find_by_doi_in(row[5])
             requests.append(
                 {
                     "id": row[0],
@@ -1297,6 +3928,7 @@ def get_admin_requests():
                     "change_requests": row[6],
                     "pdf_filename": row[7],
                     "status": row[8],
+                    "existing_paper_id": existing["id"] if existing else None,
                 }
             )
 
@@ -1385,11 +4017,19 @@ def clean_value(value, max_len=600):
     return value
 
 
+def compare_row(paper):
+    """Flat field view of an in-memory paper record for CATEGORY_FIELDS lookups."""
+    row = dict(paper.get("extracted_features") or {})
+    row["paper_key"] = paper["paper_key"]
+    row["title"] = paper["title"]
+    return row
+
+
 def build_category_payload(selected_rows, category_name):
     fields = CATEGORY_FIELDS[category_name]
     papers = []
 
-    for _, row in selected_rows.iterrows():
+    for row in selected_rows:
         item = {}
         for field in fields:
             item[field] = clean_value(row.get(field, ""))
@@ -1402,39 +4042,33 @@ def make_combination_key(paper_keys):
     normalized = sorted(str(k).strip() for k in paper_keys)
     return "|".join(normalized)
 
-def get_cached_compare_summary(paper_keys):
-    combination_key = make_combination_key(paper_keys)
-
-    conn = get_db_connection()
-    row = conn.execute("""
-        SELECT *
-        FROM compare_ai_summaries
-        WHERE combination_key = ?
-    """, (combination_key,)).fetchone()
-    conn.close()
-
-    if not row:
+def get_cached_compare_summary(paper_keys, selected_rows):
+    """Summary for ``selected_rows`` assembled from the category cache, or None if a category is missing."""
+    payloads = compare_category_payloads(selected_rows)
+    results = get_cached_category_results(compare_category_cache_keys(payloads))
+    if len(results) < len(payloads):
         return None
 
     return {
-        "paper_keys": json.loads(row["paper_keys_json"]),
-        "paper_titles": json.loads(row["paper_titles_json"]),
-        "results": {
-            "Research Design & Sample": json.loads(row["research_design_sample"]) if row["research_design_sample"] else None,
-            "Measurement & Analysis": json.loads(row["measurement_analysis"]) if row["measurement_analysis"] else None,
-            "Findings": json.loads(row["findings"]) if row["findings"] else None,
-            "Context": json.loads(row["context"]) if row["context"] else None,
-        },
+        "paper_keys": paper_keys,
+        "paper_titles": [row["title"] for row in selected_rows],
+        "results": {category: results[category] for category in payloads},
         "source": "cache"
     }
 
 
-def save_compare_summary(paper_keys, paper_titles, results, model_name="llama-3.3-70b-versatile", prompt_version="v1"):
+def save_compare_summary(paper_keys, paper_titles, results, model_name="llama-3.3-70b-versatile", prompt_version="v1", lease_owner=None):
+    """Store a generated summary and release the lease on its row.
+
+    With ``lease_owner`` the row is written only while that lease is held
+    (or has expired without a result); without it, only when nobody holds a
+    live lease. Returns whether the row was written.
+    """
     combination_key = make_combination_key(paper_keys)
 
     conn = get_db_connection()
-    conn.execute("""
-        INSERT OR REPLACE INTO compare_ai_summaries (
+    cursor = conn.execute("""
+        INSERT INTO compare_ai_summaries (
             combination_key,
             paper_keys_json,
             paper_titles_json,
@@ -1446,6 +4080,19 @@ def save_compare_summary(paper_keys, paper_titles, results, model_name="llama-3.
             prompt_version
         )
         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (combination_key) DO UPDATE SET
+            paper_keys_json = excluded.paper_keys_json,
+            paper_titles_json = excluded.paper_titles_json,
+            research_design_sample = excluded.research_design_sample,
+            measurement_analysis = excluded.measurement_analysis,
+            findings = excluded.findings,
+            context = excluded.context,
+            model_name = excluded.model_name,
+            prompt_version = excluded.prompt_version,
+            created_at = CURRENT_TIMESTAMP,
+            lease_owner = NULL,
+            lease_expires_at = NULL
+        WHERE (? IS NULL AND lease_owner IS NULL) OR lease_owner = ? OR lease_expires_at < ?
     """, (
         combination_key,
         json.dumps(sorted(str(k).strip() for k in paper_keys)),
@@ -1455,10 +4102,110 @@ def save_compare_summary(paper_keys, paper_titles, results, model_name="llama-3.
         json.dumps(results.get("Findings")),
         json.dumps(results.get("Context")),
         model_name,
-        prompt_version
+        prompt_version,
+        lease_owner,
+        lease_owner,
+        time.time(),
+    ))
+    conn.commit()
+    conn.close()
+    return cursor.rowcount > 0
+
+
+# Concurrent requests for the same paper set share one generation: threads of
+# this process wait on the leader's future, other processes on its lease row
+# (a compare_ai_summaries row with lease_owner set and no results yet).
+COMPARE_AI_LEASE_SECONDS = 120
+COMPARE_AI_LEASE_POLL_INTERVAL = 0.5
+
+
+def acquire_compare_lease(paper_keys, paper_titles, owner):
+    """Claim the right to generate ``paper_keys``; False while another owner's lease is live."""
+    now = time.time()
+    conn = get_db_connection()
+    cursor = conn.execute("""
+        INSERT INTO compare_ai_summaries (
+            combination_key, paper_keys_json, paper_titles_json, lease_owner, lease_expires_at
+        )
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (combination_key) DO UPDATE SET
+            lease_owner = excluded.lease_owner,
+            lease_expires_at = excluded.lease_expires_at
+        WHERE lease_owner IS NULL OR lease_expires_at < ?
+    """, (
+        make_combination_key(paper_keys),
+        json.dumps(sorted(str(k).strip() for k in paper_keys)),
+        json.dumps(paper_titles),
+        owner,
+        now + COMPARE_AI_LEASE_SECONDS,
+        now,
     ))
     conn.commit()
     conn.close()
+    return cursor.rowcount > 0
+
+
+def release_compare_lease(paper_keys, owner):
+    """Drop a lease whose generation failed, so the next request can take over at once.
+
+    A placeholder row inserted only to hold the lease is deleted; a row with
+    stored results keeps them and just loses the lease.
+    """
+    params = (make_combination_key(paper_keys), owner)
+    conn = get_db_connection()
+    with conn:
+        conn.execute("""
+            DELETE FROM compare_ai_summaries
+            WHERE combination_key = ? AND lease_owner = ?
+              AND research_design_sample IS NULL AND measurement_analysis IS NULL
+              AND findings IS NULL AND context IS NULL
+        """, params)
+        conn.execute("""
+            UPDATE compare_ai_summaries SET lease_owner = NULL, lease_expires_at = NULL
+            WHERE combination_key = ? AND lease_owner = ?
+        """, params)
+    conn.close()
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers with that key share its outcome."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key, fn):
+        """``(result, shared)``: ``shared`` is True when another caller's result was reused."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.leaders += 1
+            else:
+                self.followers += 1
+        if not leader:
+            return future.result(), True
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "followers": self.followers}
+
+
+_compare_ai_flight = SingleFlight()
 
 def build_prompt(category_name, papers_payload):
     return f"""
@@ -1478,57 +4225,375 @@ Study data:
 {json.dumps(papers_payload, ensure_ascii=False, indent=2)}
 """.strip()
 
-# def call_groq_for_category(category_name, papers_payload):
-#     prompt = build_prompt(category_name, papers_payload)
-
-#     completion = client.chat.completions.create(
-#         model="llama-3.3-70b-versatile",
-#         messages=[
-#             {
-#                 "role": "system",
-#                 "content": "You are a careful research comparison assistant. Return valid JSON only."
-#             },
-#             {
-#                 "role": "user",
-#                 "content": prompt
-#             }
-#         ],
-#         temperature=0.2
-#     )
-
-#     text = completion.choices[0].message.content.strip()
-#     text = re.sub(r"^```json\s*", "", text)
-#     text = re.sub(r"^```\s*", "", text)
-#     text = re.sub(r"\s*```$", "", text)
+# AI results are cached per category under a hash of the model and the exact
+# prompt (category payload + template), so edits to the CSV or to build_prompt
+# miss the cache. Failed results are cached too, but only for a short while.
+COMPARE_AI_FAILURE_TTL = 300  # seconds
+# Fingerprint of the prompt template, stored with each saved summary
+COMPARE_AI_PROMPT_VERSION = hashlib.sha256(build_prompt("", []).encode("utf-8")).hexdigest()[:12]
 
-#     try:
-#         return json.loads(text)
-#     except json.JSONDecodeError:
-#         return {
-#             "held_constant": "",
-#             "varies": "",
-#             "what_this_leaves_open": "",
-#             "error": "AI synthesis unavailable",
-#             "raw_response": text
-#         }
-
-
-def call_gemini_for_category(category_name, papers_payload):
-    prompt = build_prompt(category_name, papers_payload)
 
-    model = genai.GenerativeModel("gemini-3-flash-preview")
+def compare_category_payloads(selected_rows):
+    return {category: build_category_payload(selected_rows, category) for category in CATEGORY_FIELDS}
 
-    response = model.generate_content(
-        prompt,
-        generation_config={
-            "temperature": 0.2,
-        }
+
+def compare_category_cache_keys(payloads, model_name=None):
+    model_name = model_name or COMPARE_AI_MODEL
+    return {
+        category: hashlib.sha256(
+            "\0".join((model_name, category, build_prompt(category, payload))).encode("utf-8")
+        ).hexdigest()
+        for category, payload in payloads.items()
+    }
+
+
+def compare_result_failed(result):
+    """Whether a category result is a fallback rather than a parsed synthesis."""
+    return not isinstance(result, dict) or "held_constant" not in result
+
+
+def get_cached_category_results(cache_keys):
+    """``{category: result}`` for the categories whose cache entry exists and has not expired."""
+    if not cache_keys:
+        return {}
+    categories = {key: category for category, key in cache_keys.items()}
+    marks = ", ".join("?" * len(categories))
+    conn = get_db_connection()
+    rows = conn.execute(
+        f"""
+        SELECT cache_key, result_json
+        FROM compare_ai_category_cache
+        WHERE cache_key IN ({marks}) AND (expires_at IS NULL OR expires_at > ?)
+        """,
+        list(categories) + [time.time()],
+    ).fetchall()
+    conn.close()
+    return {categories[row["cache_key"]]: json.loads(row["result_json"]) for row in rows}
+
+
+def save_category_result(category_name, cache_key, result, model_name=None):
+    model_name = model_name or COMPARE_AI_MODEL
+    failed = compare_result_failed(result)
+    now = time.time()
+    conn = get_db_connection()
+    conn.execute(
+        """
+        INSERT OR REPLACE INTO compare_ai_category_cache
+            (cache_key, category, result_json, failed, model_name, created_at, expires_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            cache_key,
+            category_name,
+            json.dumps(result),
+            int(failed),
+            model_name,
+            now,
+            now + COMPARE_AI_FAILURE_TTL if failed else None,
+        ),
     )
+    conn.commit()
+    conn.close()
+
+
+# Model access for AI comparisons. COMPARE_AI_PROVIDER picks the provider
+# (gemini, groq, or fake for a deterministic local model); calls are rate
+# limited, bounded by a deadline and retried with jittered backoff, and with
+# COMPARE_AI_HEDGE_PROVIDER set a slow call is also sent to a second provider.
+COMPARE_AI_PROVIDER = (os.environ.get("COMPARE_AI_PROVIDER") or "gemini").strip().lower()
+COMPARE_AI_HEDGE_PROVIDER = (os.environ.get("COMPARE_AI_HEDGE_PROVIDER") or "").strip().lower()
+COMPARE_AI_HEDGE_AFTER = float(os.environ.get("COMPARE_AI_HEDGE_AFTER", "10"))  # seconds
+COMPARE_AI_TIMEOUT = float(os.environ.get("COMPARE_AI_TIMEOUT", "60"))  # seconds per category, retries included
+COMPARE_AI_RETRIES = int(os.environ.get("COMPARE_AI_RETRIES", "2"))
+COMPARE_AI_RATE_PER_MINUTE = float(os.environ.get("COMPARE_AI_RATE_PER_MINUTE", "120"))
+COMPARE_AI_BURST = int(os.environ.get("COMPARE_AI_BURST", "8"))
+
+COMPARE_AI_SYSTEM_PROMPT = "You are a careful research comparison assistant. Return valid JSON only."
+
+
+class LLMProviderError(Exception):
+    """A model call failed or timed out; LLMClient retries these."""
+
+
+class GeminiProvider:
+    """Google Gemini via google.generativeai, with one configured model object shared by all calls."""
+
+    name = "gemini"
+
+    def __init__(self, model):
+        if genai is None:
+            raise RuntimeError("The gemini provider needs the google-generativeai package")
+        genai.configure(api_key=os.environ.get("GEMINI_API_KEY"))
+        self.model = model
+        self._model = genai.GenerativeModel(model)
+
+    def complete(self, prompt, timeout):
+        try:
+            response = self._model.generate_content(
+                prompt,
+                generation_config={"temperature": 0.2},
+                request_options={"timeout": timeout},
+            )
+            return response.text
+        except Exception as e:
+            raise LLMProviderError(f"gemini: {e}") from e
+
+
+class GroqProvider:
+    """Groq chat completions through one shared client (its own retries off; LLMClient retries)."""
+
+    name = "groq"
+
+    def __init__(self, model):
+        if Groq is None:
+            raise RuntimeError("The groq provider needs the groq package")
+        self.model = model
+        self._client = Groq(api_key=os.environ.get("GROQ_API_KEY"), max_retries=0)
+
+    def complete(self, prompt, timeout):
+        try:
+            completion = self._client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": COMPARE_AI_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt},
+                ],
+                temperature=0.2,
+                timeout=timeout,
+            )
+            return completion.choices[0].message.content
+        except Exception as e:
+            raise LLMProviderError(f"groq: {e}") from e
+
+
+class FakeProvider:
+    """Deterministic local model: the reply depends only on the prompt; no network.
+
+    ``latency`` is the time a call takes; with probability ``tail_rate`` it
+    takes ``tail_latency`` instead, and with ``failure_rate`` it fails, so
+    timeouts, retries and hedging can be exercised and benchmarked offline.
+    """
+
+    name = "fake"
+
+    def __init__(self, model="fake", latency=0.0, tail_rate=0.0, tail_latency=0.0, failure_rate=0.0, seed=0):
+        self.model = model
+        self.latency = latency
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def complete(self, prompt, timeout):
+        with self._lock:
+            slow = self._random.random() < self.tail_rate
+            failed = self._random.random() < self.failure_rate
+        delay = self.tail_latency if slow else self.latency
+        if delay > timeout:
+            time.sleep(timeout)
+            raise LLMProviderError(f"fake: no reply within {timeout:.2f} s")
+        time.sleep(delay)
+        if failed:
+            raise LLMProviderError("fake: injected failure")
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+        return json.dumps({
+            "held_constant": f"[{self.model} {digest}] Shared design features.",
+            "varies": f"[{self.model} {digest}] Differences across studies.",
+            "what_this_leaves_open": f"[{self.model} {digest}] Open question.",
+        })
+
+
+# provider name -> (class, default model)
+LLM_PROVIDERS = {
+    "gemini": (GeminiProvider, "gemini-3-flash-preview"),
+    "groq": (GroqProvider, "llama-3.3-70b-versatile"),
+    "fake": (FakeProvider, "fake"),
+}
+
+if COMPARE_AI_PROVIDER not in LLM_PROVIDERS:
+    print(f"Unknown COMPARE_AI_PROVIDER={COMPARE_AI_PROVIDER!r}; using gemini.")
+    COMPARE_AI_PROVIDER = "gemini"
+
+# Model whose results the category cache holds (part of every cache key)
+COMPARE_AI_MODEL = os.environ.get("COMPARE_AI_MODEL") or LLM_PROVIDERS[COMPARE_AI_PROVIDER][1]
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate_per_minute`` tokens a minute, up to ``burst`` saved up."""
+
+    def __init__(self, rate_per_minute, burst=1):
+        if not rate_per_minute or rate_per_minute <= 0 or burst < 1:
+            raise ValueError("TokenBucket needs a positive rate_per_minute and a burst of at least 1")
+        self.interval = 60.0 / rate_per_minute
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline=None):
+        """Take a token, waiting if needed; False if none is free before ``deadline`` (monotonic)."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait_for = (1 - self.tokens) * self.interval
+            if deadline is not None and now + wait_for > deadline:
+                return False
+            time.sleep(wait_for)
+
+
+class LLMClient:
+    """Rate-limited, deadline-bound, retrying calls to ``primary``, optionally hedged to ``hedge``.
+
+    Each ``complete`` call gets ``timeout`` seconds in total. An attempt
+    that fails with LLMProviderError is retried up to ``retries`` times
+    after an exponential, jittered backoff. With a ``hedge`` provider, an
+    attempt still running after ``hedge_after`` seconds is also sent there
+    and the first reply wins.
+    """
+
+    def __init__(self, primary, hedge=None, limiter=None, timeout=60.0, retries=2, hedge_after=10.0, backoff=1.0, max_workers=16):
+        self.primary = primary
+        self.hedge = hedge
+        self.limiter = limiter
+        self.timeout = timeout
+        self.retries = retries
+        self.hedge_after = hedge_after
+        self.backoff = backoff
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-call")
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def complete(self, prompt):
+        """Reply text for ``prompt``; raises LLMProviderError once retries or time run out."""
+        deadline = time.monotonic() + self.timeout
+        attempt = 0
+        while True:
+            try:
+                text = self._complete_once(prompt, deadline)
+                self._count("succeeded")
+                return text
+            except LLMProviderError:
+                delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+                if attempt >= self.retries or time.monotonic() + delay >= deadline:
+                    self._count("failed")
+                    raise
+                attempt += 1
+                self._count("retries")
+                time.sleep(delay)
+
+    def _complete_once(self, prompt, deadline):
+        primary = self._executor.submit(self._call, self.primary, prompt, deadline)
+        pending = {primary}
+        if self.hedge is not None:
+            done, _ = wait(pending, timeout=max(0.0, min(self.hedge_after, deadline - time.monotonic())))
+            if not done:
+                self._count("hedged")
+                pending.add(self._executor.submit(self._call, self.hedge, prompt, deadline))
+
+        error = None
+        while pending:
+            done, pending = wait(
+                pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED
+            )
+            if not done:
+                # Calls still running finish in the background; their replies are dropped
+                self._count("timed_out")
+                raise LLMProviderError(f"no reply within {self.timeout:g} s")
+            for future in done:
+                try:
+                    text = future.result()
+                except LLMProviderError as e:
+                    error = e
+                    continue
+                if future is not primary:
+                    self._count("hedge_won")
+                return text
+        raise error
+
+    def _call(self, provider, prompt, deadline):
+        if self.limiter is not None and not self.limiter.acquire(deadline):
+            self._count("rate_limited")
+            raise LLMProviderError("rate limit leaves no time before the deadline")
+        return provider.complete(prompt, timeout=max(0.001, deadline - time.monotonic()))
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        return {
+            "provider": f"{self.primary.name}:{self.primary.model}",
+            "hedge_provider": f"{self.hedge.name}:{self.hedge.model}" if self.hedge else None,
+            **{name: counts.get(name, 0) for name in ("succeeded", "failed", "retries", "hedged", "hedge_won", "timed_out", "rate_limited")},
+        }
+
+
+# build_llm_client keywords that configure the LLMClient; the rest go to the primary provider
+_LLM_CLIENT_OPTIONS = ("timeout", "retries", "hedge_after", "backoff", "max_workers")
+
+
+def build_llm_client(provider=None, model=None, hedge_provider=None, hedge_model=None, rate_per_minute=None, burst=None, **options):
+    """LLMClient for the named providers; unspecified settings come from the COMPARE_AI_* config.
+
+    ``rate_per_minute=0`` (or COMPARE_AI_RATE_PER_MINUTE=0) turns rate
+    limiting off. Keywords other than the LLMClient options are passed to
+    the primary provider, e.g. ``build_llm_client("fake", latency=0.5)``.
+    """
+    provider = provider or COMPARE_AI_PROVIDER
+    provider_class, default_model = LLM_PROVIDERS[provider]
+    if model is None:
+        model = COMPARE_AI_MODEL if provider == COMPARE_AI_PROVIDER else default_model
+    client_options = {name: options.pop(name) for name in _LLM_CLIENT_OPTIONS if name in options}
+    primary = provider_class(model, **options)
+    hedge = None
+    hedge_provider = COMPARE_AI_HEDGE_PROVIDER if hedge_provider is None else hedge_provider
+    if hedge_provider:
+        hedge_class, hedge_default = LLM_PROVIDERS[hedge_provider]
+        hedge = hedge_class(hedge_model or hedge_default)
+    client_options.setdefault("timeout", COMPARE_AI_TIMEOUT)
+    client_options.setdefault("retries", COMPARE_AI_RETRIES)
+    client_options.setdefault("hedge_after", COMPARE_AI_HEDGE_AFTER)
+    if rate_per_minute is None:
+        rate_per_minute = COMPARE_AI_RATE_PER_MINUTE
+    limiter = TokenBucket(rate_per_minute, burst or COMPARE_AI_BURST) if rate_per_minute > 0 else None
+    return LLMClient(primary, hedge=hedge, limiter=limiter, **client_options)
+
+
+_llm_client = None
+_llm_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """The process-wide LLMClient (created on first use, so importing app.py makes no clients)."""
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client is None:
+            _llm_client = build_llm_client()
+        return _llm_client
+
+
+def set_llm_client(client):
+    """Use ``client`` for AI comparisons from now on; cached results are then keyed on its model."""
+    global _llm_client, COMPARE_AI_MODEL
+    with _llm_client_lock:
+        _llm_client = client
+        COMPARE_AI_MODEL = client.primary.model
+
+
+def call_model_for_category(category_name, papers_payload):
+    prompt = build_prompt(category_name, papers_payload)
 
-    text = response.text.strip()
+    text = get_llm_client().complete(prompt).strip()
 
-    # Clean JSON (Gemini often wraps in ```json)
-    import re
+    # Clean JSON (models often wrap it in ```json)
     text = re.sub(r"^```json\s*", "", text)
     text = re.sub(r"^```\s*", "", text)
     text = re.sub(r"\s*```$", "", text)
@@ -1542,71 +4607,199 @@ def call_gemini_for_category(category_name, papers_payload):
             "raw_response": text
         }
 
-@app.route("/api/compare-ai-differences", methods=["POST"])
-def compare_ai_differences():
+# Category generations of every request share one bounded pool of model calls.
+COMPARE_AI_MAX_WORKERS = int(os.environ.get("COMPARE_AI_MAX_WORKERS", "8"))
+_compare_ai_executor = ThreadPoolExecutor(
+    max_workers=COMPARE_AI_MAX_WORKERS, thread_name_prefix="compare-ai"
+)
+
+
+def generate_category_result(category_name, payload, cache_key):
+    """Ask the model for one category and cache the result (a fallback dict if the call fails)."""
     try:
-        data = request.get_json(force=True)
-        paper_keys = data.get("paper_keys", [])
+        result = call_model_for_category(category_name, payload)
+    except Exception as e:
+        result = {
+            "category": category_name,
+            "comparison": "AI comparison unavailable",
+            "error": str(e)
+        }
+    save_category_result(category_name, cache_key, result)
+    return category_name, result
 
-        if not isinstance(paper_keys, list) or not paper_keys:
-            return jsonify({"error": "paper_keys must be a non-empty list"}), 400
 
-        if len(paper_keys) > 5:
-            return jsonify({"error": "Maximum of 5 papers allowed"}), 400
+def iter_compare_categories(paper_keys, selected_rows):
+    """Yield ``(category, result, source)`` for each category as soon as it is available.
 
-        paper_keys = [str(k).strip() for k in paper_keys]
+    Cached categories come first (``"cache"``). The rest are generated on
+    ``_compare_ai_executor`` under a lease on the paper set's summary row
+    and yielded in completion order (``"generated"``). While another
+    request holds the lease, its results are picked up from the category
+    cache as they land (``"coalesced"``), and generation takes over if the
+    lease expires first.
+    """
+    paper_titles = [row["title"] for row in selected_rows]
+    payloads = compare_category_payloads(selected_rows)
+    cache_keys = compare_category_cache_keys(payloads)
+    results = {}
+
+    def newly_cached():
+        pending = {c: key for c, key in cache_keys.items() if c not in results}
+        fresh = get_cached_category_results(pending)
+        results.update(fresh)
+        return [c for c in CATEGORY_FIELDS if c in fresh]
+
+    for category in newly_cached():
+        yield category, results[category], "cache"
+
+    owner = f"{os.getpid()}-{threading.get_ident()}-{secrets.token_hex(4)}"
+    while len(results) < len(cache_keys):
+        if acquire_compare_lease(paper_keys, paper_titles, owner):
+            break
+        time.sleep(COMPARE_AI_LEASE_POLL_INTERVAL)
+        for category in newly_cached():
+            yield category, results[category], "coalesced"
+    else:
+        return
 
-        cached = get_cached_compare_summary(paper_keys)
-        if cached:
-            return jsonify(cached)
+    try:
+        for category in newly_cached():
+            yield category, results[category], "coalesced"
+        futures = [
+            _compare_ai_executor.submit(generate_category_result, c, payloads[c], cache_keys[c])
+            for c in CATEGORY_FIELDS
+            if c not in results
+        ]
+        for future in as_completed(futures):
+            category, result = future.result()
+            results[category] = result
+            yield category, result, "generated"
+    except BaseException:
+        # Also reached when a streaming client disconnects; submitted calls still finish and cache
+        release_compare_lease(paper_keys, owner)
+        raise
+
+    save_compare_summary(
+        paper_keys,
+        paper_titles,
+        {c: results[c] for c in CATEGORY_FIELDS},
+        model_name=COMPARE_AI_MODEL,
+        prompt_version=COMPARE_AI_PROMPT_VERSION,
+        lease_owner=owner,
+    )
 
-        df = load_papers_df()
-        selected_rows = df[df["paper_key"].isin(paper_keys)].copy()
 
-        if selected_rows.empty:
-            return jsonify({"error": "No matching papers found"}), 404
+def generate_compare_summary(paper_keys, selected_rows):
+    """Complete summary for ``paper_keys``, with every category cached or generated."""
+    results = {}
+    sources = set()
+    for category, result, source in iter_compare_categories(paper_keys, selected_rows):
+        results[category] = result
+        sources.add(source)
 
-        selected_rows["__order"] = selected_rows["paper_key"].apply(lambda x: paper_keys.index(x))
-        selected_rows = selected_rows.sort_values("__order").drop(columns="__order")
+    return {
+        "paper_keys": paper_keys,
+        "paper_titles": [row["title"] for row in selected_rows],
+        "results": {c: results[c] for c in CATEGORY_FIELDS},
+        "source": next((s for s in ("generated", "coalesced") if s in sources), "cache")
+    }
 
-        results = {}
-        from concurrent.futures import ThreadPoolExecutor
 
-        def process_category(category_name):
-            payload = build_category_payload(selected_rows, category_name)
-            return category_name, call_gemini_for_category(category_name, payload)
-            #return category_name, call_groq_for_category(category_name, payload)
+def _compare_request_rows(paper_keys):
+    """``(paper_keys, selected_rows, None)`` for a valid request, else ``(None, None, error response)``."""
+    if not isinstance(paper_keys, list) or not paper_keys:
+        return None, None, (jsonify({"error": "paper_keys must be a non-empty list"}), 400)
 
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            futures = [executor.submit(process_category, c) for c in CATEGORY_FIELDS]
+    if len(paper_keys) > 5:
+        return None, None, (jsonify({"error": "Maximum of 5 papers allowed"}), 400)
 
-            for future in futures:
-                category_name, result = future.result()
-                results[category_name] = result
+    paper_keys = [str(k).strip() for k in paper_keys]
 
-        paper_titles = selected_rows["title"].tolist()
-        save_compare_summary(paper_keys, paper_titles, results)
+    by_key = get_corpus().lookup.by_key
+    selected_rows = [
+        compare_row(by_key[k]) for k in dict.fromkeys(paper_keys) if k in by_key
+    ]
 
-        return jsonify({
-            "paper_keys": paper_keys,
-            "paper_titles": paper_titles,
-            "results": results,
-            "source": "generated"
-        })
+    if not selected_rows:
+        return None, None, (jsonify({"error": "No matching papers found"}), 404)
+    return paper_keys, selected_rows, None
+
+
+@app.route("/api/compare-ai-differences", methods=["POST"])
+def compare_ai_differences():
+    try:
+        data = request.get_json(force=True)
+        paper_keys, selected_rows, error = _compare_request_rows(data.get("paper_keys", []))
+        if error:
+            return error
+
+        cached = get_cached_compare_summary(paper_keys, selected_rows)
+        if cached:
+            return jsonify(cached)
+
+        summary, shared = _compare_ai_flight.do(
+            make_combination_key(paper_keys),
+            lambda: generate_compare_summary(paper_keys, selected_rows),
+        )
+        if shared:
+            summary = dict(summary, source="coalesced")
+        return jsonify(summary)
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.route("/api/compare-ai-differences/stream")
+def compare_ai_differences_stream():
+    """Server-Sent Events variant: one ``category`` event per category as it completes, then ``done``.
+
+    Takes ``paper_keys`` as a comma-separated query parameter (EventSource
+    can only GET). A failure after the stream has started is sent as an
+    ``error`` event.
+    """
+    keys_param = request.args.get("paper_keys", "")
+    paper_keys, selected_rows, error = _compare_request_rows(
+        [k for k in keys_param.split(",") if k.strip()]
+    )
+    if error:
+        return error
+
+    def events():
+        try:
+            for category, result, source in iter_compare_categories(paper_keys, selected_rows):
+                yield _sse_event("category", {"category": category, "result": result, "source": source})
+            yield _sse_event(
+                "done",
+                {"paper_keys": paper_keys, "paper_titles": [row["title"] for row in selected_rows]},
+            )
+        except Exception as e:
+            yield _sse_event("error", {"error": str(e)})
+
+    response = Response(stream_with_context(events()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # Keep reverse proxies (nginx) from buffering the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
 @app.before_request
 def sync_papers_data_with_csv():
-    """Keep in-memory papers in sync with the CSV on disk when the file's modification time changes."""
+    """Keep in-memory papers in sync with the CSV on disk when the file's modification time changes.
+
+    The reload itself runs in the background; this request is served from the
+    current snapshot.
+    """
     if request.endpoint in ("static", None):
         return
     reload_papers_from_csv_if_changed()
 
 
-reload_papers_from_csv_if_changed()
+_corpus = CorpusSnapshot(*_build_corpus_structures([]), version="empty")
+reload_papers_from_csv_if_changed(background=False)
 
 if __name__ == "__main__":
     app.run(debug=True, host="127.0.0.1", port=5001)
\ No newline at end of file
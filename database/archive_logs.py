@@ -0,0 +1,256 @@
+"""
+Move old tracking logs out of tracking.db into compressed monthly archives.
+
+Log rows are partitioned by calendar month of their timestamp. Months older
+than the retention window are written to archive/ next to tracking.db
+(data/output/archive/ by default) as gzipped, column-oriented JSON files
+(one per log table and month) and deleted from tracking.db, which keeps the
+hot database small. The daily rollup tables stay in tracking.db, so
+dashboard totals still cover archived months, and the admin log endpoints
+read the archives when paging past the hot rows. The database is the one
+app.py uses: $TRACKING_DB_PATH, else data/output/tracking.db.
+
+    python database/archive_logs.py                 # keep the last 3 months hot
+    python database/archive_logs.py --keep-months 6 --vacuum
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import sqlite3
+from collections import Counter
+from datetime import date
+
+if __package__:
+    from .init_db import ROLLUP_EVENTS, tracking_db_path
+else:
+    from init_db import ROLLUP_EVENTS, tracking_db_path
+
+ARCHIVE_FORMAT = 1
+DEFAULT_KEEP_MONTHS = 3
+
+_ARCHIVE_NAME_RE = re.compile(r"^(?P<table>[a-z_]+)_(?P<month>\d{4}-\d{2})\.json\.gz$")
+
+
+def default_archive_dir(db_path=None):
+    """``archive/`` next to the tracking database (``tracking_db_path()`` by default)."""
+    return os.path.join(os.path.dirname(db_path or tracking_db_path()) or ".", "archive")
+
+
+def archive_path(table, month, archive_dir=None):
+    return os.path.join(archive_dir or default_archive_dir(), f"{table}_{month}.json.gz")
+
+
+def archived_months(table, archive_dir=None):
+    """Months (YYYY-MM) archived for ``table``, newest first."""
+    archive_dir = archive_dir or default_archive_dir()
+    if not os.path.isdir(archive_dir):
+        return []
+    months = []
+    for name in os.listdir(archive_dir):
+        match = _ARCHIVE_NAME_RE.match(name)
+        if match and match.group("table") == table:
+            months.append(match.group("month"))
+    return sorted(months, reverse=True)
+
+
+def read_archive(table, month, archive_dir=None):
+    """``(columns, rows)`` stored for one table and month; rows are tuples in (timestamp, id) order."""
+    with gzip.open(archive_path(table, month, archive_dir), "rt", encoding="utf-8") as f:
+        archive = json.load(f)
+    columns = archive["columns"]
+    data = archive["data"]
+    return columns, list(zip(*(data[name] for name in columns)))
+
+
+def _write_archive(table, month, columns, rows, archive_dir):
+    """Write one month atomically: column name -> list of values, gzip-compressed."""
+    os.makedirs(archive_dir, exist_ok=True)
+    archive = {
+        "format": ARCHIVE_FORMAT,
+        "table": table,
+        "month": month,
+        "columns": columns,
+        "data": {name: [row[i] for row in rows] for i, name in enumerate(columns)},
+    }
+    path = archive_path(table, month, archive_dir)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=9) as f:
+        json.dump(archive, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def _next_month(month):
+    year, mon = map(int, month.split("-"))
+    return f"{year + mon // 12:04d}-{mon % 12 + 1:02d}"
+
+
+def _cutoff_month(keep_months, today=None):
+    """First month that stays hot: the current month and the ``keep_months - 1`` before it."""
+    today = today or date.today()
+    index = today.year * 12 + today.month - 1 - (keep_months - 1)
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def _month_rollups(table, columns, rows):
+    """``(activity, queries, paper_activity)`` counters for log ``rows``, as the app's writer counts them."""
+    timestamp = columns.index("timestamp")
+    value = columns.index("search_query" if table == "search_logs" else "paper_ids")
+    activity, queries, paper_activity = Counter(), Counter(), Counter()
+    for row in rows:
+        day = row[timestamp][:10]
+        activity[day] += 1
+        if table == "search_logs":
+            if row[value]:
+                queries[day, row[value]] += 1
+            continue
+        try:
+            paper_ids = json.loads(row[value])
+        except (TypeError, ValueError):
+            continue
+        if isinstance(paper_ids, list):
+            for paper_id in paper_ids:
+                paper_activity[day, str(paper_id)] += 1
+    return activity, queries, paper_activity
+
+
+def _sync_month_rollups(conn, table, month, columns, rows):
+    """Make the rollups of ``table`` for ``month`` count exactly ``rows``.
+
+    ``rows`` are all of the month's rows, hot and already archived, so
+    nothing counted for an archived row is lost. Only this month's rollup
+    rows are replaced. Returns True when they had to be corrected.
+    """
+    event = ROLLUP_EVENTS[table]
+    days = f"{month}-%"
+    activity, queries, paper_activity = _month_rollups(table, columns, rows)
+    counted = dict(
+        conn.execute(
+            "SELECT day, count FROM daily_activity WHERE event = ? AND day LIKE ?", (event, days)
+        ).fetchall()
+    )
+    if counted == dict(activity):
+        return False
+
+    conn.execute("DELETE FROM daily_activity WHERE event = ? AND day LIKE ?", (event, days))
+    conn.executemany(
+        "INSERT INTO daily_activity (day, event, count) VALUES (?, ?, ?)",
+        [(day, event, count) for day, count in activity.items()],
+    )
+    if table == "search_logs":
+        # search_query_totals spans all months: swap this month's share
+        old_totals = conn.execute(
+            "SELECT search_query, SUM(count) FROM daily_search_queries WHERE day LIKE ? "
+            "GROUP BY search_query",
+            (days,),
+        ).fetchall()
+        conn.executemany(
+            "UPDATE search_query_totals SET count = count - ? WHERE search_query = ?",
+            [(count, search_query) for search_query, count in old_totals],
+        )
+        conn.execute("DELETE FROM daily_search_queries WHERE day LIKE ?", (days,))
+        conn.executemany(
+            "INSERT INTO daily_search_queries (day, search_query, count) VALUES (?, ?, ?)",
+            [key + (count,) for key, count in queries.items()],
+        )
+        new_totals = Counter()
+        for (_, search_query), count in queries.items():
+            new_totals[search_query] += count
+        conn.executemany(
+            """
+            INSERT INTO search_query_totals (search_query, count) VALUES (?, ?)
+            ON CONFLICT (search_query) DO UPDATE SET count = count + excluded.count
+            """,
+            list(new_totals.items()),
+        )
+        conn.execute("DELETE FROM search_query_totals WHERE count <= 0")
+    else:
+        conn.execute(
+            "DELETE FROM daily_paper_activity WHERE event = ? AND day LIKE ?", (event, days)
+        )
+        conn.executemany(
+            "INSERT INTO daily_paper_activity (day, paper_id, event, count) VALUES (?, ?, ?, ?)",
+            [(day, paper_id, event, count) for (day, paper_id), count in paper_activity.items()],
+        )
+    return True
+
+
+def archive_old_months(conn, keep_months=DEFAULT_KEEP_MONTHS, archive_dir=None, today=None):
+    """Archive and delete log rows older than the retention window.
+
+    Returns ``{(table, month): rows archived}``. Each month is written and
+    deleted in its own transaction, so an interrupted run can simply be
+    run again; rows for a month that already has an archive (late writes,
+    or a re-run) are merged into it. The month's rollups are checked
+    against the merged rows and corrected from them if they disagree, so
+    counts of rows archived earlier are kept.
+    """
+    archive_dir = archive_dir or default_archive_dir()
+    cutoff = _cutoff_month(keep_months, today)
+    archived = {}
+    for table in ROLLUP_EVENTS:
+        months = [
+            row[0]
+            for row in conn.execute(
+                f"SELECT DISTINCT substr(timestamp, 1, 7) FROM {table} WHERE timestamp < ? ORDER BY 1",
+                (cutoff,),
+            )
+        ]
+        for month in months:
+            start, end = f"{month}-01", f"{_next_month(month)}-01"
+            cursor = conn.execute(
+                f"SELECT * FROM {table} WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp, id",
+                (start, end),
+            )
+            columns = [d[0] for d in cursor.description]
+            rows = cursor.fetchall()
+            if not rows:
+                continue
+            with conn:
+                if os.path.exists(archive_path(table, month, archive_dir)):
+                    old_columns, old_rows = read_archive(table, month, archive_dir)
+                    if old_columns != columns:
+                        raise RuntimeError(f"Column mismatch with existing archive {table} {month}")
+                    ids = {row[columns.index("id")] for row in rows}
+                    rows = sorted(
+                        [r for r in old_rows if r[columns.index("id")] not in ids] + rows,
+                        key=lambda r: (r[columns.index("timestamp")], r[columns.index("id")]),
+                    )
+                if _sync_month_rollups(conn, table, month, columns, rows):
+                    print(f"Rollups for {table} {month} were out of date; recounted them from its rows")
+                _write_archive(table, month, columns, rows, archive_dir)
+                deleted = conn.execute(
+                    f"DELETE FROM {table} WHERE timestamp >= ? AND timestamp < ?", (start, end)
+                ).rowcount
+            archived[table, month] = deleted
+    return archived
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--keep-months",
+        type=int,
+        default=DEFAULT_KEEP_MONTHS,
+        help="calendar months kept in tracking.db, the current one included",
+    )
+    parser.add_argument("--vacuum", action="store_true", help="reclaim disk space afterwards")
+    args = parser.parse_args()
+    if args.keep_months < 1:
+        parser.error("--keep-months must be at least 1")
+
+    conn = sqlite3.connect(tracking_db_path(), timeout=30)
+    archived = archive_old_months(conn, args.keep_months)
+    for (table, month), count in sorted(archived.items()):
+        print(f"Archived {count} rows of {table} for {month}")
+    if not archived:
+        print("Nothing to archive")
+    if args.vacuum:
+        conn.execute("VACUUM")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
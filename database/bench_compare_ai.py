@@ -0,0 +1,100 @@
+"""
+Benchmark AI-comparison model calls under tail latency: plain retries vs hedged calls.
+
+Uses app.py's LLMClient with fake providers only, so no network and no API
+keys are needed. Every call normally takes --latency seconds, but a
+--tail-rate fraction of calls takes --tail-latency instead. "plain" waits
+out slow calls (up to the deadline, then retries); "hedged" also sends a
+call that is still running after --hedge-after seconds to a second fake
+provider and takes whichever reply comes first.
+
+    python database/bench_compare_ai.py --calls 400 --threads 16
+    python database/bench_compare_ai.py --tail-rate 0.1 --tail-latency 3 --timeout 2
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def run(client, threads, calls):
+    """Complete ``calls`` prompts from ``threads`` threads; returns (seconds, latencies, failures)."""
+    latencies = []
+    failures = []
+    lock = threading.Lock()
+    start_gate = threading.Barrier(threads + 1)
+
+    def worker(worker_id):
+        mine = []
+        start_gate.wait()
+        for i in range(worker_id, calls, threads):
+            t0 = time.perf_counter()
+            try:
+                client.complete(f"prompt {i}")
+            except Exception as e:
+                failures.append(e)
+            mine.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(mine)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in workers:
+        t.start()
+    start_gate.wait()
+    started = time.perf_counter()
+    for t in workers:
+        t.join()
+    return time.perf_counter() - started, latencies, failures
+
+
+def report(label, elapsed, latencies, failures):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{label:<8} {len(latencies) / elapsed:7.1f} calls/s   "
+        f"p50 {statistics.median(latencies) * 1000:7.1f} ms   p99 {p99 * 1000:7.1f} ms   "
+        f"{len(failures)} failed"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per normal call")
+    parser.add_argument("--tail-rate", type=float, default=0.05, help="fraction of slow calls")
+    parser.add_argument("--tail-latency", type=float, default=1.5, help="seconds per slow call")
+    parser.add_argument("--hedge-after", type=float, default=0.2)
+    parser.add_argument("--timeout", type=float, default=5.0, help="deadline per call, retries included")
+    args = parser.parse_args()
+
+    import app as app_module
+
+    def fake(seed):
+        return app_module.FakeProvider(
+            latency=args.latency, tail_rate=args.tail_rate, tail_latency=args.tail_latency, seed=seed
+        )
+
+    options = {"timeout": args.timeout, "retries": 2, "backoff": 0.05, "max_workers": 2 * args.threads}
+    print(
+        f"{args.threads} threads x {args.calls} calls, {args.tail_rate:.0%} of calls take "
+        f"{args.tail_latency:g} s instead of {args.latency:g} s"
+    )
+
+    plain = app_module.LLMClient(fake(1), **options)
+    report("plain", *run(plain, args.threads, args.calls))
+
+    hedged = app_module.LLMClient(fake(1), hedge=fake(2), hedge_after=args.hedge_after, **options)
+    report("hedged", *run(hedged, args.threads, args.calls))
+    stats = hedged.stats()
+    print(f"         {stats['hedged']} calls hedged, {stats['hedge_won']} answered by the hedge")
+
+
+if __name__ == "__main__":
+    main()
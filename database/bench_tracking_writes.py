@@ -0,0 +1,124 @@
+"""
+Benchmark concurrent /api/track/* writes: connect-per-request vs pooled WAL connections.
+
+Runs against scratch tracking databases in a temporary directory, never the
+real data/output/tracking.db; the corpus snapshot and paper id map app.py
+writes on import go to the scratch directory too (CORPUS_OUTPUT_DIR). "before" opens a new sqlite3 connection per
+request on a rollback-journal database (the old get_db_connection);
+"after" uses the pooled WAL connections from app.py. Each run ends once
+the tracking writer has flushed every queued row.
+
+    python database/bench_tracking_writes.py --threads 8 --requests 250
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "database"))
+
+from init_db import init_database  # noqa: E402
+
+TRACK_CALLS = (
+    ("/api/track/search", {"search_query": "facebook", "filters_used": {}, "num_results": 3}),
+    ("/api/track/compare_view", {"paper_ids": ["paper_001", "paper_002"]}),
+    ("/api/track/download", {"paper_ids": ["paper_001", "paper_002"]}),
+)
+
+
+def legacy_connection():
+    """get_db_connection as it was before pooling."""
+    conn = sqlite3.connect("data/output/tracking.db")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def run(app_module, threads, requests_per_thread):
+    """POST requests from ``threads`` threads; returns (seconds, per-request latencies)."""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    start_gate = threading.Barrier(threads + 1)
+
+    def worker(worker_id):
+        client = app_module.app.test_client()
+        mine = []
+        start_gate.wait()
+        for i in range(requests_per_thread):
+            path, body = TRACK_CALLS[(worker_id + i) % len(TRACK_CALLS)]
+            t0 = time.perf_counter()
+            response = client.post(path, json=body)
+            mine.append(time.perf_counter() - t0)
+            if response.status_code != 200:
+                errors.append(response.get_json())
+        with lock:
+            latencies.extend(mine)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in workers:
+        t.start()
+    start_gate.wait()
+    started = time.perf_counter()
+    for t in workers:
+        t.join()
+    # Count the queued rows as done only once the background writer has stored them
+    app_module._tracking_writer.flush()
+    elapsed = time.perf_counter() - started
+    if errors:
+        print(f"  {len(errors)} failed requests, first: {errors[0]}")
+    return elapsed, latencies
+
+
+def report(label, elapsed, latencies):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{label:<8} {len(latencies) / elapsed:9.0f} req/s   "
+        f"p50 {statistics.median(latencies) * 1000:7.2f} ms   p99 {p99 * 1000:7.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=250, help="requests per thread")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix="tracking-bench-")
+    before_dir = os.path.join(scratch, "before")
+    after_dir = os.path.join(scratch, "after")
+    for path in (before_dir, after_dir):
+        os.makedirs(path)
+        os.chdir(path)
+        init_database()
+    # The old setup: rollback journal, full fsync on every commit
+    conn = sqlite3.connect(os.path.join(before_dir, "data", "output", "tracking.db"))
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.close()
+
+    # app.py resolves data/output/tracking.db against the working directory,
+    # and writes its generated corpus files to CORPUS_OUTPUT_DIR
+    os.environ["CORPUS_OUTPUT_DIR"] = os.path.join(scratch, "corpus")
+    import app as app_module
+
+    pooled_connection = app_module.get_db_connection
+    print(f"{args.threads} threads x {args.requests} requests, scratch dir {scratch}")
+
+    os.chdir(before_dir)
+    app_module.get_db_connection = legacy_connection
+    report("before", *run(app_module, args.threads, args.requests))
+
+    os.chdir(after_dir)
+    app_module.get_db_connection = pooled_connection
+    report("after", *run(app_module, args.threads, args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,17 +4,150 @@ Initialize SQLite database for tracking user activities
 
 import sqlite3
 import os
+import sys
 
 
-def init_database():
+def tracking_db_path():
+    """The tracking database: $TRACKING_DB_PATH, else data/output/tracking.db (relative to the working directory)."""
+    return os.environ.get("TRACKING_DB_PATH") or os.path.join("data", "output", "tracking.db")
+
+# Indexes for the admin log views and time-window queries
+TRACKING_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_search_logs_timestamp ON search_logs (timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_search_logs_query ON search_logs (search_query)",
+    "CREATE INDEX IF NOT EXISTS idx_compare_view_logs_timestamp ON compare_view_logs (timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_download_logs_timestamp ON download_logs (timestamp)",
+)
+
+# Pre-aggregated counts kept up to date as log rows are inserted, so the
+# admin dashboard never scans the raw logs. ``day`` is the YYYY-MM-DD prefix
+# of the log timestamp; ``event`` is search, compare_view or download.
+ROLLUP_TABLES = (
+    """
+    CREATE TABLE IF NOT EXISTS daily_activity (
+        day TEXT NOT NULL,
+        event TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, event)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS daily_search_queries (
+        day TEXT NOT NULL,
+        search_query TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, search_query)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS search_query_totals (
+        search_query TEXT PRIMARY KEY,
+        count INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_search_query_totals_count ON search_query_totals (count DESC)",
+    """
+    CREATE TABLE IF NOT EXISTS daily_paper_activity (
+        day TEXT NOT NULL,
+        paper_id TEXT NOT NULL,
+        event TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, paper_id, event)
+    ) WITHOUT ROWID
+    """,
+)
+
+# Log table -> event name used in the rollups
+ROLLUP_EVENTS = {
+    "search_logs": "search",
+    "compare_view_logs": "compare_view",
+    "download_logs": "download",
+}
+
+
+def create_indexes_and_rollups(conn):
+    """Create tracking indexes and rollup tables; backfill the rollups the first time.
+
+    Returns True when the rollups were (re)built from the raw logs.
+    """
+    existing = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_activity'"
+    ).fetchone()
+    for statement in TRACKING_INDEXES + ROLLUP_TABLES:
+        conn.execute(statement)
+    if existing:
+        return False
+    rebuild_rollups(conn)
+    return True
+
+
+def rebuild_rollups(conn):
+    """Recompute the rollups from the raw log tables (compaction / repair).
+
+    Only days that still have rows in the log tables are recomputed; days
+    whose logs were moved out by database/archive_logs.py keep their counts.
+    A day with both hot and archived rows (late writes to an archived month)
+    is recomputed from its hot rows only; archive_logs.py keeps such months
+    in step itself rather than calling this.
+    """
+    conn.execute("DROP TABLE IF EXISTS temp.rollup_days")
+    conn.execute(
+        "CREATE TEMP TABLE rollup_days AS "
+        + " UNION ".join(
+            f"SELECT substr(timestamp, 1, 10) AS day FROM {table}" for table in ROLLUP_EVENTS
+        )
+    )
+    for rollup in ("daily_activity", "daily_search_queries", "daily_paper_activity"):
+        conn.execute(f"DELETE FROM {rollup} WHERE day IN (SELECT day FROM temp.rollup_days)")
+    conn.execute("DELETE FROM search_query_totals")
+    conn.execute("DROP TABLE temp.rollup_days")
+    for table, event in ROLLUP_EVENTS.items():
+        conn.execute(
+            f"""
+            INSERT INTO daily_activity (day, event, count)
+            SELECT substr(timestamp, 1, 10), ?, COUNT(*) FROM {table}
+            GROUP BY substr(timestamp, 1, 10)
+            """,
+            (event,),
+        )
+    conn.execute(
+        """
+        INSERT INTO daily_search_queries (day, search_query, count)
+        SELECT substr(timestamp, 1, 10), search_query, COUNT(*) FROM search_logs
+        WHERE search_query != ''
+        GROUP BY substr(timestamp, 1, 10), search_query
+        """
+    )
+    conn.execute(
+        """
+        INSERT INTO search_query_totals (search_query, count)
+        SELECT search_query, SUM(count) FROM daily_search_queries GROUP BY search_query
+        """
+    )
+    for table in ("compare_view_logs", "download_logs"):
+        conn.execute(
+            f"""
+            INSERT INTO daily_paper_activity (day, paper_id, event, count)
+            SELECT substr(l.timestamp, 1, 10), p.value, ?, COUNT(*)
+            FROM {table} l, json_each(l.paper_ids) p
+            WHERE json_valid(l.paper_ids)
+            GROUP BY substr(l.timestamp, 1, 10), p.value
+            """,
+            (ROLLUP_EVENTS[table],),
+        )
+
+
+def init_database(db_path=None):
     """Create the tracking database and tables"""
-    db_path = os.path.join("data", "output", "tracking.db")
+    db_path = db_path or tracking_db_path()
 
     # Create output directory if it doesn't exist
-    os.makedirs(os.path.join("data", "output"), exist_ok=True)
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
 
     # Connect to database (creates file if it doesn't exist)
     conn = sqlite3.connect(db_path)
+    # WAL lets the app's pooled connections read while another one writes
+    conn.execute("PRAGMA journal_mode=WAL")
     cursor = conn.cursor()
 
     # Create search_logs table
@@ -75,6 +208,8 @@ def init_database():
     """
     )
 
+    create_indexes_and_rollups(conn)
+
     # Commit changes and close connection
     conn.commit()
     conn.close()
@@ -85,7 +220,14 @@ def init_database():
     print("  - compare_view_logs")
     print("  - download_logs")
     print("  - upload_requests")
+    print("  - daily_activity, daily_search_queries, search_query_totals, daily_paper_activity")
 
 
 if __name__ == "__main__":
     init_database()
+    if "--rebuild-rollups" in sys.argv[1:]:
+        conn = sqlite3.connect(tracking_db_path())
+        with conn:
+            rebuild_rollups(conn)
+        conn.close()
+        print("Rollup tables rebuilt from the raw logs")
@@ -0,0 +1,233 @@
+"""
+Pre-generate AI comparisons for the paper sets people are likely to open.
+
+Candidate sets are mined from compare_view_logs (archived months included):
+every set of 2-5 papers opened at least --min-count times, plus all pairs
+among the --top-papers most compared papers (from the daily_paper_activity
+rollup). Each set goes through the same code path as
+/api/compare-ai-differences, so results land in compare_ai_category_cache
+and are served as cache hits; categories that are already cached cost
+nothing.
+
+Model calls go through app.py's LLM client (COMPARE_AI_PROVIDER and the
+other COMPARE_AI_* settings), capped at --rate per minute, and --concurrency
+sets run at a time. Finished sets are recorded in a checkpoint file, so an
+interrupted run picks up where it stopped. --stub uses the fake provider
+(cached under its own model name, so it never answers real requests) and
+writes its results to a separate database, data/output/precompute_stub.db
+unless --database names another one; the real tracking.db is only read
+for the candidate sets.
+
+    python database/precompute_compare_ai.py --dry-run
+    python database/precompute_compare_ai.py --top-papers 10 --rate 30
+    python database/precompute_compare_ai.py --stub --checkpoint /tmp/stub.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "database"))
+
+from archive_logs import archived_months, default_archive_dir, read_archive  # noqa: E402
+from init_db import init_database, tracking_db_path  # noqa: E402
+
+DEFAULT_CHECKPOINT = os.path.join("data", "output", "precompute_compare_ai.json")
+TRACKING_DB = tracking_db_path()
+STUB_DATABASE = os.path.join("data", "output", "precompute_stub.db")
+STUB_CHECKPOINT = os.path.join("data", "output", "precompute_compare_ai_stub.json")
+STUB_MODEL = "local-stub"
+MAX_SET_SIZE = 5
+
+
+def _compare_view_ids(conn):
+    """paper_ids lists of every compare view, hot rows and archived months."""
+    for (paper_ids,) in conn.execute("SELECT paper_ids FROM compare_view_logs"):
+        yield paper_ids
+    archive_dir = default_archive_dir(TRACKING_DB)
+    for month in archived_months("compare_view_logs", archive_dir):
+        columns, rows = read_archive("compare_view_logs", month, archive_dir)
+        position = columns.index("paper_ids")
+        for row in rows:
+            yield row[position]
+
+
+def mine_candidate_sets(conn, by_id, min_count, top_papers):
+    """``[(paper_keys, score)]``, most requested first.
+
+    ``by_id`` maps paper id -> paper; ids no longer in the corpus are dropped.
+    The score of a logged set is how often it was opened; pairs among the top
+    papers that were never opened together score 0.
+    """
+    counts = Counter()
+    for paper_ids in _compare_view_ids(conn):
+        try:
+            ids = json.loads(paper_ids)
+        except (TypeError, ValueError):
+            continue
+        if not isinstance(ids, list):
+            continue
+        keys = sorted({by_id[i]["paper_key"] for i in map(str, ids) if i in by_id})
+        if 2 <= len(keys) <= MAX_SET_SIZE:
+            counts[tuple(keys)] += 1
+
+    candidates = {keys: count for keys, count in counts.items() if count >= min_count}
+    if top_papers:
+        top_ids = [
+            row[0]
+            for row in conn.execute(
+                """
+                SELECT paper_id FROM daily_paper_activity
+                WHERE event = 'compare_view'
+                GROUP BY paper_id
+                ORDER BY SUM(count) DESC, paper_id
+                LIMIT ?
+                """,
+                (top_papers,),
+            )
+        ]
+        top_keys = [by_id[i]["paper_key"] for i in top_ids if i in by_id]
+        for pair in itertools.combinations(sorted(set(top_keys)), 2):
+            candidates.setdefault(pair, counts.get(pair, 0))
+    return sorted(candidates.items(), key=lambda item: (-item[1], item[0]))
+
+
+def load_checkpoint(path, model_name):
+    """Combination keys already finished for ``model_name`` (empty for another model)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return set()
+    if checkpoint.get("model") != model_name:
+        return set()
+    return set(checkpoint.get("done", []))
+
+
+def save_checkpoint(path, model_name, done):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"model": model_name, "done": sorted(done)}, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--min-count", type=int, default=2, help="opens needed for a logged set")
+    parser.add_argument("--top-papers", type=int, default=10, help="also all pairs among the N most compared papers")
+    parser.add_argument("--limit", type=int, default=0, help="stop after this many sets (0: no limit)")
+    parser.add_argument("--concurrency", type=int, default=2, help="sets generated at a time")
+    parser.add_argument("--rate", type=float, default=30, help="model calls per minute")
+    parser.add_argument(
+        "--checkpoint", help=f"default {DEFAULT_CHECKPOINT}, or {STUB_CHECKPOINT} with --stub"
+    )
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint")
+    parser.add_argument("--stub", action="store_true", help="use the local stub model")
+    parser.add_argument(
+        "--database",
+        help=f"tracking database the results are written to (default {TRACKING_DB}, "
+        f"or {STUB_DATABASE} with --stub)",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="only list the candidate sets")
+    args = parser.parse_args()
+    if args.concurrency < 1 or args.rate <= 0:
+        parser.error("--concurrency and --rate must be positive")
+
+    # app.py resolves data/output/tracking.db against the working directory
+    os.chdir(ROOT)
+    args.checkpoint = args.checkpoint or (STUB_CHECKPOINT if args.stub else DEFAULT_CHECKPOINT)
+    database = args.database or (STUB_DATABASE if args.stub else TRACKING_DB)
+    if args.stub and os.path.abspath(database) == os.path.abspath(TRACKING_DB):
+        parser.error("--stub results must not go into the real tracking database")
+    if os.path.abspath(database) != os.path.abspath(TRACKING_DB):
+        init_database(database)
+        os.environ["TRACKING_DB_PATH"] = database
+    import app as app_module
+
+    burst = min(4, max(1, int(args.rate)))
+    if args.stub:
+        client = app_module.build_llm_client(
+            "fake", model=STUB_MODEL, hedge_provider="", rate_per_minute=args.rate, burst=burst
+        )
+    else:
+        client = app_module.build_llm_client(rate_per_minute=args.rate, burst=burst)
+    app_module.set_llm_client(client)
+    model_name = app_module.COMPARE_AI_MODEL
+
+    corpus = app_module.get_corpus()
+    by_id = {paper["id"]: paper for paper in corpus.papers}
+    by_key = {paper["paper_key"]: paper for paper in by_id.values()}
+    # Candidate sets always come from the real logs, read-only
+    conn = sqlite3.connect(f"file:{TRACKING_DB}?mode=ro", uri=True, timeout=30)
+    candidates = mine_candidate_sets(conn, by_id, args.min_count, args.top_papers)
+    conn.close()
+
+    done = set() if args.restart else load_checkpoint(args.checkpoint, model_name)
+    pending = [
+        (keys, score)
+        for keys, score in candidates
+        if app_module.make_combination_key(keys) not in done
+    ]
+    print(
+        f"{len(candidates)} candidate sets, {len(candidates) - len(pending)} already done "
+        f"for model {model_name}; results go to {database}"
+    )
+    if args.limit:
+        pending = pending[: args.limit]
+    if args.dry_run:
+        for keys, score in pending:
+            titles = " | ".join(by_key[k]["title"][:50] for k in keys)
+            print(f"{score:5d}  {titles}")
+        return
+
+    lock = threading.Lock()
+    totals = Counter()
+
+    def generate(keys):
+        rows = [app_module.compare_row(by_key[k]) for k in keys]
+        summary = app_module.generate_compare_summary(list(keys), rows)
+        failed = [
+            c for c, result in summary["results"].items() if app_module.compare_result_failed(result)
+        ]
+        return summary["source"], failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = {executor.submit(generate, keys): keys for keys, _ in pending}
+        for future in as_completed(futures):
+            keys = futures[future]
+            try:
+                source, failed = future.result()
+            except Exception as e:
+                totals["error"] += 1
+                print(f"error     {len(keys)} papers: {e}")
+                continue
+            if failed:
+                # Failures are cached only briefly; leave the set for the next run
+                totals["failed"] += 1
+                print(f"failed    {len(keys)} papers: {', '.join(failed)}")
+                continue
+            totals[source] += 1
+            with lock:
+                done.add(app_module.make_combination_key(keys))
+                save_checkpoint(args.checkpoint, model_name, done)
+            print(f"{source:<9} {len(keys)} papers")
+
+    elapsed = time.perf_counter() - started
+    summary = ", ".join(f"{count} {name}" for name, count in sorted(totals.items())) or "nothing"
+    print(f"Finished in {elapsed:.1f} s: {summary}")
+    print(f"Model calls: {client.stats()}")
+
+
+if __name__ == "__main__":
+    main()
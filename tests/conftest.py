@@ -0,0 +1,45 @@
+"""
+Test setup: app.py is imported once per session with its tracking database
+and generated corpus files in a temporary directory, and with the fake model
+provider, so tests never touch data/output or the network.
+"""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "database"))
+
+_SCRATCH = tempfile.mkdtemp(prefix="app-tests-")
+atexit.register(shutil.rmtree, _SCRATCH, ignore_errors=True)
+os.environ["TRACKING_DB_PATH"] = os.path.join(_SCRATCH, "tracking.db")
+os.environ["CORPUS_OUTPUT_DIR"] = os.path.join(_SCRATCH, "output")
+os.environ["COMPARE_AI_PROVIDER"] = "fake"
+os.environ.setdefault("PAPERS_BACKEND", "memory")
+
+from init_db import init_database  # noqa: E402
+
+init_database(os.environ["TRACKING_DB_PATH"])
+
+import app as app_module  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    return app_module
+
+
+@pytest.fixture
+def client(app):
+    return app.app.test_client()
+
+
+@pytest.fixture
+def corpus(app):
+    return app.get_corpus()
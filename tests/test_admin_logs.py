@@ -0,0 +1,99 @@
+import uuid
+
+import pytest
+
+
+@pytest.fixture
+def admin(client):
+    with client.session_transaction() as session:
+        session["is_admin"] = True
+    return client
+
+
+@pytest.fixture
+def session_rows(app):
+    """Search log rows under a session id of their own (two share a timestamp)."""
+    session_id = f"logs-{uuid.uuid4().hex[:8]}"
+    rows = [
+        ("2026-03-01 08:00:00", "alpha"),
+        ("2026-03-01 09:00:00", "beta"),
+        ("2026-03-01 09:00:00", "Gamma"),
+        ("2026-03-02 10:00:00", "delta"),
+        ("2026-03-03 11:00:00", "alphabet"),
+    ]
+    conn = app.get_db_connection()
+    with conn:
+        conn.executemany(
+            "INSERT INTO search_logs (timestamp, search_query, filters_used, num_results, user_session) "
+            "VALUES (?, ?, '{}', 0, ?)",
+            [(ts, q, session_id) for ts, q in rows],
+        )
+    conn.close()
+    return session_id
+
+
+def fetch(admin, **params):
+    response = admin.get("/api/admin/search_logs", query_string=params)
+    assert response.status_code == 200, response.get_json()
+    return response
+
+
+def test_logs_need_a_login(client):
+    assert client.get("/api/admin/search_logs").status_code == 401
+
+
+def test_before_cursors_walk_every_row_newest_first(admin, session_rows):
+    seen = []
+    params = {"session": session_rows, "limit": 2}
+    while True:
+        response = fetch(admin, **params)
+        seen.extend((row["timestamp"], row["id"], row["search_query"]) for row in response.get_json())
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["before"] = response.headers["X-Next-Cursor"]
+    assert [q for _, _, q in seen] == ["alphabet", "delta", "Gamma", "beta", "alpha"]
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_since_cursor_returns_newer_rows_oldest_first(app, admin, session_rows):
+    first = fetch(admin, session=session_rows, limit=1)
+    latest = first.headers["X-Latest-Cursor"]
+    assert fetch(admin, session=session_rows, since=latest).get_json() == []
+
+    conn = app.get_db_connection()
+    with conn:
+        conn.executemany(
+            "INSERT INTO search_logs (timestamp, search_query, filters_used, num_results, user_session) "
+            "VALUES (?, ?, '{}', 0, ?)",
+            [("2026-03-04 08:00:00", "new-1", session_rows), ("2026-03-04 09:00:00", "new-2", session_rows)],
+        )
+    conn.close()
+    newer = fetch(admin, session=session_rows, since=latest, limit=1)
+    assert [row["search_query"] for row in newer.get_json()] == ["new-1"]
+    assert newer.headers["X-More"] == "1"
+    rest = fetch(admin, session=session_rows, since=newer.headers["X-Latest-Cursor"])
+    assert [row["search_query"] for row in rest.get_json()] == ["new-2"]
+    assert "X-More" not in rest.headers
+
+
+def test_server_side_filters(admin, session_rows):
+    def queries(**params):
+        return [row["search_query"] for row in fetch(admin, session=session_rows, **params).get_json()]
+
+    assert queries(date_from="2026-03-02") == ["alphabet", "delta"]
+    assert queries(date_to="2026-03-01") == ["Gamma", "beta", "alpha"]
+    assert queries(q="ALPHA") == ["alphabet", "alpha"]
+    assert queries(q="gamma", date_from="2026-03-01", date_to="2026-03-01") == ["Gamma"]
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"limit": "ten"},
+        {"before": "not-a-cursor"},
+        {"date_from": "03/01/2026"},
+        {"before": "WyIyMDI2IiwgMV0=", "since": "WyIyMDI2IiwgMV0="},
+    ],
+)
+def test_invalid_parameters_are_rejected(admin, params):
+    assert admin.get("/api/admin/search_logs", query_string=params).status_code == 400
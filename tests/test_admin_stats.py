@@ -0,0 +1,84 @@
+import sqlite3
+
+import pytest
+from init_db import init_database, rebuild_rollups
+
+ROLLUP_QUERIES = {
+    "daily_activity": "SELECT day, event, count FROM daily_activity ORDER BY 1, 2",
+    "daily_search_queries": "SELECT day, search_query, count FROM daily_search_queries ORDER BY 1, 2",
+    "search_query_totals": "SELECT search_query, count FROM search_query_totals ORDER BY 1",
+    "daily_paper_activity": "SELECT day, paper_id, event, count FROM daily_paper_activity ORDER BY 1, 2, 3",
+}
+
+EVENTS = [
+    ("search_logs", ("2026-02-01 09:00:00", "sleep", "{}", 3, "s1")),
+    ("search_logs", ("2026-02-01 10:00:00", "sleep", "{}", 1, "s2")),
+    ("search_logs", ("2026-02-02 10:00:00", "", "{}", 12, "s2")),
+    ("search_logs", ("2026-02-02 11:00:00", "anxiety", "{}", 0, "s3")),
+    ("compare_view_logs", ("2026-02-01 09:30:00", '["paper_001", "paper_002"]', 2, "s1")),
+    ("compare_view_logs", ("2026-02-02 09:30:00", '["paper_002"]', 1, "s1")),
+    ("download_logs", ("2026-02-02 12:00:00", '["paper_001"]', 1, "csv", "s3")),
+]
+
+
+@pytest.fixture
+def tracking_db(tmp_path):
+    path = str(tmp_path / "tracking.db")
+    init_database(path)
+    conn = sqlite3.connect(path)
+    yield conn
+    conn.close()
+
+
+def rollups(conn):
+    return {name: conn.execute(sql).fetchall() for name, sql in ROLLUP_QUERIES.items()}
+
+
+def test_incremental_rollups_equal_a_rebuild_from_the_logs(app, tracking_db):
+    app.TrackingEventWriter._insert(tracking_db, EVENTS[:3])
+    app.TrackingEventWriter._insert(tracking_db, EVENTS[3:])
+    incremental = rollups(tracking_db)
+    assert incremental["daily_activity"] == [
+        ("2026-02-01", "compare_view", 1),
+        ("2026-02-01", "search", 2),
+        ("2026-02-02", "compare_view", 1),
+        ("2026-02-02", "download", 1),
+        ("2026-02-02", "search", 2),
+    ]
+    assert incremental["search_query_totals"] == [("anxiety", 1), ("sleep", 2)]
+    with tracking_db:
+        rebuild_rollups(tracking_db)
+    assert rollups(tracking_db) == incremental
+
+
+def test_activity_counts_since_a_day(app, tracking_db):
+    app.TrackingEventWriter._insert(tracking_db, EVENTS)
+    tracking_db.row_factory = sqlite3.Row
+    assert app._activity_counts(tracking_db) == {"search": 4, "compare_view": 2, "download": 1}
+    assert app._activity_counts(tracking_db, "2026-02-02") == {
+        "search": 2,
+        "compare_view": 1,
+        "download": 1,
+    }
+
+
+def test_admin_stats_need_a_login(client):
+    assert client.get("/api/admin/stats").status_code == 401
+
+
+def test_admin_stats_report_rollup_totals(app, client):
+    with client.session_transaction() as session:
+        session["is_admin"] = True
+    before = client.get("/api/admin/stats").get_json()
+    writer = app._tracking_writer
+    writer.submit("search_logs", ("2026-02-03 10:00:00", "stats-test", "{}", 1, "s"))
+    writer.submit("download_logs", ("2026-02-03 10:00:00", '["paper_001"]', 1, "csv", "s"))
+    writer.flush()
+    after = client.get("/api/admin/stats").get_json()
+    assert after["total_searches"] == before["total_searches"] + 1
+    assert after["total_downloads"] == before["total_downloads"] + 1
+    assert {"search_query": "stats-test", "count": 1} in after["top_searches"] or len(
+        after["top_searches"]
+    ) == 10
+    public = client.get("/api/tracking/stats").get_json()
+    assert public["total_downloads"] == after["total_downloads"]
@@ -0,0 +1,132 @@
+import os
+import sqlite3
+import sys
+import uuid
+from datetime import date
+
+import archive_logs
+import pytest
+from init_db import init_database
+
+TODAY = date(2026, 6, 15)  # with keep_months=3, months before 2026-04 are archived
+
+
+def search_row(timestamp, query):
+    return ("search_logs", (timestamp, query, "{}", 1, "s"))
+
+
+def compare_row(timestamp, paper_ids):
+    return ("compare_view_logs", (timestamp, paper_ids, 2, "s"))
+
+
+@pytest.fixture
+def tracking_db(tmp_path):
+    path = str(tmp_path / "tracking.db")
+    init_database(path)
+    conn = sqlite3.connect(path)
+    yield conn
+    conn.close()
+
+
+def rollup_totals(conn):
+    return {
+        "activity": dict(
+            conn.execute("SELECT event, SUM(count) FROM daily_activity GROUP BY event").fetchall()
+        ),
+        "queries": dict(conn.execute("SELECT search_query, count FROM search_query_totals").fetchall()),
+        "papers": dict(
+            conn.execute(
+                "SELECT paper_id, SUM(count) FROM daily_paper_activity GROUP BY paper_id"
+            ).fetchall()
+        ),
+    }
+
+
+def test_archived_rows_leave_the_database_and_keep_their_counts(app, tracking_db, tmp_path):
+    app.TrackingEventWriter._insert(
+        tracking_db,
+        [
+            search_row("2026-01-05 10:00:00", "sleep"),
+            search_row("2026-01-06 10:00:00", "sleep"),
+            search_row("2026-05-01 10:00:00", "recent"),
+            compare_row("2026-02-01 10:00:00", '["paper_001", "paper_002"]'),
+        ],
+    )
+    totals = rollup_totals(tracking_db)
+    archive_dir = str(tmp_path / "archive")
+    archived = archive_logs.archive_old_months(tracking_db, archive_dir=archive_dir, today=TODAY)
+    assert archived == {("search_logs", "2026-01"): 2, ("compare_view_logs", "2026-02"): 1}
+    assert tracking_db.execute("SELECT search_query FROM search_logs").fetchall() == [("recent",)]
+    columns, rows = archive_logs.read_archive("search_logs", "2026-01", archive_dir)
+    assert [row[columns.index("search_query")] for row in rows] == ["sleep", "sleep"]
+    assert rollup_totals(tracking_db) == totals
+
+
+def test_late_rows_for_an_archived_month_keep_the_archived_counts(app, tracking_db, tmp_path):
+    archive_dir = str(tmp_path / "archive")
+    app.TrackingEventWriter._insert(
+        tracking_db,
+        [search_row("2026-01-05 10:00:00", "sleep"), search_row("2026-01-05 11:00:00", "sleep")],
+    )
+    archive_logs.archive_old_months(tracking_db, archive_dir=archive_dir, today=TODAY)
+    # A late write for the same day, counted in the rollups by the writer
+    app.TrackingEventWriter._insert(tracking_db, [search_row("2026-01-05 12:00:00", "sleep")])
+    # and one that bypassed the rollups
+    with tracking_db:
+        tracking_db.execute(
+            "INSERT INTO search_logs (timestamp, search_query, filters_used, num_results, user_session) "
+            "VALUES ('2026-01-05 13:00:00', 'sleep', '{}', 1, 's')"
+        )
+
+    archive_logs.archive_old_months(tracking_db, archive_dir=archive_dir, today=TODAY)
+    _, rows = archive_logs.read_archive("search_logs", "2026-01", archive_dir)
+    assert len(rows) == 4
+    assert tracking_db.execute(
+        "SELECT count FROM daily_activity WHERE day = '2026-01-05' AND event = 'search'"
+    ).fetchone() == (4,)
+    assert rollup_totals(tracking_db)["queries"] == {"sleep": 4}
+    assert tracking_db.execute(
+        "SELECT count FROM daily_search_queries WHERE day = '2026-01-05'"
+    ).fetchone() == (4,)
+
+    # Running again changes nothing
+    assert archive_logs.archive_old_months(tracking_db, archive_dir=archive_dir, today=TODAY) == {}
+    assert rollup_totals(tracking_db)["queries"] == {"sleep": 4}
+
+
+def test_main_uses_the_apps_tracking_database(app, tracking_db, tmp_path, monkeypatch):
+    db_path = tracking_db.execute("PRAGMA database_list").fetchone()[2]
+    app.TrackingEventWriter._insert(tracking_db, [search_row("2020-01-05 10:00:00", "old")])
+    tracking_db.close()
+    monkeypatch.setenv("TRACKING_DB_PATH", db_path)
+    monkeypatch.setattr(sys, "argv", ["archive_logs.py"])
+    archive_logs.main()
+    assert archive_logs.archived_months("search_logs") == ["2020-01"]
+    assert os.path.isfile(tmp_path / "archive" / "search_logs_2020-01.json.gz")
+
+
+def test_admin_log_pages_continue_into_the_archive(app, client):
+    session_id = f"archive-{uuid.uuid4().hex[:8]}"
+    conn = app.get_db_connection()
+    with conn:
+        conn.executemany(
+            "INSERT INTO search_logs (timestamp, search_query, filters_used, num_results, user_session) "
+            "VALUES (?, ?, '{}', 0, ?)",
+            [
+                ("2019-01-10 10:00:00", "archived-1", session_id),
+                ("2019-01-20 10:00:00", "archived-2", session_id),
+                ("2019-03-01 10:00:00", "hot", session_id),
+            ],
+        )
+    try:
+        archive_logs.archive_old_months(conn, keep_months=2, archive_dir=app.ARCHIVE_DIR, today=date(2019, 3, 5))
+    finally:
+        conn.close()
+    with client.session_transaction() as session:
+        session["is_admin"] = True
+    first = client.get(f"/api/admin/search_logs?session={session_id}&limit=2")
+    assert [row["search_query"] for row in first.get_json()] == ["hot", "archived-2"]
+    rest = client.get(
+        f"/api/admin/search_logs?session={session_id}&limit=2&before={first.headers['X-Next-Cursor']}"
+    )
+    assert [row["search_query"] for row in rest.get_json()] == ["archived-1"]
@@ -0,0 +1,268 @@
+import json
+import threading
+import uuid
+
+import pytest
+
+
+class CountingProvider:
+    """FakeProvider wrapper that counts calls and can be held until released."""
+
+    def __init__(self, app, latency=0.0):
+        self._fake = app.FakeProvider(model=f"test-{uuid.uuid4().hex[:8]}", latency=latency)
+        self.name = "fake"
+        self.model = self._fake.model
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+        self._lock = threading.Lock()
+
+    def complete(self, prompt, timeout):
+        with self._lock:
+            self.calls += 1
+        self.release.wait(timeout)
+        return self._fake.complete(prompt, timeout)
+
+
+@pytest.fixture
+def provider(app):
+    """A fresh model (so nothing is cached for it) used for every AI comparison in the test."""
+    saved = app._llm_client
+    provider = CountingProvider(app)
+    app.set_llm_client(app.LLMClient(provider, timeout=10, retries=0))
+    yield provider
+    if saved is None:
+        app._llm_client = None
+        app.COMPARE_AI_MODEL = app.LLM_PROVIDERS[app.COMPARE_AI_PROVIDER][1]
+    else:
+        app.set_llm_client(saved)
+
+
+@pytest.fixture
+def paper_keys(corpus):
+    return [corpus.papers[0]["paper_key"], corpus.papers[1]["paper_key"]]
+
+
+def post_compare(client, paper_keys):
+    response = client.post("/api/compare-ai-differences", json={"paper_keys": paper_keys})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+@pytest.mark.parametrize(
+    "paper_keys, status",
+    [
+        ("not-a-list", 400),
+        ([], 400),
+        (["a", "b", "c", "d", "e", "f"], 400),
+        (["no-such-paper"], 404),
+    ],
+)
+def test_invalid_paper_selections_are_rejected(client, paper_keys, status):
+    response = client.post("/api/compare-ai-differences", json={"paper_keys": paper_keys})
+    assert response.status_code == status
+    assert "error" in response.get_json()
+
+
+def test_selected_rows_come_from_the_corpus_in_request_order(app, corpus):
+    second, first = corpus.papers[1], corpus.papers[0]
+    with app.app.test_request_context():
+        keys, rows, error = app._compare_request_rows(
+            [f" {second['paper_key']} ", first["paper_key"], second["paper_key"], "unknown"]
+        )
+    assert error is None
+    assert [row["paper_key"] for row in rows] == [second["paper_key"], first["paper_key"]]
+    assert rows[0]["title"] == second["title"]
+    assert rows[0]["country_region"] == second["extracted_features"]["country_region"]
+
+
+def test_category_payload_keeps_csv_values_as_text(app, corpus):
+    rows = [app.compare_row(p) for p in corpus.papers[:2]]
+    category = next(iter(app.CATEGORY_FIELDS))
+    payload = app.build_category_payload(rows, category)
+    assert len(payload) == 2
+    assert list(payload[0]) == list(app.CATEGORY_FIELDS[category])
+    for item, row in zip(payload, rows):
+        assert item == {f: app.clean_value(row.get(f, "")) for f in app.CATEGORY_FIELDS[category]}
+        assert all(isinstance(v, str) for v in item.values())
+
+
+def test_generates_each_category_once_then_serves_the_cache(app, client, provider, paper_keys):
+    first = post_compare(client, paper_keys)
+    assert first["source"] == "generated"
+    assert set(first["results"]) == set(app.CATEGORY_FIELDS)
+    assert provider.calls == len(app.CATEGORY_FIELDS)
+
+    second = post_compare(client, paper_keys)
+    assert second["source"] == "cache"
+    assert second["results"] == first["results"]
+    assert provider.calls == len(app.CATEGORY_FIELDS)
+
+
+def test_concurrent_identical_requests_share_one_generation(app, provider, paper_keys):
+    provider.release.clear()
+    responses = []
+    lock = threading.Lock()
+
+    def request():
+        body = post_compare(app.app.test_client(), paper_keys)
+        with lock:
+            responses.append(body)
+
+    threads = [threading.Thread(target=request) for _ in range(5)]
+    for t in threads:
+        t.start()
+    # Let every request arrive while the leader's model calls are held
+    while app._compare_ai_flight.stats()["in_flight"] == 0:
+        threading.Event().wait(0.01)
+    threading.Event().wait(0.2)
+    provider.release.set()
+    for t in threads:
+        t.join(10)
+
+    assert len(responses) == 5
+    assert provider.calls == len(app.CATEGORY_FIELDS)
+    sources = sorted(r["source"] for r in responses)
+    assert sources.count("generated") == 1
+    assert all(source in ("generated", "coalesced", "cache") for source in sources)
+    assert all(r["results"] == responses[0]["results"] for r in responses)
+
+
+def test_lease_blocks_other_owners_until_released(app, paper_keys):
+    titles = ["a", "b"]
+    assert app.acquire_compare_lease(paper_keys, titles, "owner-1")
+    assert not app.acquire_compare_lease(paper_keys, titles, "owner-2")
+    app.release_compare_lease(paper_keys, "owner-1")
+    assert app.acquire_compare_lease(paper_keys, titles, "owner-2")
+    app.release_compare_lease(paper_keys, "owner-2")
+
+
+def test_releasing_a_lease_keeps_stored_results(app, client, provider, paper_keys):
+    post_compare(client, paper_keys)
+    key = app.make_combination_key(paper_keys)
+
+    def stored():
+        conn = app.get_db_connection()
+        try:
+            return conn.execute(
+                "SELECT paper_keys_json, findings, lease_owner FROM compare_ai_summaries "
+                "WHERE combination_key = ?",
+                (key,),
+            ).fetchone()
+        finally:
+            conn.close()
+
+    assert app.acquire_compare_lease(paper_keys, ["a", "b"], "owner")
+    app.release_compare_lease(paper_keys, "owner")
+    row = stored()
+    assert row is not None
+    assert json.loads(row["paper_keys_json"]) == sorted(paper_keys)
+    assert row["findings"] is not None
+    assert row["lease_owner"] is None
+
+
+def test_single_flight_shares_exceptions(app):
+    flight = app.SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    outcomes = []
+
+    def leader():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("model down")
+
+    def call(fn):
+        try:
+            outcomes.append(flight.do("k", fn))
+        except RuntimeError as e:
+            outcomes.append(e)
+
+    first = threading.Thread(target=call, args=(leader,))
+    first.start()
+    started.wait(5)
+    follower = threading.Thread(target=call, args=(lambda: "never called",))
+    follower.start()
+    threading.Event().wait(0.1)
+    release.set()
+    first.join(5)
+    follower.join(5)
+    assert len(outcomes) == 2
+    assert all(isinstance(o, RuntimeError) for o in outcomes)
+
+
+def test_failed_category_is_regenerated_alone(app, client, provider, paper_keys, monkeypatch):
+    post_compare(client, paper_keys)
+    calls = provider.calls
+    payloads = app.compare_category_payloads(
+        [app.compare_row(app.get_corpus().lookup.by_key[k]) for k in paper_keys]
+    )
+    keys = app.compare_category_cache_keys(payloads)
+    category = next(iter(app.CATEGORY_FIELDS))
+    # A failure whose retry window has already passed
+    monkeypatch.setattr(app, "COMPARE_AI_FAILURE_TTL", -1)
+    failure = {"category": category, "comparison": "AI comparison unavailable"}
+    app.save_category_result(category, keys[category], failure)
+
+    summary = post_compare(client, paper_keys)
+    assert provider.calls == calls + 1
+    assert not app.compare_result_failed(summary["results"][category])
+
+
+def test_category_keys_depend_only_on_that_categorys_content(app, corpus):
+    rows = [app.compare_row(p) for p in corpus.papers[:2]]
+    keys = app.compare_category_cache_keys(app.compare_category_payloads(rows))
+    assert keys == app.compare_category_cache_keys(app.compare_category_payloads(rows))
+    assert keys != app.compare_category_cache_keys(app.compare_category_payloads(rows), "other-model")
+
+    category = next(iter(app.CATEGORY_FIELDS))
+    field = app.CATEGORY_FIELDS[category][0]
+    edited = [dict(rows[0], **{field: "something else entirely"}), rows[1]]
+    edited_keys = app.compare_category_cache_keys(app.compare_category_payloads(edited))
+    assert edited_keys[category] != keys[category]
+    for other, fields in app.CATEGORY_FIELDS.items():
+        if field not in fields:
+            assert edited_keys[other] == keys[other], other
+
+
+def stream_events(client, paper_keys):
+    response = client.get(f"/api/compare-ai-differences/stream?paper_keys={','.join(paper_keys)}")
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    events = []
+    for block in response.get_data(as_text=True).strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def test_stream_sends_each_category_then_done(app, client, provider, paper_keys):
+    events = stream_events(client, paper_keys)
+    assert [name for name, _ in events] == ["category"] * len(app.CATEGORY_FIELDS) + ["done"]
+    assert {data["category"] for _, data in events[:-1]} == set(app.CATEGORY_FIELDS)
+    assert events[-1][1]["paper_keys"] == paper_keys
+    assert provider.calls == len(app.CATEGORY_FIELDS)
+
+    # What the page falls back to after a dropped stream is served from the cache
+    summary = post_compare(client, paper_keys)
+    assert provider.calls == len(app.CATEGORY_FIELDS)
+    assert summary["results"] == {data["category"]: data["result"] for _, data in events[:-1]}
+    assert {data["source"] for _, data in stream_events(client, paper_keys)[:-1]} == {"cache"}
+
+
+def test_stream_reports_a_failure_after_it_started(app, client, paper_keys, monkeypatch):
+    def failing(paper_keys, rows):
+        yield "first", {"held_constant": "x"}, "cache"
+        raise RuntimeError("model down")
+
+    monkeypatch.setattr(app, "iter_compare_categories", failing)
+    events = stream_events(client, paper_keys)
+    assert events == [
+        ("category", {"category": "first", "result": {"held_constant": "x"}, "source": "cache"}),
+        ("error", {"error": "model down"}),
+    ]
+
+
+def test_stream_rejects_unknown_papers(client):
+    response = client.get("/api/compare-ai-differences/stream?paper_keys=no-such-paper")
+    assert response.status_code == 404
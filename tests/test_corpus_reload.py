@@ -0,0 +1,199 @@
+import csv
+import os
+import shutil
+
+import pytest
+
+
+@pytest.fixture
+def csv_copy(app, tmp_path, monkeypatch):
+    """A private copy of the papers CSV that the loader reads; the original corpus is restored after."""
+    original = app.get_papers_csv_path()
+    path = tmp_path / "papers.csv"
+    shutil.copy(original, path)
+    monkeypatch.setattr(app, "get_papers_csv_path", lambda: path)
+    app.load_papers_from_csv()
+    yield path
+    monkeypatch.undo()
+    app.load_papers_from_csv()
+
+
+def rewrite(path, edit):
+    """Apply ``edit(header, rows)`` to the CSV data rows and move the mtime forward."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = list(reader)
+    rows = edit(header, rows)
+    stat = os.stat(path)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 5))
+
+
+def test_unchanged_csv_loads_from_the_snapshot(app, csv_copy):
+    parsed = app.get_corpus()
+    app.load_papers_from_csv()
+    loaded = app.get_corpus()
+    assert app._corpus_load_stats["source"] == "snapshot"
+    assert loaded.version == parsed.version
+    assert loaded.papers == parsed.papers
+    assert app.search_papers("facebook", {}, corpus=loaded) == app.search_papers(
+        "facebook", {}, corpus=parsed
+    )
+
+
+def test_touched_csv_with_the_same_bytes_keeps_the_snapshot(app, csv_copy):
+    version = app.get_corpus().version
+    stat = os.stat(csv_copy)
+    os.utime(csv_copy, (stat.st_atime, stat.st_mtime + 10))
+    app.load_papers_from_csv()
+    assert app._corpus_load_stats["source"] == "snapshot"
+    assert app.get_corpus().version == version
+    # The header now records the new mtime, so the next start does not hash the file
+    header, _ = app._read_papers_snapshot(csv_copy, header_only=True)
+    assert header["mtime"] == os.stat(csv_copy).st_mtime
+
+
+def test_snapshot_from_other_code_or_a_damaged_file_is_ignored(app, csv_copy, monkeypatch):
+    with monkeypatch.context() as m:
+        m.setattr(app, "_SNAPSHOT_CODE_VERSION", "other-code")
+        assert app._read_papers_snapshot(csv_copy) is None
+        app.load_papers_from_csv()
+        assert app._corpus_load_stats["source"].startswith("csv")
+
+    app.PAPERS_SNAPSHOT_PATH.write_bytes(b"not a pickle")
+    assert app._read_papers_snapshot(csv_copy) is None
+    app.load_papers_from_csv()
+    assert app._corpus_load_stats["source"].startswith("csv")
+    assert app._read_papers_snapshot(csv_copy) is not None
+
+
+def test_unchanged_csv_is_not_reloaded(app, csv_copy):
+    corpus = app.get_corpus()
+    app.reload_papers_from_csv_if_changed(background=False)
+    assert app.get_corpus() is corpus
+
+
+def test_background_reload_swaps_in_the_new_corpus(app, csv_copy, monkeypatch):
+    before = app.get_corpus()
+    started = app.threading.Event()
+    release = app.threading.Event()
+    load = app.load_papers_from_csv
+
+    def slow_load():
+        started.set()
+        release.wait(5)
+        return load()
+
+    monkeypatch.setattr(app, "load_papers_from_csv", slow_load)
+    rewrite(csv_copy, lambda header, rows: rows[:-1])
+    app.reload_papers_from_csv_if_changed()
+    assert started.wait(5)
+    # Requests keep the old snapshot while the reload runs, and no second reload starts
+    assert app.get_corpus() is before
+    thread = app._reload_thread
+    app.reload_papers_from_csv_if_changed()
+    assert app._reload_thread is thread
+    release.set()
+    app._reload_thread.join(5)
+    after = app.get_corpus()
+    assert after is not before
+    assert len(after.papers) == len(before.papers) - 1
+    assert after.csv_mtime == os.stat(csv_copy).st_mtime
+
+
+def test_unreadable_csv_keeps_the_published_corpus(app, csv_copy, monkeypatch):
+    before = app.get_corpus()
+    with open(csv_copy, "wb") as f:
+        f.write(b"\xff\xfe not utf-8 \xff")
+    os.utime(csv_copy, (0, before.csv_mtime + 10))
+    app.reload_papers_from_csv_if_changed(background=False)
+    assert app.get_corpus() is before
+    # The failed version is not retried on every request
+    calls = []
+    monkeypatch.setattr(app, "load_papers_from_csv", lambda: calls.append(1))
+    app.reload_papers_from_csv_if_changed(background=False)
+    assert calls == []
+
+
+def test_edit_reuses_unchanged_rows_and_keeps_ids(app, csv_copy):
+    before = app.get_corpus()
+    ids_by_title = {p["title"]: p["id"] for p in before.papers}
+    edited_title = before.papers[1]["title"]
+    removed_title = before.papers[2]["title"]
+
+    def edit(header, rows):
+        title = header.index("title")
+        rows[1][title] = rows[1][title] + " (revised)"
+        del rows[2]
+        return rows
+
+    rewrite(csv_copy, edit)
+    app.reload_papers_from_csv_if_changed(background=False)
+
+    after = app.get_corpus()
+    assert after is not before
+    assert after.version != before.version
+    stats = app._corpus_load_stats
+    assert stats["source"] == "csv-incremental"
+    assert stats["parsed"] == 1
+    assert stats["reused"] == len(before.papers) - 2
+    assert stats["removed"] == 2
+
+    titles = [p["title"] for p in after.papers]
+    assert removed_title not in titles
+    assert edited_title + " (revised)" in titles
+    for paper in after.papers:
+        if paper["title"] in ids_by_title:
+            assert paper["id"] == ids_by_title[paper["title"]]
+            # Unchanged rows reuse the previous record object
+            assert paper is before.lookup.by_id[paper["id"]]
+    # The edited paper keeps its id (same DOI) and search sees the new title
+    revised = app.search_papers("revised", {}, corpus=after)
+    assert [p["id"] for p in revised] == [ids_by_title[edited_title]]
+
+
+def test_removed_ids_are_not_reissued(app, csv_copy):
+    before = app.get_corpus()
+    removed_id = before.papers[0]["id"]
+
+    rewrite(csv_copy, lambda header, rows: rows[1:])
+    app.reload_papers_from_csv_if_changed(background=False)
+    assert removed_id not in {p["id"] for p in app.get_corpus().papers}
+
+    # A new paper gets a fresh id rather than the removed one
+    def add_new(header, rows):
+        row = list(rows[0])
+        row[header.index("title")] = "An Entirely New Study Of Reload Behaviour"
+        if "citation" in header:
+            row[header.index("citation")] = "New citation without an identifier"
+        return rows + [row]
+
+    rewrite(csv_copy, add_new)
+    app.reload_papers_from_csv_if_changed(background=False)
+    new = app.search_papers("entirely new study", {}, corpus=app.get_corpus())
+    assert len(new) == 1
+    assert new[0]["id"] != removed_id
+    assert new[0]["id"] not in {p["id"] for p in before.papers}
+
+
+def test_patched_index_matches_a_full_rebuild(app, csv_copy):
+    def edit(header, rows):
+        abstract = header.index("abstract")
+        rows[0][abstract] = rows[0][abstract] + " incrementalmarker"
+        del rows[3]
+        return rows
+
+    rewrite(csv_copy, edit)
+    app.reload_papers_from_csv_if_changed(background=False)
+    assert app._corpus_load_stats["source"] == "csv-incremental"
+    patched = app.get_corpus().index
+    rebuilt = app.PaperSearchIndex(patched.papers)
+    for query in ("incrementalmarker", "facebook", "social media", "usa", "well-being"):
+        terms = app._search_terms(query)
+        assert patched.search(terms) == rebuilt.search(terms), query
+        doc_ids = rebuilt.search(terms)
+        assert patched.rank(doc_ids, terms, 5) == rebuilt.rank(doc_ids, terms, 5), query
@@ -0,0 +1,83 @@
+import csv
+import io
+import json
+import uuid
+
+import pytest
+
+
+def export_log(app, user_session):
+    app._tracking_writer.flush()
+    conn = app.get_db_connection()
+    try:
+        return [
+            tuple(row)
+            for row in conn.execute(
+                "SELECT paper_ids, num_papers, file_format FROM download_logs WHERE user_session = ?",
+                (user_session,),
+            )
+        ]
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def user_session(client):
+    user_id = f"export-{uuid.uuid4().hex[:8]}"
+    with client.session_transaction() as session:
+        session["user_id"] = user_id
+    return user_id
+
+
+def test_ndjson_export_matches_search_and_is_logged(app, client, corpus, user_session):
+    response = client.get("/api/export?format=ndjson&q=facebook&fields=id,title,year")
+    assert response.status_code == 200
+    assert response.content_type == "application/x-ndjson"
+    assert "attachment" in response.headers["Content-Disposition"]
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    expected = sorted(p["id"] for p in app.search_papers("facebook", {}, corpus=corpus))
+    assert sorted(row["id"] for row in rows) == expected
+    assert all(set(row) == {"id", "title", "year"} for row in rows)
+    assert export_log(app, user_session) == [(json.dumps([row["id"] for row in rows]), len(rows), "NDJSON")]
+
+
+def test_csv_export_of_selected_ids_flattens_features(app, client, corpus, user_session):
+    papers = corpus.papers[:3]
+    ids = ",".join(p["id"] for p in papers)
+    feature = next(name for name in app.EXPORT_FIELDS if name not in app.EXPORT_PAPER_FIELDS)
+    response = client.get(f"/api/export?ids={ids}&fields=id,authors,{feature}")
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0] == ["id", "authors", feature]
+    assert rows[1:] == [
+        [p["id"], "; ".join(p["authors"]), str(p["extracted_features"].get(feature, ""))]
+        for p in papers
+    ]
+    assert export_log(app, user_session)[0][1:] == (3, "CSV")
+
+
+def test_export_streams_more_than_one_chunk(app, client, corpus, monkeypatch):
+    monkeypatch.setattr(app, "EXPORT_CHUNK_SIZE", 2)
+    response = client.get("/api/export?format=csv&fields=id")
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0] == "id"
+    assert sorted(lines[1:]) == sorted(p["id"] for p in corpus.papers)
+
+
+def test_parquet_export(app, client, corpus):
+    pq = pytest.importorskip("pyarrow.parquet")
+    response = client.get("/api/export?format=parquet&fields=id,year,authors")
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.get_data()))
+    assert table.column_names == ["id", "year", "authors"]
+    assert table.num_rows == len(corpus.papers)
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["format=xml", "fields=id,no_such_field", "year_from=recent"],
+)
+def test_bad_export_requests_are_rejected(client, query):
+    response = client.get(f"/api/export?{query}")
+    assert response.status_code == 400
+    assert "error" in response.get_json()
@@ -0,0 +1,61 @@
+import pytest
+
+CACHED_URLS = [
+    "/",
+    "/search?q=facebook",
+    "/database",
+    "/api/papers?view=card",
+    "/api/search?q=facebook&view=summary",
+    "/api/statistics",
+]
+
+
+@pytest.mark.parametrize("url", CACHED_URLS)
+def test_matching_if_none_match_gets_304(client, url):
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "public, no-cache"
+
+    second = client.get(url, headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.data == b""
+    assert second.headers["ETag"] == etag
+
+    stale = client.get(url, headers={"If-None-Match": '"not-the-etag"'})
+    assert stale.status_code == 200
+
+
+def test_article_and_paper_are_cached(client, corpus):
+    paper_id = corpus.papers[0]["id"]
+    for url in (f"/article/{paper_id}", f"/api/paper/{paper_id}"):
+        etag = client.get(url).headers["ETag"]
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_etag_depends_on_query_and_negotiated_headers(client):
+    plain = client.get("/api/papers?view=card").headers["ETag"]
+    other_query = client.get("/api/papers?view=summary").headers["ETag"]
+    gzipped = client.get("/api/papers?view=card", headers={"Accept-Encoding": "gzip"})
+    assert len({plain, other_query, gzipped.headers["ETag"]}) == 3
+    assert "Accept-Encoding" in gzipped.headers["Vary"]
+
+
+def test_etag_changes_with_the_corpus_version(client, corpus, monkeypatch):
+    etag = client.get("/api/statistics").headers["ETag"]
+    monkeypatch.setattr(corpus, "version", corpus.version + "-next")
+    response = client.get("/api/statistics", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_errors_are_not_tagged(client):
+    response = client.get("/api/paper/no-such-paper")
+    assert response.status_code == 404
+    assert "ETag" not in response.headers
+
+
+def test_side_effect_routes_are_not_cached(client):
+    response = client.get("/api/export?format=ndjson&fields=id")
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
@@ -0,0 +1,89 @@
+import time
+
+import pytest
+
+
+class ScriptedProvider:
+    """Provider whose calls fail, succeed or sleep as scripted, one entry per call."""
+
+    name = "scripted"
+    model = "scripted"
+
+    def __init__(self, app, script):
+        self.app = app
+        self.script = list(script)
+        self.calls = 0
+
+    def complete(self, prompt, timeout):
+        step = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        if step == "fail":
+            raise self.app.LLMProviderError("scripted failure")
+        if isinstance(step, float):
+            time.sleep(min(step, timeout))
+            if step > timeout:
+                raise self.app.LLMProviderError("scripted timeout")
+        return f"reply {self.calls}"
+
+
+def test_retries_until_a_call_succeeds(app):
+    provider = ScriptedProvider(app, ["fail", "fail", "ok"])
+    client = app.LLMClient(provider, retries=2, backoff=0.001)
+    assert client.complete("p") == "reply 3"
+    stats = client.stats()
+    assert stats["retries"] == 2 and stats["succeeded"] == 1
+
+
+def test_gives_up_after_the_last_retry(app):
+    provider = ScriptedProvider(app, ["fail"])
+    client = app.LLMClient(provider, retries=1, backoff=0.001)
+    with pytest.raises(app.LLMProviderError):
+        client.complete("p")
+    assert provider.calls == 2
+    assert client.stats()["failed"] == 1
+
+
+def test_deadline_bounds_the_whole_call(app):
+    provider = ScriptedProvider(app, [5.0])
+    client = app.LLMClient(provider, timeout=0.2, retries=3, backoff=0.001)
+    started = time.monotonic()
+    with pytest.raises(app.LLMProviderError):
+        client.complete("p")
+    assert time.monotonic() - started < 1.0
+
+
+def test_slow_call_is_hedged_to_the_second_provider(app):
+    slow = ScriptedProvider(app, [2.0])
+    fast = ScriptedProvider(app, ["ok"])
+    client = app.LLMClient(slow, hedge=fast, timeout=5, hedge_after=0.05)
+    started = time.monotonic()
+    assert client.complete("p") == "reply 1"
+    assert time.monotonic() - started < 1.0
+    stats = client.stats()
+    assert stats["hedged"] == 1 and stats["hedge_won"] == 1
+
+
+def test_fake_provider_is_deterministic(app):
+    provider = app.FakeProvider()
+    assert provider.complete("same prompt", 1) == provider.complete("same prompt", 1)
+    assert provider.complete("same prompt", 1) != provider.complete("other prompt", 1)
+
+
+def test_token_bucket_rejects_a_zero_rate(app):
+    with pytest.raises(ValueError):
+        app.TokenBucket(0)
+
+
+def test_token_bucket_gives_up_at_the_deadline(app):
+    bucket = app.TokenBucket(60, burst=1)
+    assert bucket.acquire()
+    assert not bucket.acquire(deadline=time.monotonic() + 0.1)
+
+
+def test_build_llm_client_splits_provider_and_client_options(app):
+    client = app.build_llm_client(
+        "fake", latency=0.01, hedge_provider="", rate_per_minute=0, retries=0, timeout=3
+    )
+    assert client.primary.latency == 0.01
+    assert client.limiter is None
+    assert (client.retries, client.timeout) == (0, 3)
@@ -0,0 +1,53 @@
+import pytest
+
+
+def test_categorical_column_codes_point_at_shared_values(app):
+    column = app.CategoricalColumn(["A", "b", "A", "", "b"])
+    assert column.categories == ["A", "b", ""]
+    assert column.codes.tolist() == [0, 1, 0, 2, 1]
+    assert column.mask_where(lambda c: c == "a").tolist() == [True, False, True, False, False]
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {},
+        {"year_from": "2018"},
+        {"year_to": "2019"},
+        {"year_from": "2016", "year_to": "2020"},
+        {"country": "united"},
+        {"country": "zzz"},
+    ],
+)
+def test_filter_mask_matches_per_paper_filters(app, corpus, filters):
+    def keep(paper):
+        features = paper.get("extracted_features") or {}
+        return (
+            ("year_from" not in filters or paper["year"] >= int(filters["year_from"]))
+            and ("year_to" not in filters or paper["year"] <= int(filters["year_to"]))
+            and ("country" not in filters or filters["country"] in features.get("country_region", "").lower())
+        )
+
+    mask = corpus.columns.filter_mask(app.normalize_search_filters(filters))
+    expected = [keep(p) for p in corpus.papers]
+    if not filters:
+        assert mask is None
+    else:
+        assert mask.tolist() == expected
+
+
+def test_journal_filter_is_case_insensitive(app, corpus):
+    journal = corpus.papers[0]["journal"]
+    mask = corpus.columns.filter_mask(app.normalize_search_filters({"journal": journal.swapcase()}))
+    assert mask.tolist() == [p["journal"].lower() == journal.lower() for p in corpus.papers]
+
+
+def test_statistics_agree_with_the_records(app, corpus):
+    stats = app.get_statistics(corpus)
+    papers = corpus.papers
+    assert stats["totalPapers"] == len(papers)
+    assert stats["totalStudies"] == sum(p["sample_size"] for p in papers)
+    assert stats["totalCountries"] == len({c for p in papers for c in p["countries"]})
+    assert sorted(stats["journals"]) == sorted({p["journal"] for p in papers})
+    assert sorted(stats["methodologies"]) == sorted({p["methodology"] for p in papers})
+    assert stats["years"] == sorted({p["year"] for p in papers}, reverse=True)
@@ -0,0 +1,26 @@
+def test_lookup_by_id_key_and_doi(corpus):
+    for paper in corpus.papers:
+        assert corpus.lookup.by_id[paper["id"]] is paper
+        assert corpus.lookup.by_key[paper["paper_key"]]["id"] == paper["id"]
+        if paper.get("doi"):
+            assert corpus.lookup.by_doi[paper["doi"].lower()]["id"] == paper["id"]
+
+
+def test_get_many_returns_known_papers_in_corpus_order(corpus):
+    first, second = corpus.papers[0], corpus.papers[1]
+    found = corpus.lookup.get_many([second["id"], "paper_does_not_exist", first["id"], second["id"]])
+    assert found == [first, second]
+
+
+def test_find_by_doi_in_free_text(corpus):
+    paper = next(p for p in corpus.papers if p.get("doi"))
+    text = f"Cited as: Someone (2020). https://doi.org/{paper['doi'].upper()}"
+    assert corpus.lookup.find_by_doi_in(text) is paper
+    assert corpus.lookup.find_by_doi_in("no identifier here") is None
+
+
+def test_paper_endpoints_use_the_lookup(client, corpus):
+    paper = corpus.papers[-1]
+    assert client.get(f"/api/paper/{paper['id']}").get_json()["title"] == paper["title"]
+    assert client.get(f"/article/{paper['id']}").status_code == 200
+    assert client.get("/api/paper/paper_does_not_exist").status_code == 404
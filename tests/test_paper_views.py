@@ -0,0 +1,57 @@
+import gzip
+import json
+
+import pytest
+
+
+def test_views_and_fields_project_each_paper(app, client, corpus):
+    card = client.get("/api/papers?view=card").get_json()
+    assert [p["id"] for p in card] == [p["id"] for p in corpus.papers]
+    assert all(set(p) == set(app.PAPER_VIEWS["card"]) for p in card)
+    first = corpus.papers[0]
+    assert card[0]["abstract_snippet"] == app.truncate_words(first["abstract"], app.CARD_ABSTRACT_WORDS)
+
+    feature = next(iter(first["extracted_features"]))
+    fields = client.get(f"/api/papers?fields=id,year,extracted_features.{feature}").get_json()
+    assert fields[0] == {
+        "id": first["id"],
+        "year": first["year"],
+        "extracted_features": {feature: first["extracted_features"][feature]},
+    }
+    assert client.get("/api/papers").get_json() == json.loads(json.dumps(corpus.papers))
+
+
+@pytest.mark.parametrize("query", ["view=tiny", "fields=id,no_such_field", "format=xml"])
+def test_bad_projection_or_format_is_rejected(client, query):
+    assert client.get(f"/api/papers?{query}").status_code == 400
+
+
+def test_large_bodies_are_compressed_per_accept_encoding(client, corpus):
+    response = client.get("/api/papers", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert json.loads(gzip.decompress(response.get_data()))[0]["id"] == corpus.papers[0]["id"]
+    small = client.get("/api/search?q=no-such-term-anywhere", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+    assert small.get_json() == []
+
+
+def test_msgpack_by_format_or_accept(app, client, corpus):
+    msgpack = pytest.importorskip("msgpack")
+    for response in (
+        client.get("/api/papers?view=summary&format=msgpack"),
+        client.get("/api/papers?view=summary", headers={"Accept": "application/msgpack"}),
+    ):
+        assert response.content_type == "application/msgpack"
+        assert msgpack.unpackb(response.get_data())[0]["id"] == corpus.papers[0]["id"]
+
+
+def test_accept_msgpack_without_the_package_falls_back_to_json(app, client, monkeypatch):
+    monkeypatch.setattr(app, "msgpack", None)
+    accepts_json = client.get(
+        "/api/papers?view=card", headers={"Accept": "application/msgpack, application/json;q=0.5"}
+    )
+    assert accepts_json.status_code == 200
+    assert accepts_json.content_type == "application/json"
+    assert client.get("/api/papers?view=card", headers={"Accept": "application/msgpack"}).status_code == 406
+    assert client.get("/api/papers?view=card&format=msgpack").status_code == 501
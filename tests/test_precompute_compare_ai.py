@@ -0,0 +1,89 @@
+import json
+import os
+import sqlite3
+import sys
+from datetime import date
+
+import precompute_compare_ai
+import pytest
+from archive_logs import archive_old_months
+from init_db import init_database
+
+
+@pytest.fixture
+def tracking_db(tmp_path, monkeypatch):
+    path = str(tmp_path / "tracking.db")
+    init_database(path)
+    monkeypatch.setattr(precompute_compare_ai, "TRACKING_DB", path)
+    conn = sqlite3.connect(path)
+    yield conn
+    conn.close()
+
+
+def log_views(app, conn, timestamp, *id_lists):
+    app.TrackingEventWriter._insert(
+        conn,
+        [
+            ("compare_view_logs", (timestamp, json.dumps(ids), len(ids), "s"))
+            for ids in id_lists
+        ],
+    )
+
+
+def test_candidate_sets_come_from_hot_and_archived_views(app, corpus, tracking_db, tmp_path):
+    by_id = {p["id"]: p for p in corpus.papers}
+    a, b, c, d = (p["id"] for p in corpus.papers[:4])
+    key = {pid: by_id[pid]["paper_key"] for pid in (a, b, c, d)}
+    log_views(app, tracking_db, "2026-01-10 10:00:00", [a, b], [b, a], [a, b, c])
+    archive_old_months(tracking_db, archive_dir=str(tmp_path / "archive"), today=date(2026, 6, 1))
+    log_views(
+        app,
+        tracking_db,
+        "2026-06-10 10:00:00",
+        [a, b],
+        [a, b, c],
+        [c, "no-such-paper"],  # one known paper left: not a set
+        [a, b, c, d, a],
+    )
+    with tracking_db:
+        tracking_db.execute(
+            "INSERT INTO compare_view_logs (timestamp, paper_ids, num_papers, user_session) "
+            "VALUES ('2026-06-11 10:00:00', 'not json', 0, 's')"
+        )
+
+    candidates = precompute_compare_ai.mine_candidate_sets(tracking_db, by_id, 2, 0)
+    assert candidates == [
+        (tuple(sorted([key[a], key[b]])), 3),
+        (tuple(sorted([key[a], key[b], key[c]])), 2),
+    ]
+
+    with_top = dict(precompute_compare_ai.mine_candidate_sets(tracking_db, by_id, 2, 2))
+    # a and b are the two most compared papers; their pair is already a logged set
+    assert len(with_top) == 2
+    with_top = dict(precompute_compare_ai.mine_candidate_sets(tracking_db, by_id, 5, 3))
+    assert with_top == {
+        tuple(sorted([key[a], key[b]])): 3,
+        tuple(sorted([key[a], key[c]])): 0,
+        tuple(sorted([key[b], key[c]])): 0,
+    }
+
+
+def test_checkpoint_is_per_model(tmp_path):
+    path = str(tmp_path / "nested" / "checkpoint.json")
+    assert precompute_compare_ai.load_checkpoint(path, "model-a") == set()
+    precompute_compare_ai.save_checkpoint(path, "model-a", {"k2", "k1"})
+    assert precompute_compare_ai.load_checkpoint(path, "model-a") == {"k1", "k2"}
+    assert precompute_compare_ai.load_checkpoint(path, "model-b") == set()
+    assert os.listdir(os.path.dirname(path)) == ["checkpoint.json"]
+
+
+def test_stub_run_refuses_the_real_tracking_database(tracking_db, monkeypatch, capsys):
+    monkeypatch.chdir(os.getcwd())  # main() changes to the repo root
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["precompute_compare_ai.py", "--stub", "--database", precompute_compare_ai.TRACKING_DB],
+    )
+    with pytest.raises(SystemExit):
+        precompute_compare_ai.main()
+    assert "must not go into the real tracking database" in capsys.readouterr().err
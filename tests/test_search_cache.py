@@ -0,0 +1,61 @@
+import pytest
+
+
+@pytest.fixture
+def search_cache(app):
+    app._search_result_cache.clear()
+    yield app._search_result_cache
+    app._search_result_cache.clear()
+
+
+def test_repeated_search_is_served_from_the_cache(app, corpus, search_cache):
+    first = app.search_papers("social media", {"year_from": "2015"}, corpus=corpus)
+    hits = search_cache.stats()["hits"]
+    # Same normalized query and filters: word order, case, spacing
+    again = app.search_papers("MEDIA   social", {"year_from": " 2015 "}, corpus=corpus)
+    assert search_cache.stats()["hits"] == hits + 1
+    assert [p["id"] for p in again] == [p["id"] for p in first]
+
+
+def test_cache_key_ignores_filters_that_do_not_affect_matching(app):
+    filters = app.normalize_search_filters({"journal": " Some Journal ", "sortBy": "year", "year_to": ""})
+    assert filters == {"journal": "some journal"}
+    assert app._search_cache_key(("b", "a", "a"), filters) == (("a", "b"), (("journal", "some journal"),))
+
+
+@pytest.mark.parametrize("padded_first", [True, False])
+def test_padded_and_plain_filter_values_select_the_same_papers(client, corpus, search_cache, padded_first):
+    journal = corpus.papers[0]["journal"]
+    expected = sorted(p["id"] for p in corpus.papers if p["journal"] == journal)
+    plain = {"journal": journal, "fields": "id"}
+    padded = {"journal": f" {journal} ", "fields": "id"}
+    for params in ([padded, plain] if padded_first else [plain, padded]):
+        body = client.get("/api/search", query_string=params).get_json()
+        assert sorted(p["id"] for p in body) == expected
+
+
+def test_cache_is_flushed_for_a_new_corpus_version(app, corpus, search_cache, monkeypatch):
+    app.search_papers("facebook", {}, corpus=corpus)
+    monkeypatch.setattr(corpus, "version", corpus.version + "-next")
+    misses = search_cache.stats()["misses"]
+    app.search_papers("facebook", {}, corpus=corpus)
+    assert search_cache.stats()["misses"] == misses + 1
+
+
+def test_cache_evicts_least_recently_used_and_expired_entries(app, monkeypatch):
+    cache = app.SearchResultCache(max_entries=2, max_doc_ids=10, ttl_seconds=60)
+    cache.put("a", [1, 2])
+    cache.put("b", [3])
+    assert list(cache.get("a")) == [1, 2]
+    cache.put("c", [4])
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+    # Results larger than the whole budget are returned but not stored
+    assert list(cache.put("big", range(11))) == list(range(11))
+    assert cache.get("big") is None
+
+    clock = [1000.0]
+    monkeypatch.setattr(app.time, "monotonic", lambda: clock[0])
+    cache.put("d", [5])
+    clock[0] += 61
+    assert cache.get("d") is None
@@ -0,0 +1,35 @@
+def test_document_fields_are_the_lowercase_paper_values(corpus):
+    for paper, doc in zip(corpus.papers, corpus.index.documents):
+        spans = {name: doc.text[start:end] for name, start, end in doc.field_spans()}
+        assert doc.field_names[:5] == ("title", "abstract", "authors", "journal", "countries")
+        for name in ("title", "abstract", "journal"):
+            assert spans[name] == (paper.get(name) or "").lower()
+        assert spans["authors"] == " ".join(paper.get("authors") or []).lower()
+
+
+def test_matched_fields_name_where_each_term_was_found(app):
+    paper = {
+        "title": "Screen Time and Sleep",
+        "abstract": "A panel study of adolescents.",
+        "authors": ["Doe, J."],
+        "journal": "Journal of Sleep",
+        "countries": ["Brazil"],
+        "extracted_features": {"country_region": "Brazil"},
+    }
+    doc = app._build_search_document(paper)
+    assert app._document_matched_fields(doc, ["panel"]) == ["abstract"]
+    assert app._document_matched_fields(doc, ["sleep"]) == ["title", "journal"]
+    assert app._document_matched_fields(doc, ["brazil", "screen"]) == [
+        "title",
+        "countries",
+        "country_region",
+    ]
+    assert app._document_matched_fields(doc, ["absent"]) == []
+
+
+def test_search_match_hints_cover_the_given_results(app, corpus):
+    papers = app.search_papers("facebook", {}, corpus=corpus)[:5]
+    hints = app.search_match_hints(corpus, "facebook", papers)
+    assert set(hints) == {p["id"] for p in papers}
+    assert all(hints[p["id"]] for p in papers)
+    assert app.search_match_hints(corpus, "", papers) == {}
@@ -0,0 +1,183 @@
+import re
+
+import pytest
+
+QUERIES = [
+    "",
+    "facebook",
+    "social media",
+    "well-being",
+    "deactivation experiment",
+    "usa",
+    "united states",
+    "brazil",
+    "the",
+    "no-such-term-anywhere",
+]
+
+
+# search_papers as it was before the index, copied here so the check does not
+# depend on the code under test. Only the alias tables are read from app.py.
+
+
+def baseline_collapse_country_phrases(app, query):
+    if not query or not str(query).strip():
+        return ""
+    q = " ".join(query.lower().split())
+    for phrase, canon in app.COUNTRY_MULTIWORD_PHRASES:
+        if canon not in app.COUNTRY_TERM_ALIASES:
+            continue
+        parts = phrase.split()
+        if len(parts) < 2:
+            continue
+        escaped = r"\s+".join(re.escape(p) for p in parts)
+        q = re.sub(r"(?i)\b" + escaped + r"\b", " " + canon + " ", q)
+        q = " ".join(q.split())
+    return q
+
+
+def baseline_term_matches_haystack(app, term, haystack):
+    if not term:
+        return True
+    if term in app.COUNTRY_TERM_ALIASES:
+        if any(phrase in haystack for phrase in app.COUNTRY_TERM_ALIASES[term]):
+            return True
+        return bool(re.search(r"\b" + re.escape(term) + r"\b", haystack))
+    if len(term) <= 3:
+        return bool(re.search(r"\b" + re.escape(term) + r"\b", haystack))
+    return term in haystack
+
+
+def baseline_search_text_blob(app, paper):
+    extracted = paper.get("extracted_features") or {}
+    parts = [
+        paper.get("title") or "",
+        paper.get("abstract") or "",
+        " ".join(paper.get("authors") or []),
+        paper.get("journal") or "",
+        " ".join(str(c) for c in (paper.get("countries") or [])),
+    ]
+    for key in app.SEARCH_CONTEXT_FEATURE_KEYS:
+        val = extracted.get(key, "")
+        if val is not None and str(val).strip():
+            parts.append(str(val))
+    return " ".join(parts).lower()
+
+
+def linear_search(app, papers, query, filters):
+    """Scan and filter every paper."""
+    results = list(papers)
+    if query:
+        collapsed = baseline_collapse_country_phrases(app, query)
+        terms = [t for t in (w.strip().lower().strip(".,;:()\"'") for w in collapsed.split()) if t]
+        results = [
+            paper
+            for paper in results
+            if all(
+                baseline_term_matches_haystack(app, term, baseline_search_text_blob(app, paper))
+                for term in terms
+            )
+        ]
+    if filters.get("year_from"):
+        results = [p for p in results if p["year"] >= int(filters["year_from"])]
+    if filters.get("year_to"):
+        results = [p for p in results if p["year"] <= int(filters["year_to"])]
+    if filters.get("journal"):
+        results = [p for p in results if filters["journal"].lower() == p["journal"].lower()]
+    if filters.get("country"):
+        results = [
+            p
+            for p in results
+            if filters["country"].lower()
+            in p.get("extracted_features", {}).get("country_region", "").lower()
+        ]
+    results.sort(key=lambda p: p["year"], reverse=True)
+    return results
+
+
+def filter_cases(papers):
+    years = sorted({p["year"] for p in papers})
+    journal = papers[0]["journal"]
+    country = (papers[0].get("extracted_features") or {}).get("country_region", "")
+    return [
+        {},
+        {"year_from": years[len(years) // 2]},
+        {"year_to": years[len(years) // 2]},
+        {"year_from": years[0], "year_to": years[0]},
+        {"journal": journal.upper()},
+        {"country": country.split(",")[0].strip().lower()[:6]},
+    ]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_index_matches_linear_filter(app, corpus, query):
+    for filters in filter_cases(corpus.papers):
+        expected = [p["id"] for p in linear_search(app, corpus.papers, query, filters)]
+        actual = [p["id"] for p in app.search_papers(query, filters, corpus=corpus)]
+        assert actual == expected, (query, filters)
+
+
+def test_index_term_postings_match_the_haystack(app, corpus):
+    index = corpus.index
+    for term in ("face", "media", "us", "well-being", "usa"):
+        expected = [
+            doc_id
+            for doc_id, paper in enumerate(corpus.papers)
+            if baseline_term_matches_haystack(app, term, baseline_search_text_blob(app, paper))
+        ]
+        assert index.match(term).tolist() == expected, term
+
+
+@pytest.fixture(scope="module")
+def sqlite_store(app, tmp_path_factory):
+    if not app._sqlite_fts5_trigram_available():
+        pytest.skip("SQLite without FTS5 trigram support")
+    corpus = app.get_corpus()
+    store = app.SqlitePaperStore(tmp_path_factory.mktemp("corpus") / "corpus.db")
+    csv_path = app.get_papers_csv_path()
+    store.import_papers(corpus.papers, csv_path, csv_path.stat(), corpus.version * 4)
+    return store
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_sqlite_store_matches_in_memory_search(app, corpus, sqlite_store, query):
+    terms = app._search_terms(query) if query else ()
+    for filters in filter_cases(corpus.papers):
+        expected = app.search_papers(query, filters, corpus=corpus)
+        actual = sqlite_store.search(terms, filters, "year")
+        assert [p["id"] for p in actual] == [p["id"] for p in expected], (query, filters)
+        assert sqlite_store.count(terms, filters) == len(expected)
+    # Records read back from the database equal the in-memory ones
+    for paper in sqlite_store.search(terms, {}, "year"):
+        original = corpus.lookup.by_id[paper["id"]]
+        assert {k: original[k] for k in paper} == paper
+
+
+def test_sqlite_store_pages_lookups_and_statistics(app, corpus, sqlite_store):
+    everything = sqlite_store.search((), {}, "year")
+    assert sqlite_store.search((), {}, "year", limit=3, offset=2) == everything[2:5]
+    journal = corpus.papers[0]["journal"]
+    assert sqlite_store.count((), {"journal": f" {journal} "}) == sqlite_store.count(
+        (), {"journal": journal}
+    )
+
+    store_corpus = app._store_corpus(sqlite_store, "store-test", app.get_papers_csv_path().stat())
+    assert len(store_corpus.papers) == len(corpus.papers)
+    assert [p["id"] for p in store_corpus.papers] == [p["id"] for p in corpus.papers]
+    paper = corpus.papers[1]
+    assert store_corpus.lookup.by_key[paper["paper_key"]]["id"] == paper["id"]
+    assert store_corpus.lookup.by_id.get("paper_does_not_exist") is None
+    assert [p["id"] for p in store_corpus.lookup.get_many([paper["id"]])] == [paper["id"]]
+
+    stats, expected = app.get_statistics(store_corpus), app.get_statistics(corpus)
+    for key in ("totalPapers", "totalStudies", "totalCountries", "years"):
+        assert stats[key] == expected[key]
+    assert sorted(stats["journals"]) == sorted(expected["journals"])
+
+
+def test_sqlite_store_is_reused_only_for_the_same_csv(app, corpus, sqlite_store):
+    csv_path = app.get_papers_csv_path()
+    stat = csv_path.stat()
+    assert sqlite_store.holds(csv_path, stat)
+    assert not sqlite_store.holds(csv_path.with_name("other.csv"), stat)
+    assert not sqlite_store.import_papers(corpus.papers, csv_path, stat, corpus.version * 4)
@@ -0,0 +1,49 @@
+import pytest
+
+
+@pytest.mark.parametrize("query", ["", "facebook", "social media"])
+def test_pages_concatenate_to_full_results(app, corpus, query):
+    for sort_by in ("year", "relevance"):
+        full = [p["id"] for p in app.search_papers(query, {}, sort_by=sort_by, corpus=corpus)]
+        paged = []
+        page = 1
+        while True:
+            total, current, papers = app.search_papers_page(
+                query, {}, sort_by=sort_by, page=page, per_page=3, corpus=corpus
+            )
+            assert total == len(full)
+            if current != page:
+                break
+            paged.extend(p["id"] for p in papers)
+            page += 1
+        assert paged == full, (query, sort_by)
+
+
+def test_page_past_the_end_is_clamped_to_the_last_page(app, corpus):
+    total, page, papers = app.search_papers_page("", {}, page=999, per_page=5, corpus=corpus)
+    assert page == (total + 4) // 5
+    assert papers == app.search_papers("", {}, corpus=corpus)[(page - 1) * 5 :]
+    assert app.search_papers_page("no-such-term-anywhere", {}, corpus=corpus) == (0, 1, [])
+
+
+@pytest.mark.parametrize("sort_by", ["year", "relevance"])
+def test_limit_keeps_the_top_results(app, corpus, sort_by):
+    full = app.search_papers("facebook", {}, sort_by=sort_by, corpus=corpus)
+    top = app.search_papers("facebook", {}, sort_by=sort_by, limit=3, corpus=corpus)
+    assert [p["id"] for p in top] == [p["id"] for p in full[:3]]
+
+
+def test_pagination_window_marks_gaps(app):
+    assert app._pagination_window(1, 1) == [1]
+    assert app._pagination_window(1, 10) == [1, 2, 3, None, 10]
+    assert app._pagination_window(6, 10) == [1, None, 4, 5, 6, 7, 8, 9, 10]
+    assert app._pagination_window(4, 10) == [1, 2, 3, 4, 5, 6, None, 10]
+
+
+def test_api_search_page_reports_the_total(client):
+    full = client.get("/api/search?q=social&fields=id").get_json()
+    response = client.get("/api/search?q=social&fields=id&page=2&per_page=2")
+    assert response.status_code == 200
+    assert response.headers["X-Total-Count"] == str(len(full))
+    assert response.get_json() == full[2:4]
+    assert client.get("/api/search?page=x").status_code == 400
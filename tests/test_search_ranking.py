@@ -0,0 +1,71 @@
+import math
+
+import pytest
+
+RANKED_QUERIES = ["facebook", "social media", "well-being", "usa", "deactivation experiment"]
+
+
+def reference_scores(app, index, terms):
+    """BM25F of every document in the corpus, scored one posting at a time."""
+    num_docs = len(index.papers)
+    scores = [0.0] * num_docs
+    for term in set(terms):
+        df = len(index.match(term))
+        if not df:
+            continue
+        idf = math.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+        tf = [0.0] * num_docs
+        for token in index._term_tokens(term):
+            entry = index.field_postings.get(token)
+            if entry is None:
+                continue
+            for doc_id, code, count in zip(*(a.tolist() for a in entry)):
+                boost = app.SEARCH_FIELD_BOOSTS.get(app.SEARCH_RANKED_FIELDS[code], 1.0)
+                tf[doc_id] += boost * count / float(index.length_norms[doc_id, code])
+        for d in range(num_docs):
+            scores[d] += idf * tf[d] * (app.BM25_K1 + 1) / (tf[d] + app.BM25_K1)
+    return scores
+
+
+@pytest.mark.parametrize("query", RANKED_QUERIES)
+def test_rank_orders_matches_by_bm25f(app, corpus, query):
+    index = corpus.index
+    terms = app._search_terms(query)
+    doc_ids = index.search(terms)
+    scores = reference_scores(app, index, terms)
+    ranked = index.rank(doc_ids, terms, len(doc_ids))
+    assert sorted(ranked) == sorted(doc_ids)
+    ranked_scores = [scores[d] for d in ranked]
+    assert all(a >= b - 1e-4 for a, b in zip(ranked_scores, ranked_scores[1:]))
+
+
+@pytest.mark.parametrize("query", RANKED_QUERIES)
+def test_rank_top_k_is_a_prefix_of_the_full_ranking(app, corpus, query):
+    index = corpus.index
+    terms = app._search_terms(query)
+    doc_ids = index.search(terms)
+    full = index.rank(doc_ids, terms, len(doc_ids))
+    for k in (1, 2, 5):
+        assert index.rank(doc_ids, terms, k) == full[:k]
+    # Only the given documents are ranked
+    subset = doc_ids[::2]
+    assert index.rank(subset, terms, len(subset)) == [d for d in full if d in set(subset)]
+    assert index.rank([], terms, 3) == []
+
+
+def test_title_match_outranks_abstract_only_match(app):
+    papers = [
+        {"title": "Unrelated", "abstract": "A study of loneliness.", "year": 2020},
+        {"title": "Loneliness online", "abstract": "A study.", "year": 2020},
+    ]
+    for paper in papers:
+        paper.update(authors=[], journal="", countries=[], extracted_features={})
+    index = app.PaperSearchIndex(papers)
+    terms = app._search_terms("loneliness")
+    assert index.rank(index.search(terms), terms, 2) == [1, 0]
+
+
+def test_api_search_defaults_to_relevance(app, client, corpus):
+    body = client.get("/api/search?q=facebook&fields=id").get_json()
+    expected = app.search_papers("facebook", {}, sort_by="relevance", corpus=corpus)
+    assert [p["id"] for p in body] == [p["id"] for p in expected]
@@ -0,0 +1,54 @@
+import threading
+
+
+def test_pooled_connections_use_wal_and_are_reused(app, tmp_path):
+    pool = app.ConnectionPool(str(tmp_path / "pool.db"), size=2)
+    conn = pool.acquire()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    pool.release(conn)
+    assert pool.acquire() is conn
+    pool.release(conn)
+
+
+def test_released_connection_is_rolled_back(app, tmp_path):
+    pool = app.ConnectionPool(str(tmp_path / "pool.db"), size=1)
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.execute("INSERT INTO t VALUES (1)")
+    pool.release(conn)
+    again = pool.acquire()
+    assert not again.in_transaction
+    assert again.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    pool.release(again)
+
+
+def test_pool_keeps_at_most_size_idle_connections(app, tmp_path):
+    pool = app.ConnectionPool(str(tmp_path / "pool.db"), size=1)
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    pool.release(second)
+    assert pool._idle == [first]
+    first.really_close()
+
+
+def test_readers_are_not_blocked_by_an_open_write(app, tmp_path):
+    pool = app.ConnectionPool(str(tmp_path / "pool.db"), size=4)
+    writer = pool.acquire()
+    writer.execute("CREATE TABLE t (x INTEGER)")
+    writer.commit()
+    writer.execute("INSERT INTO t VALUES (1)")
+    counts = []
+
+    def read():
+        reader = pool.acquire()
+        counts.append(reader.execute("SELECT COUNT(*) FROM t").fetchone()[0])
+        pool.release(reader)
+
+    thread = threading.Thread(target=read)
+    thread.start()
+    thread.join(5)
+    assert counts == [0]
+    writer.commit()
+    pool.release(writer)
@@ -0,0 +1,81 @@
+import pytest
+
+
+def count_rows(app, table, where="1", params=()):
+    conn = app.get_db_connection()
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", params).fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def writer(app):
+    writer = app.TrackingEventWriter(max_queued=100, batch_size=50, flush_interval=0.05)
+    yield writer
+    writer.close()
+
+
+def test_queued_events_are_written_in_batches(app, writer):
+    before = count_rows(app, "search_logs", "search_query = ?", ("writer-batch",))
+    for i in range(5):
+        assert writer.submit("search_logs", ("2026-01-02 10:00:00", "writer-batch", "{}", i, "s"))
+    writer.flush()
+    stats = writer.stats()
+    assert stats["written"] == 5 and stats["failed"] == 0
+    assert count_rows(app, "search_logs", "search_query = ?", ("writer-batch",)) == before + 5
+    assert stats["batches"] == 1
+
+
+def test_bad_row_does_not_lose_the_rest_of_its_batch(app, writer):
+    good = ("2026-01-03 10:00:00", "writer-good", "{}", 1, "s")
+    bad = ("2026-01-03 10:00:00", ["not", "a", "string"], "{}", 1, "s")
+    for row in (good, good, bad, good):
+        writer.submit("search_logs", row)
+    writer.flush()
+    stats = writer.stats()
+    assert stats["written"] == 3
+    assert stats["failed"] == 1
+    assert count_rows(app, "search_logs", "search_query = 'writer-good'") == 3
+
+
+def test_full_queue_drops_and_counts(app):
+    writer = app.TrackingEventWriter(max_queued=1, batch_size=1, flush_interval=0.05)
+    writer._ensure_started()
+    # Submit faster than the writer drains a one-slot queue
+    results = [
+        writer.submit("search_logs", ("2026-01-04 10:00:00", "writer-full", "{}", 0, "s"))
+        for _ in range(200)
+    ]
+    writer.close()
+    stats = writer.stats()
+    assert stats["dropped"] == results.count(False)
+    assert stats["enqueued"] + stats["dropped"] == 200
+    assert stats["written"] == stats["enqueued"]
+
+
+@pytest.mark.parametrize(
+    "path, body",
+    [
+        ("/api/track/search", {"search_query": ["x"]}),
+        ("/api/track/search", {"search_query": "x", "num_results": "many"}),
+        ("/api/track/search", {"search_query": "x", "filters_used": ["year"]}),
+        ("/api/track/compare_view", {"paper_ids": "paper_001"}),
+        ("/api/track/download", {"paper_ids": [{"id": 1}]}),
+        ("/api/track/download", [1, 2]),
+    ],
+)
+def test_endpoints_reject_values_that_cannot_be_stored(client, path, body):
+    response = client.post(path, json=body)
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
+
+
+def test_endpoints_queue_valid_events(app, client):
+    before = count_rows(app, "compare_view_logs")
+    assert client.post("/api/track/search", json={"search_query": 42, "num_results": "3"}).status_code == 200
+    assert client.post("/api/track/compare_view", json={"paper_ids": ["paper_001", 2]}).status_code == 200
+    app._tracking_writer.flush()
+    assert count_rows(app, "search_logs", "search_query = '42' AND num_results = 3") >= 1
+    assert count_rows(app, "compare_view_logs") == before + 1
+    assert count_rows(app, "compare_view_logs", "paper_ids = ?", ('["paper_001", "2"]',)) >= 1